@@ -1,7 +1,7 @@
 from datetime import datetime
 
 import pytz
-from sqlalchemy import Column, BigInteger, String, DateTime, Integer
+from sqlalchemy import Column, BigInteger, String, DateTime, Integer, Index
 from sqlalchemy.dialects.mssql import TINYINT
 
 from app.config.database import Base
@@ -9,13 +9,28 @@ from app.config.database import Base
 
 class AlarmDB(Base):
     __tablename__ = "alarm"
+    __table_args__ = (
+        # 查询未结束的告警（alarm_end_time IS NULL），服务重启后恢复告警跟踪器状态
+        Index("idx_alarm_open", "alarm_end_time", "camera_id", "alarm_type", "alarm_time"),
+        # 按告警时间范围查询（告警列表、本日统计），覆盖本日各类型告警数和处理统计，无需回表
+        Index("idx_alarm_time_type_status", "alarm_time", "alarm_type", "alarm_status"),
+        # 按告警类型筛选 + 告警时间范围（告警列表），以及所有告警按类型统计
+        Index("idx_alarm_type_time", "alarm_type", "alarm_time"),
+        # 最近的未解决告警（alarm_status IN (0,2) ORDER BY alarm_time DESC）
+        Index("idx_alarm_status_time", "alarm_status", "alarm_time"),
+        # 告警列表游标分页（ORDER BY alarm_time DESC, alarm_id DESC，从游标位置往后扫索引，无需排序）
+        Index("idx_alarm_time_id", "alarm_time", "alarm_id"),
+    )
 
-    alarm_id = Column(BigInteger, primary_key=True, autoincrement=True, index=True) # 报警ID，唯一自增，建索引
+    alarm_id = Column(BigInteger, primary_key=True, autoincrement=False, index=True) # 报警ID，由雪花算法预先生成（按时间递增），建索引
     camera_id = Column(Integer, nullable=False, index=True)# 摄像头ID，逻辑外键，建索引
     alarm_type = Column(TINYINT(), nullable=False)  # 0-安全规范（未戴安全帽/未穿反光衣） 1-区域入侵（人/车） 2-火警（火焰/烟雾）
     alarm_status = Column(TINYINT(), default=0)  # 0-未处理 1-确认误报 2-处理中（已派单） 3-处理完成
     alarm_time = Column(DateTime, nullable=False) # 告警触发时间，非空
     alarm_end_time = Column(DateTime, nullable=True) # 告警触发时间，可为空
     snapshot_url = Column(String(255), nullable=False) # 报警截图URL，非空 （对于安全规范告警，该字段最多包含2张截图的URL）
+    video_clip_url = Column(String(255), nullable=True) # 报警视频片段URL（告警前N秒+告警后M秒），可为空
+    latest_handle_user_id = Column(Integer, nullable=True) # 最新处理记录的处理人ID（与处理记录在同一事务中更新，告警列表无需再联查处理记录表），可为空
+    latest_handle_time = Column(DateTime, nullable=True) # 最新处理记录的处理时间，可为空
     create_time = Column(DateTime, default=datetime.now(pytz.timezone('Asia/Shanghai')))  # 创建时间
     update_time = Column(DateTime, default=datetime.now(pytz.timezone('Asia/Shanghai')), onupdate=datetime.now(pytz.timezone('Asia/Shanghai'))) # 更新时间
\ No newline at end of file
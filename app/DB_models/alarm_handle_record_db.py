@@ -1,13 +1,17 @@
 from datetime import datetime
 
 import pytz
-from sqlalchemy import Column, BigInteger, String, DateTime, Integer, Text
+from sqlalchemy import Column, BigInteger, String, DateTime, Integer, Text, Index
 
 from app.config.database import Base
 
 
 class AlarmHandleRecordDB(Base):
     __tablename__ = "alarm_handle_record"
+    __table_args__ = (
+        # 每条告警的最新处理记录（回填alarm表的latest_handle_*列时按处理时间倒序取第一条），只扫索引
+        Index("idx_handle_alarm_time", "alarm_id", "handle_time"),
+    )
 
     handle_id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)  # 处理记录唯一标识，自增
     alarm_id = Column(BigInteger, nullable=False, index=True)  # 关联的告警 ID，逻辑外键
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, Index
+from sqlalchemy.dialects.mssql import TINYINT
+
+from app.config.database import Base
+
+
+class AlarmStatsHourlyDB(Base):
+    __tablename__ = "alarm_stats_hourly"
+    __table_args__ = (
+        # 按园区区域统计告警数
+        Index("idx_stats_area", "park_area_id"),
+    )
+
+    stat_hour = Column(DateTime, primary_key=True)  # 告警触发时间所在的小时（整点）
+    camera_id = Column(Integer, primary_key=True, autoincrement=False)  # 摄像头ID，逻辑外键
+    alarm_type = Column(TINYINT(), primary_key=True, autoincrement=False)  # 告警类型：0-安全规范 1-区域入侵 2-火警
+    alarm_status = Column(TINYINT(), primary_key=True, autoincrement=False)  # 告警状态：0-未处理 1-确认误报 2-处理中（已派单） 3-处理完成
+    park_area_id = Column(Integer, nullable=True)  # 告警时摄像头所在的园区区域ID，逻辑外键（首次写入该行时确定，之后不再变化）
+    alarm_count = Column(Integer, nullable=False, default=0)  # 该小时内该摄像头、类型、状态的告警数
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import pytz
+from sqlalchemy import Column, BigInteger, DateTime, Integer
+from sqlalchemy.dialects.mssql import TINYINT
+
+from app.config.database import Base
+
+
+class AlarmStormSummaryDB(Base):
+    __tablename__ = "alarm_storm_summary"
+
+    summary_id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)  # 汇总记录ID，唯一自增
+    camera_id = Column(Integer, nullable=False, index=True)  # 摄像头ID，逻辑外键，建索引
+    alarm_type = Column(TINYINT(), nullable=False)  # 告警类型：0-安全规范 1-区域入侵 2-火警
+    suppressed_count = Column(Integer, nullable=False)  # 汇总周期内被限流、未创建告警记录的告警次数
+    window_start = Column(DateTime, nullable=False)  # 汇总周期内第一次被限流的时间
+    window_end = Column(DateTime, nullable=False)  # 汇总周期内最后一次被限流的时间
+    create_time = Column(DateTime, default=datetime.now(pytz.timezone('Asia/Shanghai')))  # 创建时间
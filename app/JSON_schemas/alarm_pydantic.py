@@ -84,6 +84,22 @@ class TodayAlarmHandleReport(BaseModel):
             }
         }
 
+class AlarmHistogram(BaseModel):
+    bucket: str  # 时间桶宽度：minute/hour/day
+    times: List[datetime]  # 每个时间桶的起点（连续，没有告警的时间桶也包含在内）
+    counts: List[int]  # 每个时间桶的告警数，与times一一对应
+    total: int  # 时间范围内的告警总数
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "bucket": "hour",
+                "times": ["2023-01-01T10:00:00", "2023-01-01T11:00:00", "2023-01-01T12:00:00"],
+                "counts": [3, 0, 5],
+                "total": 8
+            }
+        }
+
 class AlarmResponse(BaseModel):
     alarm_id: int
     camera_id: int
@@ -92,6 +108,7 @@ class AlarmResponse(BaseModel):
     alarm_time: datetime
     alarm_end_time: Optional[datetime] = None
     snapshot_url: str
+    video_clip_url: Optional[str] = None
     create_time: datetime
     update_time: datetime
     park_area: str # 联表查询所得字段
@@ -110,6 +127,7 @@ class AlarmResponse(BaseModel):
                 "alarm_time": "2023-01-01T10:00:00",
                 "alarm_end_time": "2023-01-01T10:05:00",
                 "snapshot_url": "https://oss.example.com/snapshot.jpg",
+                "video_clip_url": "https://oss.example.com/clip.mp4",
                 "create_time": "2023-01-01T10:00:00",
                 "update_time": "2023-01-01T10:05:00",
                 "park_area": "东区",
@@ -119,8 +137,10 @@ class AlarmResponse(BaseModel):
         }
 
 class AlarmPageResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # 符合条件的总数（请求参数with_total=false时不统计，为None）
     rows: List[AlarmResponse]
+    next_cursor: Optional[str] = None  # 下一页游标（已是最后一页时为None）
+    prev_cursor: Optional[str] = None  # 上一页游标（已是第一页时为None）
 
     model_config = {
         "json_schema_extra": {
@@ -135,6 +155,7 @@ class AlarmPageResponse(BaseModel):
                         "alarm_time": "2023-01-01T10:00:00",
                         "alarm_end_time": "2023-01-01T10:05:00",
                         "snapshot_url": "https://oss.example.com/snapshot1.jpg",
+                        "video_clip_url": "https://oss.example.com/clip1.mp4",
                         "create_time": "2023-01-01T10:00:00",
                         "update_time": "2023-01-01T10:05:00",
                         "park_area": "东区",
@@ -149,13 +170,16 @@ class AlarmPageResponse(BaseModel):
                         "alarm_time": "2023-01-01T11:00:00",
                         "alarm_end_time": None,
                         "snapshot_url": "https://oss.example.com/snapshot2.jpg",
+                        "video_clip_url": None,
                         "create_time": "2023-01-01T11:00:00",
                         "update_time": "2023-01-01T11:00:00",
                         "park_area": "西区",
                         "camera_name": "西门摄像头",
                         "handle_user_name": None
                     }
-                ])
+                ]),
+                ("next_cursor", "eyJrIjpbIjIwMjMtMDEtMDFUMTE6MDA6MDAiLDJdLCJiIjpmYWxzZX0"),
+                ("prev_cursor", None)
             ])
         }
     }
@@ -48,9 +48,29 @@ class CameraStatusReport(BaseModel):
             }
         }
 
+class CameraProbeReport(BaseModel):
+    total_count: int
+    online_count: int
+    offline_count: int
+    changed_count: int  # 本次探测后状态发生变化（已写回数据库）的摄像头数
+    elapsed_ms: int     # 本次探测耗时（毫秒）
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "total_count": 500,
+                "online_count": 496,
+                "offline_count": 4,
+                "changed_count": 2,
+                "elapsed_ms": 3012
+            }
+        }
+
 class CameraInfoPageResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # 符合条件的总数（请求参数with_total=false时不统计，为None）
     rows: List[CameraInfoResponse]
+    next_cursor: Optional[str] = None  # 下一页游标（已是最后一页时为None）
+    prev_cursor: Optional[str] = None  # 上一页游标（已是第一页时为None）
     
     class Config:
         # API 文档示例数据
@@ -82,7 +102,9 @@ class CameraInfoPageResponse(BaseModel):
                         "create_time": "2023-01-01T11:00:00",
                         "update_time": "2023-01-01T11:00:00"
                     }
-                ]
+                ],
+                "next_cursor": "eyJrIjpbMl0sImIiOmZhbHNlfQ",
+                "prev_cursor": None
             }
         }
 
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+from app.JSON_schemas.alarm_pydantic import AlarmReport, TodayAlarmHandleReport, TopAlarmAreasReport, AlarmPageResponse
+from app.JSON_schemas.camera_info_pydantic import CameraStatusReport
+
+
+class DashboardSummary(BaseModel):
+    """看板所有组件的数据（与各统计接口的返回数据相同）"""
+    today_report: AlarmReport                    # 本日告警统计（饼状图），同 /alarms/today_report
+    all_report: AlarmReport                      # 所有告警统计（饼状图），同 /alarms/all_report
+    today_handle_report: TodayAlarmHandleReport  # 本日告警处理统计，同 /alarms/today_handle_report
+    top3_areas: TopAlarmAreasReport              # 告警数前3的园区区域（柱状图），同 /alarms/top3_areas
+    recent_unresolved: AlarmPageResponse         # 最近的未解决告警 + 未解决告警总数，同 /alarms/recent_unresolved
+    camera_status: CameraStatusReport            # 摄像头状态统计，同 /camera_infos/status_report
@@ -63,8 +63,10 @@ class UserUpdate(BaseModel):
     phone: Optional[str] = Field(None, min_length=11, max_length=11)
 
 class UserPageResult(BaseModel):
-    total: int
+    total: Optional[int] = None  # 符合条件的总数（请求参数with_total=false时不统计，为None）
     rows: List[UserResponse]
+    next_cursor: Optional[str] = None  # 下一页游标（已是最后一页时为None）
+    prev_cursor: Optional[str] = None  # 上一页游标（已是第一页时为None）
     
     class Config:
         # API 文档示例数据
@@ -92,6 +94,8 @@ class UserPageResult(BaseModel):
                         "create_time": "2023-01-02T10:00:00",
                         "update_time": "2023-01-02T10:00:00"
                     }
-                ]
+                ],
+                "next_cursor": "eyJrIjpbMl0sImIiOmZhbHNlfQ",
+                "prev_cursor": None
             }
         }
\ No newline at end of file
@@ -2,11 +2,12 @@ from datetime import datetime
 from typing import Optional, Annotated, List
 
 from fastapi import APIRouter, Depends, Query, Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.JSON_schemas.Result_pydantic import Result
-from app.JSON_schemas.alarm_pydantic import AlarmPageResponse, AlarmReport, TopAlarmAreasReport, TodayAlarmHandleReport
-from app.dependencies.db import get_db
+from app.JSON_schemas.alarm_pydantic import AlarmPageResponse, AlarmReport, TopAlarmAreasReport, TodayAlarmHandleReport, AlarmHistogram
+from app.dependencies.db import get_db, get_async_db
 from app.services.alarm_service import AlarmService
 
 # 创建路由实例（tags 用于 API 文档分类）
@@ -18,7 +19,7 @@ router = APIRouter()
             summary="获取最近5条未解决的告警记录+ 未解决的告警总数")
 async def get_recent_unresolved_alarms(
         limit: Optional[int] = Query(5, description="限制返回的记录数", le=10),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取最近5条未解决的告警记录（alarm_status in [0,2]）
@@ -32,7 +33,7 @@ async def get_recent_unresolved_alarms(
 # GET /api/v1/alarms/today_report：获取本日告警统计
 @router.get("/today_report", response_model=Result[AlarmReport], summary="获取本日告警统计（饼状图）")
 async def get_today_alarm_report(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取本日告警统计信息，按告警类型分组
@@ -44,7 +45,7 @@ async def get_today_alarm_report(
 # GET /api/v1/alarms/all_report：获取所有告警统计
 @router.get("/all_report", response_model=Result[AlarmReport], summary="获取所有告警统计（饼状图）")
 async def get_all_alarm_report(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取所有告警统计信息，按告警类型分组
@@ -55,7 +56,7 @@ async def get_all_alarm_report(
 # GET /api/v1/alarms/top3_areas：获取告警数位居前3的园区区域统计
 @router.get("/top3_areas", response_model=Result[TopAlarmAreasReport], summary="获取告警数位居前3的园区区域统计（柱状图）")
 async def get_top3_alarm_areas(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取告警数位居前3的园区区域统计信息，如 "工地 A 区 28 次、仓库 C 区 15 次、办公区 3 次"
@@ -67,7 +68,7 @@ async def get_top3_alarm_areas(
 # GET /api/v1/alarms/today_handle_report：获取本日告警处理统计
 @router.get("/today_handle_report", response_model=Result[TodayAlarmHandleReport], summary="获取本日告警处理统计")
 async def get_today_alarm_handle_report(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取本日告警处理率、未处理告警数统计信息，如 "今日处理率 96%，2 条未处理"
@@ -76,6 +77,38 @@ async def get_today_alarm_handle_report(
     return result
 
 
+# GET /api/v1/alarms/histogram：获取告警趋势（按分钟/小时/天统计告警数）
+@router.get("/histogram", response_model=Result[AlarmHistogram], summary="获取告警趋势（按分钟/小时/天统计告警数，折线图）")
+async def get_alarm_histogram(
+    start_time: datetime = Query(..., description="时间范围左边界"),
+    end_time: datetime = Query(..., description="时间范围右边界"),
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$", description="时间桶宽度: minute-分钟, hour-小时, day-天"),
+    camera_id: Optional[int] = Query(None, description="摄像头ID"),
+    park_area_id: Optional[int] = Query(None, description="园区区域ID"),
+    alarm_type: Optional[int] = Query(None, description="告警类型: 0-安全规范, 1-区域入侵, 2-火警"),
+    alarm_status: Optional[int] = Query(None, description="告警状态: 0-未处理, 1-确认误报, 2-处理中, 3-处理完成"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取告警趋势：时间范围内每个时间桶的告警数（没有告警的时间桶补0，最多5000个时间桶）
+
+    按园区区域筛选时：hour/day按告警时摄像头所在的园区区域统计，minute按摄像头当前所在的园区区域统计
+
+    参数说明:
+    - start_time: 时间范围左边界
+    - end_time: 时间范围右边界
+    - bucket: 时间桶宽度（hour/day由告警小时统计表汇总，包含已归档的告警；minute在告警表中按分钟计数，不含已归档的告警）
+    - camera_id: 摄像头筛选
+    - park_area_id: 园区区域筛选
+    - alarm_type: 告警类型筛选
+    - alarm_status: 告警状态筛选
+    """
+    result = await AlarmService.get_alarm_histogram(
+        db, start_time, end_time, bucket, camera_id, park_area_id, alarm_type, alarm_status
+    )
+    return result
+
+
 # GET /api/v1/alarms：根据条件获取告警记录列表（支持分页）
 @router.get("/", response_model=Result[AlarmPageResponse], summary="根据条件获取告警记录列表（支持分页）")
 async def get_alarms(
@@ -83,12 +116,14 @@ async def get_alarms(
     end_time: Optional[datetime] = Query(None, description="告警触发时间右边界"),
     alarm_type: Optional[int] = Query(None, description="告警类型: 0-安全规范, 1-区域入侵, 2-火警"),
     alarm_status: Optional[int] = Query(None, description="告警状态: 0-未处理, 1-确认误报, 2-处理中, 3-处理完成"),
-    skip: int = Query(0, description="跳过的记录数"),
+    skip: int = Query(0, description="跳过的记录数（仅在不传cursor时生效，深分页请使用cursor）"),
     limit: int = Query(10, description="限制返回的记录数"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="翻页游标：上一次返回的next_cursor（下一页）或prev_cursor（上一页）"),
+    with_total: bool = Query(True, description="是否返回总数（翻页时可传false，省去计数查询）"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    根据条件获取告警记录列表（支持分页）
+    根据条件获取告警记录列表（游标分页，按告警时间倒序）
 
     参数说明:
     - start_time: 告警触发时间起始时间
@@ -97,9 +132,11 @@ async def get_alarms(
     - alarm_status: 告警状态筛选
     - skip: 分页参数，跳过的记录数
     - limit: 分页参数，限制返回的记录数
+    - cursor: 分页参数，翻页游标（翻页时筛选条件需与第一页一致）
+    - with_total: 是否返回总数
     """
     result = await AlarmService.get_alarms_with_condition(
-        db, start_time, end_time, alarm_type, alarm_status, skip, limit
+        db, start_time, end_time, alarm_type, alarm_status, skip, limit, cursor, with_total
     )
     return result
 
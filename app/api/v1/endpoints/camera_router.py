@@ -1,9 +1,10 @@
 from typing import List, Annotated, Optional
 from fastapi import APIRouter, Depends, status, Path, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
-from app.JSON_schemas.camera_info_pydantic import CameraInfoResponse, CameraInfoCreate, CameraInfoUpdate, CameraInfoPageResponse, CameraStatusReport
-from app.dependencies.db import get_db  # 获取数据库会话的依赖
+from app.JSON_schemas.camera_info_pydantic import CameraInfoResponse, CameraInfoCreate, CameraInfoUpdate, CameraInfoPageResponse, CameraStatusReport, CameraProbeReport
+from app.dependencies.db import get_db, get_async_db  # 获取数据库会话的依赖
 from app.services.camera_info_service import CameraInfoService  # 导入service层代码负责业务逻辑
 from app.dependencies.security import get_current_active_user, User
 
@@ -13,7 +14,7 @@ router = APIRouter()
 # 1. GET /api/v1/camera_infos/status_report：获取摄像头状态统计
 @router.get("/status_report", response_model=Result[CameraStatusReport], summary="获取摄像头状态统计")
 async def get_camera_status_report(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取摄像头状态统计信息，如 "在线 48/50 路，2 路离线"
@@ -34,12 +35,14 @@ async def search_camera_infos(
         park_area_id: Annotated[Optional[int], Query(description="园区区域ID")] = None,
         analysis_mode: Annotated[Optional[int], Query(description="分析模式: 0-无，1-全部(安全规范+区域入侵+火警)，2-安全规范，3-区域入侵，4-火警")] = None,
         camera_status: Annotated[Optional[int], Query(description="摄像头状态: 0-离线，1-在线(未开启安防检测)，2-在线(安防检测中)")] = None,
-        skip: Annotated[int, Query(description="跳过的记录数")] = 0,
+        skip: Annotated[int, Query(description="跳过的记录数（仅在不传cursor时生效）")] = 0,
         limit: Annotated[int, Query(description="限制返回的记录数")] = 10,
-        db: Session = Depends(get_db)
+        cursor: Annotated[Optional[str], Query(description="翻页游标：上一次返回的next_cursor或prev_cursor")] = None,
+        with_total: Annotated[bool, Query(description="是否返回总数")] = True,
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
-    根据条件获取摄像头信息（支持分页）
+    根据条件获取摄像头信息（游标分页，按摄像头ID升序）
 
     Args:
         park_area_id (Optional[int]): 园区区域ID
@@ -47,13 +50,15 @@ async def search_camera_infos(
         camera_status (Optional[int]): 摄像头状态: 0-离线，1-在线(未开启安防检测)，2-在线(安防检测中)
         skip (int): 跳过的记录数
         limit (int): 限制返回的记录数
+        cursor (Optional[str]): 翻页游标
+        with_total (bool): 是否返回总数
         db (Session): 数据库会话
 
     Returns:
         Result[CameraInfoPageResponse]: 包含摄像头信息分页结果的统一响应
     """
     result = await CameraInfoService.get_camera_infos_with_condition(
-        db, park_area_id, analysis_mode, camera_status, skip, limit
+        db, park_area_id, analysis_mode, camera_status, skip, limit, cursor, with_total
     )
     return result
 
@@ -61,7 +66,7 @@ async def search_camera_infos(
 @router.get("/{camera_info_id}", response_model=Result[CameraInfoResponse], summary="获取单个摄像头信息", status_code=status.HTTP_200_OK)
 async def read_camera_info(
     camera_info_id: Annotated[int, Path(title="摄像头信息ID", description="摄像头信息唯一标识")],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     根据ID获取单个摄像头信息
@@ -152,4 +157,16 @@ async def test_camera_connection_status(
         Result: 测试结果的统一响应
     """
     result = await CameraInfoService.test_camera_connection(camera_id, db)
-    return result
\ No newline at end of file
+    return result
+
+# 8. POST /api/v1/camera_infos/probe ：立即探测所有摄像头的连通性并同步摄像头状态
+@router.post("/probe", response_model=Result[CameraProbeReport], summary="探测所有摄像头连通性并同步摄像头状态", status_code=status.HTTP_200_OK)
+async def probe_all_cameras():
+    """
+    并发探测所有摄像头的连通性（后台也会周期性执行），状态有变化的摄像头批量写回数据库
+
+    Returns:
+        Result[CameraProbeReport]: 探测统计的统一响应
+    """
+    result = await CameraInfoService.probe_all_cameras()
+    return result
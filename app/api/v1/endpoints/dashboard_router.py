@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.JSON_schemas.Result_pydantic import Result
+from app.JSON_schemas.dashboard_pydantic import DashboardSummary
+from app.dependencies.db import get_async_db
+from app.services.dashboard_service import DashboardService
+
+# 创建路由实例（tags 用于 API 文档分类）
+router = APIRouter()
+
+
+# GET /api/v1/dashboard/summary：一次获取看板所有组件的数据
+@router.get("/summary", response_model=Result[DashboardSummary], summary="获取看板所有组件的数据（告警统计、处理统计、区域排行、最近未解决告警、摄像头状态）")
+async def get_dashboard_summary(
+        recent_limit: Optional[int] = Query(5, description="最近未解决告警的条数", le=10),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    一次获取看板所有组件的数据，代替以下六个接口：
+    /alarms/today_report、/alarms/all_report、/alarms/today_handle_report、/alarms/top3_areas、
+    /alarms/recent_unresolved、/camera_infos/status_report
+
+    参数说明:
+    - recent_limit: 最近未解决告警的条数，最大10条，默认5条
+    """
+    result = await DashboardService.get_summary(db, recent_limit)
+    return result
@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+
+from app.JSON_schemas.Result_pydantic import Result
+from app.config.database import engine, analysis_engine, async_engine, get_pool_metrics
+from app.services.alarm_write_queue import alarm_write_queue
+from app.services.oss_delete_queue import oss_delete_queue
+from app.services.safety_analysis_service import SafetyAnalysisService
+from app.services.thread_pool_manager import get_executor_metrics
+from app.utils.response_cache import response_cache
+
+# 创建路由实例（tags 用于 API 文档分类）
+router = APIRouter()
+
+
+# 1. GET /api/v1/metrics：运行状态指标
+@router.get("", response_model=Result, summary="获取服务运行状态指标", status_code=200)
+def get_metrics():
+    """
+    获取服务运行状态指标
+
+    Returns:
+        Result: 统一响应，data为各组件的状态指标
+        - alarm_rate_limiter: 告警限流器状态（每个摄像头每种告警类型的剩余令牌数、放行数、抑制数）
+        - alarm_write_queue: 告警写入队列状态（待写入数、批次数、平均批大小、最近一批耗时）
+        - oss_delete_queue: OSS文件删除队列状态（待删除数、批次数、已删除数、失败次数）
+        - response_cache: 看板接口响应缓存状态（缓存条数、命中数、未命中数、合并等待数、失效次数）
+        - db_pools: 数据库连接池状态（api为接口写操作使用的连接池，api_async为查询接口使用的异步连接池，analysis为安防分析子系统使用的连接池）
+        - executors: 线程池状态（db/upload/alarm，正在执行的任务数、队列深度、排队等待时间、被拒绝/丢弃的任务数）
+    """
+    return Result.SUCCESS({
+        "alarm_rate_limiter": SafetyAnalysisService.alarm_rate_limiter.get_metrics(),
+        "alarm_write_queue": alarm_write_queue.get_metrics(),
+        "oss_delete_queue": oss_delete_queue.get_metrics(),
+        "response_cache": response_cache.get_metrics(),
+        "db_pools": {
+            "api": get_pool_metrics(engine),
+            "api_async": get_pool_metrics(async_engine.sync_engine),
+            "analysis": get_pool_metrics(analysis_engine),
+        },
+        "executors": get_executor_metrics(),
+    })
@@ -1,9 +1,10 @@
 from typing import List, Annotated, Optional
 from fastapi import APIRouter, Depends, status, Path, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
 from app.JSON_schemas.park_area_pydantic import ParkAreaResponse, ParkAreaCreate, ParkAreaUpdate, ParkAreaPageResponse
-from app.dependencies.db import get_db  # 获取数据库会话的依赖
+from app.dependencies.db import get_db, get_async_db  # 获取数据库会话的依赖
 from app.services.park_area_service import ParkAreaService  # 导入service层代码负责业务逻辑
 
 # 创建路由实例（tags 用于 API 文档分类）
@@ -17,7 +18,7 @@ async def search_park_areas(
         park_area: Annotated[Optional[str], Query(description="园区区域名称")] = None,
         skip: Annotated[int, Query(description="跳过的记录数")] = 0,
         limit: Annotated[int, Query(description="限制返回的记录数")] = 10,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     根据条件获取园区区域信息（支持分页）
@@ -42,7 +43,7 @@ async def search_park_areas(
             status_code=status.HTTP_200_OK)
 async def read_park_area(
         park_area_id: Annotated[int, Path(title="园区区域ID", description="园区区域唯一标识")],
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     根据ID获取单个园区区域信息
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
 from app.dependencies.db import get_db
 from app.JSON_schemas.Result_pydantic import Result
+from app.services.preview_service import PreviewService, MJPEG_BOUNDARY
 from app.services.safety_analysis_service import SafetyAnalysisService
 from app.services.websocket_manager import manager
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Path
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Annotated
 
 # 创建路由实例（tags 用于 API 文档分类）
@@ -70,4 +72,29 @@ async def websocket_endpoint(websocket: WebSocket):
             # 可以处理来自客户端的消息（如果需要）
             await websocket.send_text(f"Message text was: {data}")
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
\ No newline at end of file
+        manager.disconnect(websocket)
+
+# 4. GET /api/v1/safety_analysis/preview/{camera_id}：某个摄像头的实时预览（MJPEG流，画面带检测标注）
+@router.get("/preview/{camera_id}", summary="某监控摄像头的实时预览（带检测标注）")
+async def preview_stream(
+    camera_id: Annotated[int, Path(title="摄像头ID", description="摄像头唯一标识")]
+):
+    """
+    某个摄像头的实时预览，以MJPEG流（multipart/x-mixed-replace）返回，可直接作为<img>标签的src
+
+    画面来自正在运行的安防分析线程（复用其检测标注结果，不会再次推理），每帧只编码一次，所有观看者共享；
+    客户端接收较慢时自动跳过中间帧，只接收最新画面
+
+    Args:
+        camera_id (int): 摄像头唯一标识
+
+    Returns:
+        StreamingResponse: MJPEG流；摄像头未开启安防分析时返回失败的统一响应
+    """
+    if not PreviewService.is_live(camera_id):
+        return JSONResponse(Result.ERROR(f"摄像头 {camera_id} 未开启安防分析，无法预览").model_dump())
+    return StreamingResponse(
+        PreviewService.mjpeg_stream(camera_id),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache"}
+    )
@@ -1,9 +1,10 @@
 from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, status, Path, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
 from app.JSON_schemas.user_pydantic import UserResponse, UserCreate, UserUpdate, UserPageResult
-from app.dependencies.db import get_db
+from app.dependencies.db import get_db, get_async_db
 from app.services.user_service import UserService
 
 router = APIRouter()
@@ -12,7 +13,7 @@ router = APIRouter()
 @router.get("/{user_id}", response_model=Result[UserResponse], summary="获取单个用户信息", status_code=status.HTTP_200_OK)
 async def read_user(
     user_id: Annotated[int, Path(title="用户ID", description="用户唯一标识")],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     根据用户ID获取单个用户信息
@@ -36,18 +37,22 @@ async def get_users(
         gender: Annotated[Optional[int], Query(description="用户性别: 0-女 1-男")] = None,
         start_time: Annotated[Optional[str], Query(description="入职时间左边界")] = None,
         end_time: Annotated[Optional[str], Query(description="入职时间右边界")] = None,
-        db: Session = Depends(get_db)
+        cursor: Annotated[Optional[str], Query(description="翻页游标：上一次返回的next_cursor或prev_cursor")] = None,
+        with_total: Annotated[bool, Query(description="是否返回总数")] = True,
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
-    获取用户信息（支持条件分页）
+    获取用户信息（支持条件分页，游标分页按用户ID升序）
 
     Args:
-        skip (int): 跳过的记录数
+        skip (int): 跳过的记录数（仅在不传cursor时生效）
         limit (int): 限制返回的记录数
         name (Optional[str]): 用户姓名筛选条件
         gender (Optional[int]): 用户性别筛选条件
         start_time (Optional[str]): 入职时间左边界
         end_time (Optional[str]): 入职时间右边界
+        cursor (Optional[str]): 翻页游标
+        with_total (bool): 是否返回总数
         db (Session): 数据库会话
 
     Returns:
@@ -55,7 +60,8 @@ async def get_users(
     """
     result = await UserService.get_users(db, skip=skip, limit=limit,
                                              name=name, gender=gender, 
-                                             start_time=start_time, end_time=end_time)
+                                             start_time=start_time, end_time=end_time,
+                                             cursor=cursor, with_total=with_total)
     return result
 
 # 3. POST /api/v1/users：创建新用户  
@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -18,3 +21,68 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL,echo=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 基类
 Base = declarative_base()
+
+
+# -------------------------- 安防分析子系统专用连接池 --------------------------
+# 分析线程、告警写入队列、后台探测/汇总等后台任务使用独立的引擎和连接池，不与接口请求共用会话和连接；
+# 每个任务/批次打开一个短生命周期的会话，用完即还回连接池
+ANALYSIS_DB_POOL_SIZE = int(os.getenv("ANALYSIS_DB_POOL_SIZE", 5))              # 常驻连接数
+ANALYSIS_DB_MAX_OVERFLOW = int(os.getenv("ANALYSIS_DB_MAX_OVERFLOW", 5))        # 高峰时允许额外创建的连接数
+ANALYSIS_DB_POOL_TIMEOUT = float(os.getenv("ANALYSIS_DB_POOL_TIMEOUT", 10))     # 等待空闲连接的超时时间（秒）
+ANALYSIS_DB_POOL_RECYCLE = int(os.getenv("ANALYSIS_DB_POOL_RECYCLE", 1800))     # 连接最长使用时间（秒），避免被MySQL的wait_timeout断开
+
+analysis_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=ANALYSIS_DB_POOL_SIZE,
+    max_overflow=ANALYSIS_DB_MAX_OVERFLOW,
+    pool_timeout=ANALYSIS_DB_POOL_TIMEOUT,
+    pool_recycle=ANALYSIS_DB_POOL_RECYCLE,
+    pool_pre_ping=True,  # 取出连接时先检测是否可用，自动替换已断开的连接
+)
+AnalysisSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=analysis_engine)
+
+
+@contextmanager
+def analysis_session():
+    """后台任务使用的短生命周期会话：出错时回滚，结束时关闭并把连接还回连接池"""
+    db = AnalysisSessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# -------------------------- 接口查询专用异步连接池 --------------------------
+# 查询接口直接在事件循环中异步访问数据库，不再经过共享线程池（线程池只有4个线程，还要处理OSS上传）；
+# 默认使用aiomysql驱动连接同一个MySQL，ASYNC_DATABASE_URL可改为其他异步驱动（如测试时用sqlite+aiosqlite）
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or SQLALCHEMY_DATABASE_URL.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))              # 常驻连接数
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))        # 高峰时允许额外创建的连接数
+ASYNC_DB_POOL_TIMEOUT = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", 10))      # 等待空闲连接的超时时间（秒）
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **({} if ASYNC_DATABASE_URL.startswith("sqlite") else dict(
+        pool_size=ASYNC_DB_POOL_SIZE,
+        max_overflow=ASYNC_DB_MAX_OVERFLOW,
+        pool_timeout=ASYNC_DB_POOL_TIMEOUT,
+        pool_recycle=ANALYSIS_DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )),
+)
+# 提交后不过期对象属性，避免在返回响应时触发隐式的异步加载
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def get_pool_metrics(db_engine) -> dict:
+    """连接池状态（用于监控指标接口），异步引擎传入async_engine.sync_engine"""
+    pool = db_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
@@ -1,5 +1,5 @@
 from app.config.database import engine
-from app.DB_models import camera_info_db, alarm_db, user_db, alarm_handle_record_db, park_area_db
+from app.DB_models import camera_info_db, alarm_db, user_db, alarm_handle_record_db, park_area_db, alarm_storm_summary_db, alarm_stats_hourly_db
 
 # 创建所有表
 # park_area_db.Base.metadata.create_all(bind=engine)
@@ -7,5 +7,7 @@ from app.DB_models import camera_info_db, alarm_db, user_db, alarm_handle_record
 # alarm_db.Base.metadata.create_all(bind=engine)
 # user_db.Base.metadata.create_all(bind=engine)
 # alarm_handle_record_db.Base.metadata.create_all(bind=engine)
+# alarm_storm_summary_db.Base.metadata.create_all(bind=engine)
+# alarm_stats_hourly_db.Base.metadata.create_all(bind=engine)
 
 print("数据库表创建成功！")
\ No newline at end of file
@@ -0,0 +1,167 @@
+# 数据库结构迁移脚本（在已有数据库上增量变更表结构）
+# 用法：python -m app.config.migrate_db
+# 每个迁移步骤都是幂等的：先检查当前表结构，已经变更过的步骤会被跳过，可重复执行
+# 表结构变更完成后执行数据回填（分批提交，同样可重复执行）
+from sqlalchemy import inspect, text, select
+from sqlalchemy.orm import Session
+
+from app.config.database import engine
+from app.DB_models.alarm_stats_hourly_db import AlarmStatsHourlyDB
+from app.DB_models.alarm_storm_summary_db import AlarmStormSummaryDB
+from app.crud.alarm_archive_crud import get_archive_watermark
+from app.crud.alarm_stats_crud import rebuild_alarm_stats
+
+
+def _has_column(conn, table_name: str, column_name: str) -> bool:
+    return any(column["name"] == column_name for column in inspect(conn).get_columns(table_name))
+
+
+def _has_index(conn, table_name: str, index_name: str) -> bool:
+    return any(index["name"] == index_name for index in inspect(conn).get_indexes(table_name))
+
+
+def add_alarm_video_clip_url(conn):
+    """alarm表新增video_clip_url列（告警视频片段URL）"""
+    if _has_column(conn, "alarm", "video_clip_url"):
+        return False
+    conn.execute(text("ALTER TABLE alarm ADD COLUMN video_clip_url VARCHAR(255) NULL AFTER snapshot_url"))
+    return True
+
+
+def add_alarm_open_index(conn):
+    """alarm表新增未结束告警索引（服务重启后恢复告警跟踪器状态）"""
+    if _has_index(conn, "alarm", "idx_alarm_open"):
+        return False
+    conn.execute(text("CREATE INDEX idx_alarm_open ON alarm (alarm_end_time, camera_id, alarm_type, alarm_time)"))
+    return True
+
+
+def _create_index_online(conn, table_name: str, index_name: str, columns: str) -> bool:
+    """在线创建索引（InnoDB原地建索引，不阻塞告警写入），索引已存在时跳过"""
+    if _has_index(conn, table_name, index_name):
+        return False
+    conn.execute(text(f"CREATE INDEX {index_name} ON {table_name} ({columns}) ALGORITHM=INPLACE LOCK=NONE"))
+    return True
+
+
+def add_alarm_query_indexes(conn):
+    """alarm表新增告警列表、本日统计、最近未解决告警查询使用的组合索引"""
+    applied = _create_index_online(conn, "alarm", "idx_alarm_time_type_status", "alarm_time, alarm_type, alarm_status")
+    applied |= _create_index_online(conn, "alarm", "idx_alarm_type_time", "alarm_type, alarm_time")
+    applied |= _create_index_online(conn, "alarm", "idx_alarm_status_time", "alarm_status, alarm_time")
+    return applied
+
+
+def add_alarm_page_index(conn):
+    """alarm表新增(alarm_time, alarm_id)组合索引（告警列表按告警时间倒序游标分页）"""
+    return _create_index_online(conn, "alarm", "idx_alarm_time_id", "alarm_time, alarm_id")
+
+
+def add_alarm_handle_latest_index(conn):
+    """alarm_handle_record表新增(alarm_id, handle_time)组合索引（查询每条告警的最新处理记录）"""
+    return _create_index_online(conn, "alarm_handle_record", "idx_handle_alarm_time", "alarm_id, handle_time")
+
+
+def add_alarm_latest_handle_columns(conn):
+    """alarm表新增latest_handle_user_id、latest_handle_time列（最新处理人和处理时间，告警列表无需再聚合处理记录表）"""
+    if _has_column(conn, "alarm", "latest_handle_user_id"):
+        return False
+    conn.execute(text(
+        "ALTER TABLE alarm ADD COLUMN latest_handle_user_id INT NULL AFTER video_clip_url, "
+        "ADD COLUMN latest_handle_time DATETIME NULL AFTER latest_handle_user_id"
+    ))
+    return True
+
+
+def create_alarm_storm_summary_table(conn):
+    """新建alarm_storm_summary表（被限流告警的汇总记录）"""
+    if inspect(conn).has_table(AlarmStormSummaryDB.__tablename__):
+        return False
+    AlarmStormSummaryDB.__table__.create(conn)
+    return True
+
+
+def create_alarm_stats_hourly_table(conn):
+    """新建alarm_stats_hourly表（按小时、摄像头、告警类型、告警状态汇总的告警数，统计报表直接读取）"""
+    if inspect(conn).has_table(AlarmStatsHourlyDB.__tablename__):
+        return False
+    AlarmStatsHourlyDB.__table__.create(conn)
+    return True
+
+
+# 按顺序执行的迁移步骤
+MIGRATIONS = [
+    add_alarm_video_clip_url,
+    add_alarm_open_index,
+    create_alarm_storm_summary_table,
+    add_alarm_query_indexes,
+    add_alarm_handle_latest_index,
+    add_alarm_latest_handle_columns,
+    add_alarm_page_index,
+    create_alarm_stats_hourly_table,
+]
+
+# 数据回填每批处理的告警数（每批单独提交，避免长事务锁住大量告警记录）
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_alarm_latest_handle(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    按告警ID分批回填alarm表的latest_handle_user_id、latest_handle_time（取每条告警处理时间最新的处理记录）
+
+    只处理尚未回填且有处理记录的告警，可重复执行；新处理记录在创建时已同步更新这两列，不会被覆盖
+
+    Returns:
+        int: 回填的告警数
+    """
+    latest_record = (
+        "FROM alarm_handle_record r WHERE r.alarm_id = alarm.alarm_id "
+        "ORDER BY r.handle_time DESC, r.handle_id DESC LIMIT 1"
+    )
+    backfill_sql = text(
+        f"UPDATE alarm SET "
+        f"latest_handle_user_id = (SELECT r.handler_user_id {latest_record}), "
+        f"latest_handle_time = (SELECT r.handle_time {latest_record}) "
+        f"WHERE alarm_id BETWEEN :first_id AND :last_id AND latest_handle_time IS NULL "
+        f"AND EXISTS (SELECT 1 FROM alarm_handle_record r WHERE r.alarm_id = alarm.alarm_id)"
+    )
+    backfilled_count = 0
+    last_id = -1
+    while True:
+        with engine.begin() as conn:
+            alarm_ids = conn.execute(
+                text("SELECT alarm_id FROM alarm WHERE alarm_id > :last_id ORDER BY alarm_id LIMIT :batch_size"),
+                {"last_id": last_id, "batch_size": batch_size}
+            ).scalars().all()
+            if not alarm_ids:
+                return backfilled_count
+            last_id = alarm_ids[-1]
+            backfilled_count += conn.execute(backfill_sql, {"first_id": alarm_ids[0], "last_id": last_id}).rowcount
+
+
+def backfill_alarm_stats() -> int:
+    """
+    告警小时统计表为空时按告警表生成统计（之后由告警的增删改增量维护）
+
+    Returns:
+        int: 生成的统计行数，表中已有统计时为0
+    """
+    with Session(engine) as db:
+        if db.execute(select(AlarmStatsHourlyDB.stat_hour).limit(1)).first() is not None:
+            return 0
+        return rebuild_alarm_stats(db, get_archive_watermark())
+
+
+def run_migrations():
+    """依次执行所有迁移步骤"""
+    for migration in MIGRATIONS:
+        with engine.begin() as conn:
+            applied = migration(conn)
+        print(f"{migration.__name__}: {'已执行' if applied else '无需执行（已是最新）'}")
+    print(f"backfill_alarm_latest_handle: 回填 {backfill_alarm_latest_handle()} 条告警")
+    print(f"backfill_alarm_stats: 生成 {backfill_alarm_stats()} 行告警小时统计")
+
+
+if __name__ == '__main__':
+    run_migrations()
+    print("数据库迁移完成！")
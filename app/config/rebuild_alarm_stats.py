@@ -0,0 +1,25 @@
+# 按告警表重建告警小时统计（alarm_stats_hourly）
+# 用法：python -m app.config.rebuild_alarm_stats [起始时间，如 "2026-01-01 00:00:00" | all]
+# 默认从归档水位开始重建：已归档的告警不在告警表中，归档前的统计保持不变；传入all时清空后全部重建
+# 注意：重建的统计按摄像头当前所在的园区区域计，摄像头换过园区区域时，重建范围内的历史告警会计入新区域
+import sys
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.config.database import engine
+from app.crud.alarm_archive_crud import get_archive_watermark
+from app.crud.alarm_stats_crud import rebuild_alarm_stats
+
+if __name__ == '__main__':
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    if arg == "all":
+        start_time = None
+    elif arg:
+        start_time = datetime.fromisoformat(arg)
+    else:
+        start_time = get_archive_watermark()
+    with Session(engine) as db:
+        count = rebuild_alarm_stats(db, start_time)
+    print(f"已重建告警小时统计（{start_time or '全部'}起）：{count} 行")
+    print("注意：重建的统计按摄像头当前所在的园区区域计，摄像头换过园区区域时历史告警会计入新区域")
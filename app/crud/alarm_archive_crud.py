@@ -0,0 +1,260 @@
+# 告警冷数据归档（按告警日期分区的Parquet文件）
+# 目录结构：
+#   {ALARM_ARCHIVE_DIR}/alarm/date=YYYY-MM-DD/alarms.parquet                     告警记录（含归档时的摄像头名称、园区区域、最新处理人姓名）
+#   {ALARM_ARCHIVE_DIR}/alarm_handle_record/date=YYYY-MM-DD/records.parquet      告警处理记录（按所属告警的日期分区）
+#   {ALARM_ARCHIVE_DIR}/watermark.json                                           归档水位：告警时间早于该时间的告警都已移入归档
+import json
+import os
+from datetime import datetime, date
+from pathlib import Path
+from typing import Optional, List, NamedTuple, Dict, Sequence, Tuple, Iterable
+
+import polars as pl
+from dotenv import load_dotenv
+from sqlalchemy import Integer, DateTime
+
+from app.DB_models.alarm_db import AlarmDB
+from app.DB_models.alarm_handle_record_db import AlarmHandleRecordDB
+
+load_dotenv()
+
+ALARM_ARCHIVE_DIR = Path(os.getenv("ALARM_ARCHIVE_DIR", "data/alarm_archive"))
+ALARM_PARTITION_DIR = ALARM_ARCHIVE_DIR / "alarm"
+HANDLE_RECORD_PARTITION_DIR = ALARM_ARCHIVE_DIR / "alarm_handle_record"
+WATERMARK_PATH = ALARM_ARCHIVE_DIR / "watermark.json"
+
+# 告警列表联表查询所得字段（归档时一并保存）
+ALARM_DETAIL_COLUMNS = ("camera_name", "park_area", "handle_user_name")
+
+
+class ArchivedAlarmRow(NamedTuple):
+    """归档告警记录，字段与告警列表联表查询结果一致（AlarmDB为不关联会话的对象）"""
+    AlarmDB: AlarmDB
+    camera_name: Optional[str]
+    park_area: Optional[str]
+    handle_user_name: Optional[str]
+
+
+def _polars_schema(table, extra_columns: Sequence[str] = ()) -> Dict[str, pl.DataType]:
+    """按数据库表结构生成Parquet文件的列类型"""
+    schema = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            schema[column.name] = pl.Datetime("us")
+        elif isinstance(column.type, Integer):
+            schema[column.name] = pl.Int64
+        else:
+            schema[column.name] = pl.Utf8
+    for name in extra_columns:
+        schema[name] = pl.Utf8
+    return schema
+
+
+ALARM_ARCHIVE_SCHEMA = _polars_schema(AlarmDB.__table__, ALARM_DETAIL_COLUMNS)
+HANDLE_RECORD_ARCHIVE_SCHEMA = _polars_schema(AlarmHandleRecordDB.__table__)
+ALARM_COLUMNS = [column.name for column in AlarmDB.__table__.columns]
+HANDLE_RECORD_COLUMNS = [column.name for column in AlarmHandleRecordDB.__table__.columns]
+
+_watermark_cache: Tuple[Optional[float], Optional[datetime]] = (None, None)  # (文件修改时间, 归档水位)
+_count_cache: Dict[tuple, int] = {}  # (筛选条件, 分区文件及其修改时间) -> 归档告警数
+# 最多缓存的统计条件数，超出后清空重新缓存
+ARCHIVE_COUNT_CACHE_SIZE = 1024
+
+
+def get_archive_watermark() -> Optional[datetime]:
+    """
+    获取归档水位（多个服务进程共用同一份文件，文件修改后重新读取）
+
+    Returns:
+        Optional[datetime]: 告警时间早于该时间的告警都已移入归档，尚未归档过时为None
+    """
+    global _watermark_cache
+    try:
+        mtime = WATERMARK_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if _watermark_cache[0] != mtime:
+        archived_before = json.loads(WATERMARK_PATH.read_text(encoding="utf-8"))["archived_before"]
+        _watermark_cache = (mtime, datetime.fromisoformat(archived_before))
+    return _watermark_cache[1]
+
+
+def set_archive_watermark(archived_before: datetime):
+    """更新归档水位（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+    ALARM_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = WATERMARK_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"archived_before": archived_before.isoformat()}), encoding="utf-8")
+    os.replace(tmp_path, WATERMARK_PATH)
+
+
+def _partition_path(base_dir: Path, day: date, file_name: str) -> Path:
+    return base_dir / f"date={day.isoformat()}" / file_name
+
+
+def _write_partition(path: Path, frame: pl.DataFrame, key: str, sort_by: List[str]):
+    """写入分区文件：与已有文件合并并按主键去重（重复归档同一天的数据不会产生重复记录）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        frame = pl.concat([pl.read_parquet(path), frame], how="vertical_relaxed")
+    frame = frame.unique(subset=[key], keep="last").sort(sort_by)
+    tmp_path = path.with_suffix(".tmp")
+    frame.write_parquet(tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def write_archive_partition(day: date, alarm_rows: List[dict], handle_record_rows: List[dict]):
+    """
+    将一天的告警和处理记录写入归档分区
+
+    Args:
+        day: 告警日期
+        alarm_rows: 告警记录（AlarmDB的所有列，以及camera_name、park_area、handle_user_name）
+        handle_record_rows: 这些告警的处理记录（AlarmHandleRecordDB的所有列）
+    """
+    if alarm_rows:
+        _write_partition(
+            _partition_path(ALARM_PARTITION_DIR, day, "alarms.parquet"),
+            pl.DataFrame(alarm_rows, schema=ALARM_ARCHIVE_SCHEMA, orient="row"),
+            "alarm_id", ["alarm_time", "alarm_id"]
+        )
+    if handle_record_rows:
+        _write_partition(
+            _partition_path(HANDLE_RECORD_PARTITION_DIR, day, "records.parquet"),
+            pl.DataFrame(handle_record_rows, schema=HANDLE_RECORD_ARCHIVE_SCHEMA, orient="row"),
+            "handle_id", ["alarm_id", "handle_time", "handle_id"]
+        )
+
+
+def _alarm_partitions(start_time: Optional[datetime], end_time: Optional[datetime]) -> List[Tuple[date, Path]]:
+    """时间范围内的告警分区（按日期升序），只读取可能包含结果的文件"""
+    partitions = []
+    for path in ALARM_PARTITION_DIR.glob("date=*/alarms.parquet"):
+        day = date.fromisoformat(path.parent.name[len("date="):])
+        if start_time and day < start_time.date() or end_time and day > end_time.date():
+            continue
+        partitions.append((day, path))
+    return sorted(partitions)
+
+
+def _alarm_filter(start_time: Optional[datetime], end_time: Optional[datetime],
+                  alarm_type: Optional[int], alarm_status: Optional[int]) -> pl.Expr:
+    """与告警列表相同的筛选条件"""
+    predicate = pl.lit(True)
+    if start_time:
+        predicate &= pl.col("alarm_time") >= start_time
+    if end_time:
+        predicate &= pl.col("alarm_time") <= end_time
+    if alarm_type is not None:
+        predicate &= pl.col("alarm_type") == alarm_type
+    if alarm_status is not None:
+        predicate &= pl.col("alarm_status") == alarm_status
+    return predicate
+
+
+def query_archived_alarms(
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None,
+        after: Optional[Sequence] = None,
+        backward: bool = False,
+        limit: int = 10
+) -> List[ArchivedAlarmRow]:
+    """
+    查询归档告警（按(alarm_time, alarm_id)游标分页，与告警列表排序一致）
+
+    按日期逐个读取分区，取够记录数后不再读取更早（向前翻页时为更晚）的分区
+
+    Args:
+        start_time: 告警触发时间左边界
+        end_time: 告警触发时间右边界
+        alarm_type: 告警类型
+        alarm_status: 告警状态
+        after: 游标位置的(alarm_time, alarm_id)，只返回排在其后的记录
+        backward: 是否向前翻页（按告警时间升序返回）
+        limit: 最多返回的记录数
+
+    Returns:
+        List[ArchivedAlarmRow]: 归档告警，向后翻页时按告警时间倒序，向前翻页时按告警时间升序
+    """
+    predicate = _alarm_filter(start_time, end_time, alarm_type, alarm_status)
+    partitions = _alarm_partitions(start_time, end_time)
+    if after is not None:
+        after_time, after_id = after
+        if backward:
+            predicate &= (pl.col("alarm_time") > after_time) | ((pl.col("alarm_time") == after_time) & (pl.col("alarm_id") > after_id))
+            partitions = [(day, path) for day, path in partitions if day >= after_time.date()]
+        else:
+            predicate &= (pl.col("alarm_time") < after_time) | ((pl.col("alarm_time") == after_time) & (pl.col("alarm_id") < after_id))
+            partitions = [(day, path) for day, path in partitions if day <= after_time.date()]
+    if not backward:
+        partitions.reverse()
+
+    frames = []
+    row_count = 0
+    for _, path in partitions:
+        frame = pl.scan_parquet(path).filter(predicate).collect()
+        if frame.height:
+            frames.append(frame)
+            row_count += frame.height
+            if row_count >= limit:
+                break
+    if not frames:
+        return []
+    archived = pl.concat(frames, how="vertical_relaxed").sort(
+        ["alarm_time", "alarm_id"], descending=not backward
+    ).head(limit)
+    return [
+        ArchivedAlarmRow(
+            AlarmDB(**{name: row[name] for name in ALARM_COLUMNS}),
+            row["camera_name"], row["park_area"], row["handle_user_name"]
+        )
+        for row in archived.iter_rows(named=True)
+    ]
+
+
+def count_archived_alarms(
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None
+) -> int:
+    """
+    统计符合条件的归档告警数（归档只在归档任务运行时变化，统计结果按分区文件的修改时间缓存，
+    任一服务进程写入归档后其他进程也会重新统计）
+
+    Returns:
+        int: 归档告警数
+    """
+    paths = [path for _, path in _alarm_partitions(start_time, end_time)]
+    key = (start_time, end_time, alarm_type, alarm_status, tuple((path, path.stat().st_mtime) for path in paths))
+    if key not in _count_cache:
+        count = pl.scan_parquet(paths).filter(
+            _alarm_filter(start_time, end_time, alarm_type, alarm_status)
+        ).select(pl.len()).collect().item() if paths else 0
+        if len(_count_cache) >= ARCHIVE_COUNT_CACHE_SIZE:
+            _count_cache.clear()
+        _count_cache[key] = count
+    return _count_cache[key]
+
+
+def get_archived_handle_records(alarm_id: int, days: Optional[Iterable[date]] = None) -> List[AlarmHandleRecordDB]:
+    """
+    查询归档告警的处理记录
+
+    Args:
+        alarm_id: 告警ID
+        days: 告警日期，只读取这些日期的分区；为None时（无法确定告警日期）读取全部分区
+
+    Returns:
+        List[AlarmHandleRecordDB]: 处理记录（不关联会话），按处理时间升序
+    """
+    if days is None:
+        paths = sorted(HANDLE_RECORD_PARTITION_DIR.glob("date=*/records.parquet"))
+    else:
+        paths = [path for path in (_partition_path(HANDLE_RECORD_PARTITION_DIR, day, "records.parquet") for day in sorted(set(days)))
+                 if path.exists()]
+    if not paths:
+        return []
+    records = pl.scan_parquet(paths).filter(pl.col("alarm_id") == alarm_id).sort(["handle_time", "handle_id"]).collect()
+    return [AlarmHandleRecordDB(**row) for row in records.iter_rows(named=True)]
@@ -1,12 +1,20 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, case, select, delete
+from sqlalchemy.dialects.mysql import insert
 from app.DB_models.alarm_db import AlarmDB
 from app.DB_models.alarm_handle_record_db import AlarmHandleRecordDB
 from app.DB_models.camera_info_db import CameraInfoDB
 from app.DB_models.user_db import UserDB
 from app.DB_models.park_area_db import ParkAreaDB
+from app.DB_models.alarm_stats_hourly_db import AlarmStatsHourlyDB
+from app.crud.alarm_archive_crud import get_archive_watermark, query_archived_alarms, count_archived_alarms
+from app.crud.alarm_stats_crud import apply_alarm_stats_deltas, alarm_stats_deltas, alarm_status_change_deltas
+from app.utils.id_generator import alarm_id_generator
+from app.utils.pagination import Page, keyset_stmt, keyset_page, decode_cursor, cached_count, async_cached_count
+from app.utils.response_cache import invalidate_response_cache, TAG_ALARM_COUNT, TAG_ALARM_DETAIL, TAG_ALARM_STATUS
 
 
 def create_alarm(
@@ -32,6 +40,7 @@ def create_alarm(
         AlarmDB: 新创建的报警记录对象
     """
     new_alarm = AlarmDB(
+        alarm_id=alarm_id_generator.next_id(),
         camera_id=camera_id,
         alarm_type=alarm_type,
         alarm_status=alarm_status,
@@ -39,11 +48,82 @@ def create_alarm(
         snapshot_url=snapshot_url,
     )
     db.add(new_alarm)
+    apply_alarm_stats_deltas(db, alarm_stats_deltas([new_alarm]))
     db.commit()
+    invalidate_response_cache(TAG_ALARM_COUNT)
     db.refresh(new_alarm)
     return new_alarm
 
 
+class AlarmIdConflictError(ValueError):
+    """告警ID已被另一条告警使用（如多个节点配置了相同的NODE_ID、时钟回拨后重启）"""
+
+
+def batch_create_alarms(db: Session, alarm_rows: List[dict]) -> List[AlarmDB | AlarmIdConflictError]:
+    """
+    批量创建报警记录（一条多行INSERT ... ON DUPLICATE KEY UPDATE）
+
+    报警ID由调用方预先生成（见app.utils.id_generator），同一批记录重复写入（如失败重试）不会产生重复告警，
+    告警小时统计也只累加此前不存在的告警；报警ID已被另一条告警（摄像头、告警类型或告警时间不同）使用时不写入，
+    对应位置返回AlarmIdConflictError，避免新告警的截图、结束时间等更新写到旧告警上
+
+    Args:
+        db (Session): 数据库会话
+        alarm_rows (List[dict]): 报警记录字段列表，每项包含alarm_id、camera_id、alarm_type、alarm_status、alarm_time、snapshot_url
+
+    Returns:
+        List[AlarmDB | AlarmIdConflictError]: 与alarm_rows一一对应的报警记录对象（不关联会话）或ID冲突错误
+    """
+    if not alarm_rows:
+        return []
+    now = datetime.now()
+    rows = [{**row, "create_time": now, "update_time": now} for row in alarm_rows]
+    existing = {
+        alarm_id: (camera_id, alarm_type, alarm_time)
+        for alarm_id, camera_id, alarm_type, alarm_time in db.execute(
+            select(AlarmDB.alarm_id, AlarmDB.camera_id, AlarmDB.alarm_type, AlarmDB.alarm_time).where(
+                AlarmDB.alarm_id.in_([row["alarm_id"] for row in rows])
+            )
+        ).all()
+    }
+
+    def conflicts(row) -> bool:
+        if row["alarm_id"] not in existing:
+            return False
+        camera_id, alarm_type, alarm_time = existing[row["alarm_id"]]
+        # 告警时间按秒比较（DATETIME列会舍入毫秒）；DATETIME列存的是本地时间且不带时区，
+        # 而分析线程提交的是带时区的当前时间（get_now），比较前统一去掉时区
+        return (camera_id != row["camera_id"] or alarm_type != row["alarm_type"]
+                or abs(alarm_time.replace(tzinfo=None) - row["alarm_time"].replace(tzinfo=None)) >= timedelta(seconds=1))
+
+    conflicted = [conflicts(row) for row in rows]
+    insert_rows = [row for row, conflict in zip(rows, conflicted) if not conflict]
+    if insert_rows:
+        stmt = insert(AlarmDB).values(insert_rows)
+        # 报警ID已存在（重试）时保持原记录不变（之后的截图、结束时间等更新不会被重试覆盖）
+        db.execute(stmt.on_duplicate_key_update(alarm_id=stmt.inserted.alarm_id))
+        apply_alarm_stats_deltas(db, alarm_stats_deltas(row for row in insert_rows if row["alarm_id"] not in existing))
+        db.commit()
+        invalidate_response_cache(TAG_ALARM_COUNT)
+    return [
+        AlarmIdConflictError(f"告警ID {row['alarm_id']} 已被另一条告警使用") if conflict else AlarmDB(**row)
+        for row, conflict in zip(rows, conflicted)
+    ]
+
+
+def get_max_alarm_id(db: Session) -> Optional[int]:
+    """
+    获取最大的报警ID（服务启动时恢复告警ID生成器的时间戳）
+
+    Args:
+        db (Session): 数据库会话
+
+    Returns:
+        Optional[int]: 最大的报警ID，没有告警时为None
+    """
+    return db.execute(select(func.max(AlarmDB.alarm_id))).scalar()
+
+
 def get_alarm_by_id(db: Session, alarm_id: int):
     """
     根据报警ID获取报警记录
@@ -57,6 +137,125 @@ def get_alarm_by_id(db: Session, alarm_id: int):
     """
     return db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).first()
 
+def _alarm_details_stmt():
+    """告警记录联表查询（摄像头名称、园区区域、最新处理人），供同步和异步查询共用"""
+    # 最新处理人直接取告警记录上的latest_handle_user_id，无需按alarm_id分组聚合处理记录表
+    return select(
+        AlarmDB,
+        CameraInfoDB.camera_name,
+        ParkAreaDB.park_area,
+        UserDB.name.label('handle_user_name')
+    ).outerjoin(
+        CameraInfoDB, AlarmDB.camera_id == CameraInfoDB.camera_id
+    ).outerjoin(
+        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
+    ).outerjoin(
+        UserDB, AlarmDB.latest_handle_user_id == UserDB.user_id
+    )
+
+
+# 告警列表的排序键：按告警时间倒序，同一时间按告警ID倒序（走(alarm_time, alarm_id)及(alarm_type/alarm_status, alarm_time, alarm_id)索引）
+ALARM_PAGE_KEYS = (AlarmDB.alarm_time, AlarmDB.alarm_id)
+
+
+def _alarm_page_key(alarm_row):
+    return alarm_row.AlarmDB.alarm_time, alarm_row.AlarmDB.alarm_id
+
+
+def _alarm_count_stmt(*conditions):
+    """符合条件的告警总数（只查alarm表：联查的摄像头、园区区域、处理人都是多对一，不影响总数）"""
+    return select(func.count(AlarmDB.alarm_id)).where(*conditions)
+
+
+def _alarm_conditions(
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None
+) -> list:
+    """告警列表的筛选条件"""
+    conditions = []
+
+    # 添加时间范围条件
+    if start_time and end_time:
+        conditions.append(AlarmDB.alarm_time.between(start_time, end_time))
+    elif start_time:
+        conditions.append(AlarmDB.alarm_time >= start_time)
+    elif end_time:
+        conditions.append(AlarmDB.alarm_time <= end_time)
+
+    # 添加告警类型条件
+    if alarm_type is not None:
+        conditions.append(AlarmDB.alarm_type == alarm_type)
+
+    # 添加告警状态条件
+    if alarm_status is not None:
+        conditions.append(AlarmDB.alarm_status == alarm_status)
+    return conditions
+
+
+def archive_watermark_in_range(start_time: Optional[datetime]) -> Optional[datetime]:
+    """查询的时间范围是否覆盖到已归档的告警，覆盖时返回归档水位"""
+    watermark = get_archive_watermark()
+    if watermark is None or (start_time is not None and start_time >= watermark):
+        return None
+    return watermark
+
+
+def _hot_alarms_for_merge_stmt(conditions: list, skip: int, limit: int, cursor: Optional[str]):
+    """时间范围覆盖归档时数据库一侧的查询：取够offset+limit+1条再与归档合并（归档中的告警都早于数据库中的告警，多数情况下只需查一边）"""
+    offset = 0 if cursor else skip
+    return keyset_stmt(_alarm_details_stmt().where(*conditions), ALARM_PAGE_KEYS, True, cursor, 0, offset + limit)
+
+
+def read_archived_alarms_for_merge(
+        hot_rows: list,
+        backward: bool,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Tuple[list, int]:
+    """
+    读取与数据库中的告警合并所需的归档告警（读取Parquet文件，异步调用方应在线程池中执行）
+
+    Args:
+        hot_rows (list): 数据库一侧的查询结果
+        backward (bool): 是否向前翻页
+        其余参数同get_alarms_with_condition
+
+    Returns:
+        Tuple[list, int]: (归档告警列表, 符合条件的归档告警数（不统计总数时为0）)
+    """
+    offset = 0 if cursor else skip
+    archived_rows = []
+    if backward or len(hot_rows) <= offset + limit:
+        after = decode_cursor(cursor, ALARM_PAGE_KEYS)[0] if cursor else None
+        archived_rows = query_archived_alarms(
+            start_time, end_time, alarm_type, alarm_status, after, backward, offset + limit + 1
+        )
+    archived_total = count_archived_alarms(start_time, end_time, alarm_type, alarm_status) if with_total else 0
+    return archived_rows, archived_total
+
+
+def merge_archived_alarm_page(hot_rows: list, archived_rows: list, backward: bool, skip: int, limit: int,
+                              cursor: Optional[str], total: Optional[int]) -> Page:
+    """
+    合并数据库中的告警和归档告警（按告警列表的排序），生成一页结果
+
+    归档后又写入的历史告警可能同时存在于两边（归档重试时），以数据库中的记录为准
+    """
+    offset = 0 if cursor else skip
+    hot_ids = {_alarm_page_key(row)[1] for row in hot_rows}
+    rows = list(hot_rows) + [row for row in archived_rows if row.AlarmDB.alarm_id not in hot_ids]
+    rows.sort(key=_alarm_page_key, reverse=not backward)
+    return keyset_page(rows[offset:offset + limit + 1], _alarm_page_key, limit, backward, bool(cursor or skip), total)
+
+
 def get_alarms_with_condition(
         db: Session,
         start_time: Optional[datetime] = None,
@@ -64,10 +263,14 @@ def get_alarms_with_condition(
         alarm_type: Optional[int] = None,
         alarm_status: Optional[int] = None,
         skip: int = 0,
-        limit: int = 10
-):
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Page:
     """
-    根据条件获取报警记录列表（支持分页），包含摄像头信息和处理记录信息
+    根据条件获取报警记录列表（游标分页，按告警时间倒序），包含摄像头信息和处理记录信息
+
+    时间范围覆盖到已归档的告警时，同时查询Parquet归档并合并结果
 
     Args:
         db (Session): 数据库会话
@@ -75,192 +278,315 @@ def get_alarms_with_condition(
         end_time (Optional[datetime]): 告警触发时间右边界
         alarm_type (Optional[int]): 告警类型
         alarm_status (Optional[int]): 告警状态
-        skip (int): 跳过的记录数，默认为0
+        skip (int): 跳过的记录数，默认为0（仅在不传游标时生效）
         limit (int): 限制返回的记录数，默认为10
+        cursor (Optional[str]): 上一次返回的next_cursor或prev_cursor
+        with_total (bool): 是否统计总数（总数会缓存一小段时间）
 
     Returns:
-        tuple: (总数, 告警记录列表)
+        Page: (总数, 告警记录列表, 下一页游标, 上一页游标)
     """
-    # 构建子查询，获取每个alarm_id的最新处理记录
-    latest_handle_subquery = (
-        db.query(
-            AlarmHandleRecordDB.alarm_id,
-            func.max(AlarmHandleRecordDB.handle_time).label('latest_handle_time')
+    conditions = _alarm_conditions(start_time, end_time, alarm_type, alarm_status)
+    total = cached_count(db, _alarm_count_stmt(*conditions)) if with_total else None
+    if archive_watermark_in_range(start_time) is None:
+        stmt, backward = keyset_stmt(
+            _alarm_details_stmt().where(*conditions), ALARM_PAGE_KEYS, True, cursor, skip, limit
         )
-        .group_by(AlarmHandleRecordDB.alarm_id)
-        .subquery()
+        alarms_with_details = db.execute(stmt).all()
+        return keyset_page(alarms_with_details, _alarm_page_key, limit, backward, bool(cursor or skip), total)
+    stmt, backward = _hot_alarms_for_merge_stmt(conditions, skip, limit, cursor)
+    hot_rows = db.execute(stmt).all()
+    archived_rows, archived_total = read_archived_alarms_for_merge(
+        hot_rows, backward, start_time, end_time, alarm_type, alarm_status, skip, limit, cursor, with_total
+    )
+    return merge_archived_alarm_page(
+        hot_rows, archived_rows, backward, skip, limit, cursor, None if total is None else total + archived_total
     )
 
-    # 构建联表查询
-    query = db.query(
-        AlarmDB,
-        CameraInfoDB.camera_name,
-        ParkAreaDB.park_area,
-        UserDB.name.label('handle_user_name')
-    ).outerjoin(
-        CameraInfoDB, AlarmDB.camera_id == CameraInfoDB.camera_id
-    ).outerjoin(
-        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
-    ).outerjoin(
-        latest_handle_subquery, 
-        AlarmDB.alarm_id == latest_handle_subquery.c.alarm_id
-    ).outerjoin(
-        AlarmHandleRecordDB,
-        and_(
-            AlarmDB.alarm_id == AlarmHandleRecordDB.alarm_id,
-            AlarmHandleRecordDB.handle_time == latest_handle_subquery.c.latest_handle_time
-        )
-    ).outerjoin(
-        UserDB, AlarmHandleRecordDB.handler_user_id == UserDB.user_id
+
+async def async_get_alarms_with_condition(
+        db: AsyncSession,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Page:
+    """
+    get_alarms_with_condition的异步版本（查询接口使用），只查询数据库
+
+    时间范围覆盖到已归档的告警时（见archive_watermark_in_range），改用async_get_hot_alarms_for_merge、
+    read_archived_alarms_for_merge和merge_archived_alarm_page合并归档
+    """
+    conditions = _alarm_conditions(start_time, end_time, alarm_type, alarm_status)
+    total = await async_cached_count(db, _alarm_count_stmt(*conditions)) if with_total else None
+    stmt, backward = keyset_stmt(
+        _alarm_details_stmt().where(*conditions), ALARM_PAGE_KEYS, True, cursor, skip, limit
     )
+    alarms_with_details = (await db.execute(stmt)).all()
+    return keyset_page(alarms_with_details, _alarm_page_key, limit, backward, bool(cursor or skip), total)
 
-    # 添加时间范围条件
-    if start_time and end_time:
-        query = query.filter(AlarmDB.alarm_time.between(start_time, end_time))
-    elif start_time:
-        query = query.filter(AlarmDB.alarm_time >= start_time)
-    elif end_time:
-        query = query.filter(AlarmDB.alarm_time <= end_time)
 
-    # 添加告警类型条件
-    if alarm_type is not None:
-        query = query.filter(AlarmDB.alarm_type == alarm_type)
+async def async_get_hot_alarms_for_merge(
+        db: AsyncSession,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Tuple[list, bool, Optional[int]]:
+    """
+    时间范围覆盖到已归档的告警时，查询数据库一侧的告警
 
-    # 添加告警状态条件
-    if alarm_status is not None:
-        query = query.filter(AlarmDB.alarm_status == alarm_status)
+    Returns:
+        Tuple[list, bool, Optional[int]]: (数据库中的告警列表, 是否向前翻页, 数据库中符合条件的告警数（不统计总数时为None）)
+    """
+    conditions = _alarm_conditions(start_time, end_time, alarm_type, alarm_status)
+    total = await async_cached_count(db, _alarm_count_stmt(*conditions)) if with_total else None
+    stmt, backward = _hot_alarms_for_merge_stmt(conditions, skip, limit, cursor)
+    return (await db.execute(stmt)).all(), backward, total
+
+
+def _today_range():
+    """今天的开始和结束时间"""
+    today = datetime.now().date()
+    return datetime.combine(today, datetime.min.time()), datetime.combine(today, datetime.max.time())
 
-    # 返回计数和分页结果
-    count = query.count()
-    alarms_with_details = query.offset(skip).limit(limit).all()
-    return count, alarms_with_details
+
+def _alarm_type_counts_stmt(start_of_day: Optional[datetime] = None, end_of_day: Optional[datetime] = None):
+    """各类型告警数量查询（汇总告警小时统计表，不传时间范围时统计所有告警）"""
+    stmt = select(
+        AlarmStatsHourlyDB.alarm_type,
+        func.sum(AlarmStatsHourlyDB.alarm_count).label('alarm_number')
+    )
+    if start_of_day is not None:
+        stmt = stmt.where(AlarmStatsHourlyDB.stat_hour.between(start_of_day, end_of_day))
+    return stmt.group_by(AlarmStatsHourlyDB.alarm_type)
+
+
+def _fill_alarm_type_counts(results):
+    """确保返回所有类型的告警数据（包括数量为0的类型），转换为按类型排序的列表"""
+    alarm_counts = {0: 0, 1: 0, 2: 0}
+    for alarm_type, count in results:
+        alarm_counts[alarm_type] = int(count or 0)
+    return [(alarm_type, alarm_counts[alarm_type]) for alarm_type in sorted(alarm_counts.keys())]
 
 
 def get_today_alarm_counts(db: Session):
     """
     获取本日告警统计信息
-    
+
     Args:
         db (Session): 数据库会话
-        
+
     Returns:
         list: 包含告警类型和数量的元组列表
     """
-    # 获取今天的开始和结束时间
-    today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-    
-    # 查询本日各类型告警的数量
-    results = db.query(
-        AlarmDB.alarm_type,
-        func.count(AlarmDB.alarm_id).label('alarm_number')
-    ).filter(
-        AlarmDB.alarm_time.between(start_of_day, end_of_day)
-    ).group_by(
-        AlarmDB.alarm_type
-    ).all()
-    
-    # 确保返回所有类型的告警数据（包括数量为0的类型）
-    alarm_counts = {0: 0, 1: 0, 2: 0}
-    for alarm_type, count in results:
-        alarm_counts[alarm_type] = count
-    
-    # 转换为按类型排序的列表
-    sorted_results = [(alarm_type, alarm_counts[alarm_type]) for alarm_type in sorted(alarm_counts.keys())]
-    
-    return sorted_results
+    return _fill_alarm_type_counts(db.execute(_alarm_type_counts_stmt(*_today_range())).all())
+
+
+async def async_get_today_alarm_counts(db: AsyncSession):
+    """get_today_alarm_counts的异步版本（查询接口使用）"""
+    return _fill_alarm_type_counts((await db.execute(_alarm_type_counts_stmt(*_today_range()))).all())
+
+
+def _today_alarm_handle_stats_stmt():
+    """本日告警处理统计查询：汇总告警小时统计表，一次扫描同时统计总数、已处理数和未处理数"""
+    start_of_day, end_of_day = _today_range()
+    return select(
+        func.coalesce(func.sum(AlarmStatsHourlyDB.alarm_count), 0),
+        # 已处理告警数（状态为1确认误报、3处理完成）
+        func.coalesce(func.sum(case((AlarmStatsHourlyDB.alarm_status.in_([1, 3]), AlarmStatsHourlyDB.alarm_count))), 0),
+        # 未处理告警数（状态为0未处理）
+        func.coalesce(func.sum(case((AlarmStatsHourlyDB.alarm_status == 0, AlarmStatsHourlyDB.alarm_count))), 0)
+    ).where(
+        AlarmStatsHourlyDB.stat_hour.between(start_of_day, end_of_day)
+    )
 
 
 def get_today_alarm_handle_stats(db: Session):
     """
     获取本日告警处理统计信息（处理率和未处理数）
-    
+
     Args:
         db (Session): 数据库会话
-        
+
     Returns:
         tuple: (今日告警总数, 今日已处理告警数, 今日未处理告警数)
     """
-    # 获取今天的开始和结束时间
-    today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-    
-    # 查询今日告警总数
-    total_count = db.query(AlarmDB).filter(
-        AlarmDB.alarm_time.between(start_of_day, end_of_day)
-    ).count()
-    
-    # 查询今日已处理告警数（状态为1确认误报、3处理完成）
-    handled_count = db.query(AlarmDB).filter(
-        AlarmDB.alarm_time.between(start_of_day, end_of_day),
-        AlarmDB.alarm_status.in_([1, 3])
-    ).count()
-    
-    # 查询今日未处理告警数（状态为0未处理）
-    unhandled_count = db.query(AlarmDB).filter(
-        AlarmDB.alarm_time.between(start_of_day, end_of_day),
-        AlarmDB.alarm_status == 0
-    ).count()
-    
-    return total_count, handled_count, unhandled_count
+    return tuple(int(count) for count in db.execute(_today_alarm_handle_stats_stmt()).one())
+
+
+async def async_get_today_alarm_handle_stats(db: AsyncSession):
+    """get_today_alarm_handle_stats的异步版本（查询接口使用）"""
+    return tuple(int(count) for count in (await db.execute(_today_alarm_handle_stats_stmt())).one())
+
+
+def _top3_alarm_areas_stmt():
+    """各园区区域的告警数量（汇总告警小时统计表，按告警时摄像头所在的区域），按数量降序排列，取前3条"""
+    alarm_count = func.sum(AlarmStatsHourlyDB.alarm_count)
+    return select(
+        ParkAreaDB.park_area,
+        alarm_count.label('alarm_count')
+    ).join(
+        AlarmStatsHourlyDB, ParkAreaDB.park_area_id == AlarmStatsHourlyDB.park_area_id
+    ).group_by(
+        ParkAreaDB.park_area
+    ).having(
+        alarm_count > 0
+    ).order_by(
+        alarm_count.desc()
+    ).limit(3)
 
 
 def get_top3_alarm_areas(db: Session):
     """
     获取告警数位居前3的园区区域统计信息
-    
+
     Args:
         db (Session): 数据库会话
-        
+
     Returns:
         list: 包含园区区域名称和告警数量的元组列表，按告警数量降序排列，最多3条
     """
-    # 查询各园区区域的告警数量，按数量降序排列，取前3条
-    results = db.query(
-        ParkAreaDB.park_area,
-        func.count(AlarmDB.alarm_id).label('alarm_count')
-    ).join(
-        CameraInfoDB, ParkAreaDB.park_area_id == CameraInfoDB.park_area_id
-    ).join(
-        AlarmDB, CameraInfoDB.camera_id == AlarmDB.camera_id
-    ).group_by(
-        ParkAreaDB.park_area
-    ).order_by(
-        func.count(AlarmDB.alarm_id).desc()
-    ).limit(3).all()
-    
-    return results
+    return db.execute(_top3_alarm_areas_stmt()).all()
+
+
+async def async_get_top3_alarm_areas(db: AsyncSession):
+    """get_top3_alarm_areas的异步版本（查询接口使用）"""
+    return (await db.execute(_top3_alarm_areas_stmt())).all()
 
 
 def get_all_alarm_counts(db: Session):
     """
     获取所有告警统计信息
-    
+
     Args:
         db (Session): 数据库会话
-        
+
     Returns:
         list: 包含告警类型和数量的元组列表
     """
-    # 查询所有告警中各类型告警的数量
-    results = db.query(
-        AlarmDB.alarm_type,
-        func.count(AlarmDB.alarm_id).label('alarm_number')
-    ).group_by(
-        AlarmDB.alarm_type
-    ).all()
-    
-    # 确保返回所有类型的告警数据（包括数量为0的类型）
-    alarm_counts = {0: 0, 1: 0, 2: 0}
-    for alarm_type, count in results:
-        alarm_counts[alarm_type] = count
-    
-    # 转换为按类型排序的列表
-    sorted_results = [(alarm_type, alarm_counts[alarm_type]) for alarm_type in sorted(alarm_counts.keys())]
-    
-    return sorted_results
+    return _fill_alarm_type_counts(db.execute(_alarm_type_counts_stmt()).all())
+
+
+async def async_get_all_alarm_counts(db: AsyncSession):
+    """get_all_alarm_counts的异步版本（查询接口使用）"""
+    return _fill_alarm_type_counts((await db.execute(_alarm_type_counts_stmt())).all())
+
+
+def _dashboard_alarm_stats_stmt():
+    """
+    看板告警统计查询：汇总一遍告警小时统计表，按告警类型同时得到所有告警数、本日告警数、本日已处理数和本日未处理数
+    （等价于本日/所有告警按类型统计和本日告警处理统计三条查询）
+    """
+    start_of_day, end_of_day = _today_range()
+    today = AlarmStatsHourlyDB.stat_hour.between(start_of_day, end_of_day)
+    alarm_count = AlarmStatsHourlyDB.alarm_count
+    return select(
+        AlarmStatsHourlyDB.alarm_type,
+        func.sum(alarm_count),
+        func.sum(case((today, alarm_count), else_=0)),
+        # 本日已处理告警数（状态为1确认误报、3处理完成）
+        func.sum(case((today & AlarmStatsHourlyDB.alarm_status.in_([1, 3]), alarm_count), else_=0)),
+        # 本日未处理告警数（状态为0未处理）
+        func.sum(case((today & (AlarmStatsHourlyDB.alarm_status == 0), alarm_count), else_=0)),
+    ).group_by(AlarmStatsHourlyDB.alarm_type)
+
+
+def _split_dashboard_alarm_stats(results):
+    """将看板告警统计查询结果拆分为(本日各类型告警数, 所有各类型告警数, 本日告警处理统计)"""
+    results = [tuple(int(value or 0) for value in row) for row in results]
+    today_counts = _fill_alarm_type_counts((alarm_type, today) for alarm_type, _, today, _, _ in results)
+    all_counts = _fill_alarm_type_counts((alarm_type, total) for alarm_type, total, _, _, _ in results)
+    handle_stats = tuple(sum(row[i] for row in results) for i in (2, 3, 4))
+    return today_counts, all_counts, handle_stats
+
+
+def get_dashboard_alarm_stats(db: Session):
+    """
+    一条查询获取看板的告警统计
+
+    Args:
+        db (Session): 数据库会话
+
+    Returns:
+        tuple: (本日各类型告警数, 所有各类型告警数, (今日告警总数, 今日已处理告警数, 今日未处理告警数))，
+            格式与get_today_alarm_counts、get_all_alarm_counts、get_today_alarm_handle_stats相同
+    """
+    return _split_dashboard_alarm_stats(db.execute(_dashboard_alarm_stats_stmt()).all())
+
+
+async def async_get_dashboard_alarm_stats(db: AsyncSession):
+    """get_dashboard_alarm_stats的异步版本（查询接口使用）"""
+    return _split_dashboard_alarm_stats((await db.execute(_dashboard_alarm_stats_stmt())).all())
+
+
+def _alarm_minute_expr(dialect_name: str):
+    """SQL中告警时间截断到分钟的表达式"""
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:00", AlarmDB.alarm_time)
+    return func.date_format(AlarmDB.alarm_time, "%Y-%m-%d %H:%i:00")
+
+
+def _minute_alarm_counts_stmt(dialect_name: str, start_time: datetime, end_time: datetime,
+                              camera_id: Optional[int] = None, park_area_id: Optional[int] = None,
+                              alarm_type: Optional[int] = None, alarm_status: Optional[int] = None):
+    """时间范围内每分钟的告警数（在数据库中分组计数，走告警时间索引）"""
+    minute = _alarm_minute_expr(dialect_name)
+    stmt = select(minute, func.count(AlarmDB.alarm_id)).where(
+        *_alarm_conditions(start_time, end_time, alarm_type, alarm_status)
+    )
+    if camera_id is not None:
+        stmt = stmt.where(AlarmDB.camera_id == camera_id)
+    if park_area_id is not None:
+        stmt = stmt.join(CameraInfoDB, CameraInfoDB.camera_id == AlarmDB.camera_id).where(
+            CameraInfoDB.park_area_id == park_area_id
+        )
+    return stmt.group_by(minute)
+
+
+def _minute_alarm_counts(rows) -> List[Tuple[datetime, int]]:
+    return [(datetime.fromisoformat(minute), count) for minute, count in rows]
+
+
+def get_minute_alarm_counts(db: Session, start_time: datetime, end_time: datetime, camera_id: Optional[int] = None,
+                            park_area_id: Optional[int] = None, alarm_type: Optional[int] = None,
+                            alarm_status: Optional[int] = None) -> List[Tuple[datetime, int]]:
+    """
+    获取时间范围内每分钟的告警数（只返回有告警的分钟；告警小时统计表的粒度不够，按告警表分组计数）
+
+    Args:
+        db (Session): 数据库会话
+        start_time (datetime): 告警触发时间左边界
+        end_time (datetime): 告警触发时间右边界
+        camera_id (Optional[int]): 摄像头ID
+        park_area_id (Optional[int]): 园区区域ID（摄像头当前所在的区域）
+        alarm_type (Optional[int]): 告警类型
+        alarm_status (Optional[int]): 告警状态
+
+    Returns:
+        List[Tuple[datetime, int]]: (分钟, 告警数) 列表
+    """
+    return _minute_alarm_counts(db.execute(_minute_alarm_counts_stmt(
+        db.get_bind().dialect.name, start_time, end_time, camera_id, park_area_id, alarm_type, alarm_status
+    )).all())
+
+
+async def async_get_minute_alarm_counts(db: AsyncSession, start_time: datetime, end_time: datetime,
+                                        camera_id: Optional[int] = None, park_area_id: Optional[int] = None,
+                                        alarm_type: Optional[int] = None,
+                                        alarm_status: Optional[int] = None) -> List[Tuple[datetime, int]]:
+    """get_minute_alarm_counts的异步版本（查询接口使用）"""
+    return _minute_alarm_counts((await db.execute(_minute_alarm_counts_stmt(
+        db.bind.dialect.name, start_time, end_time, camera_id, park_area_id, alarm_type, alarm_status
+    ))).all())
 
 
 def update_alarm_status(db: Session, alarm_id: int, alarm_status: int):
@@ -275,11 +601,13 @@ def update_alarm_status(db: Session, alarm_id: int, alarm_status: int):
     Returns:
         AlarmDB: 更新后的报警记录对象或None
     """
-    alarm = db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).first()
+    alarm = db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).with_for_update().first()
     if alarm:
+        apply_alarm_stats_deltas(db, alarm_status_change_deltas(alarm, alarm_status))
         alarm.alarm_status = alarm_status
         alarm.update_time = datetime.now()
         db.commit()
+        invalidate_response_cache(TAG_ALARM_STATUS)
         db.refresh(alarm)
     return alarm
 
@@ -300,10 +628,133 @@ def update_alarm_end_time(db: Session, alarm_id: int, alarm_end_time:datetime):
         alarm.alarm_end_time = alarm_end_time
         alarm.update_time = datetime.now()
         db.commit()
+        invalidate_response_cache(TAG_ALARM_DETAIL)
         db.refresh(alarm)
     return alarm
 
 
+def get_oldest_alarm_time(db: Session) -> Optional[datetime]:
+    """
+    获取数据库中最早的告警时间（走告警时间索引）
+
+    Args:
+        db (Session): 数据库会话
+
+    Returns:
+        Optional[datetime]: 最早的告警时间，没有告警时为None
+    """
+    return db.execute(select(func.min(AlarmDB.alarm_time))).scalar_one()
+
+
+def get_alarm_details_in_range(db: Session, start_time: datetime, end_time: datetime):
+    """
+    获取告警时间在[start_time, end_time)内的告警记录（与告警列表相同的联表字段，用于归档）
+
+    Args:
+        db (Session): 数据库会话
+        start_time (datetime): 告警时间左边界（包含）
+        end_time (datetime): 告警时间右边界（不包含）
+
+    Returns:
+        list: 告警记录联表查询结果，按告警时间升序
+    """
+    return db.execute(
+        _alarm_details_stmt().where(
+            AlarmDB.alarm_time >= start_time, AlarmDB.alarm_time < end_time
+        ).order_by(AlarmDB.alarm_time, AlarmDB.alarm_id)
+    ).all()
+
+
+def get_open_alarms(db: Session):
+    """
+    获取所有未结束的告警（alarm_end_time为空），走idx_alarm_open索引
+
+    Args:
+        db (Session): 数据库会话
+
+    Returns:
+        list: [(alarm_id, camera_id, alarm_type, alarm_time, park_area_id)]，按摄像头、告警类型分组，组内按告警时间倒序
+    """
+    return db.query(
+        AlarmDB.alarm_id, AlarmDB.camera_id, AlarmDB.alarm_type, AlarmDB.alarm_time, CameraInfoDB.park_area_id
+    ).outerjoin(
+        CameraInfoDB, AlarmDB.camera_id == CameraInfoDB.camera_id
+    ).filter(
+        AlarmDB.alarm_end_time.is_(None)
+    ).order_by(
+        AlarmDB.camera_id, AlarmDB.alarm_type, AlarmDB.alarm_time.desc(), AlarmDB.alarm_id.desc()
+    ).all()
+
+
+def batch_update_alarm_end_time(db: Session, alarm_end_times: Dict[int, datetime]) -> int:
+    """
+    批量更新报警结束时间（一条UPDATE ... CASE语句）
+
+    Args:
+        db (Session): 数据库会话
+        alarm_end_times (Dict[int, datetime]): {报警ID: 报警结束时间}
+
+    Returns:
+        int: 更新的记录数
+    """
+    if not alarm_end_times:
+        return 0
+    updated_count = db.query(AlarmDB).filter(
+        AlarmDB.alarm_id.in_(list(alarm_end_times.keys()))
+    ).update(
+        {
+            AlarmDB.alarm_end_time: case(alarm_end_times, value=AlarmDB.alarm_id),
+            AlarmDB.update_time: datetime.now()
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    invalidate_response_cache(TAG_ALARM_DETAIL)
+    return updated_count
+
+
+def update_alarm_snapshot_url(db: Session, alarm_id: int, snapshot_url: str):
+    """
+    更新报警截图URL（截图在告警创建之后上传完成）
+
+    Args:
+        db (Session): 数据库会话
+        alarm_id (int): 报警ID
+        snapshot_url (str): 报警截图URL（多张截图逗号分隔）
+
+    Returns:
+        int: 更新的记录数
+    """
+    updated_count = db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).update(
+        {AlarmDB.snapshot_url: snapshot_url, AlarmDB.update_time: datetime.now()},
+        synchronize_session=False
+    )
+    db.commit()
+    invalidate_response_cache(TAG_ALARM_DETAIL)
+    return updated_count
+
+
+def update_alarm_video_clip_url(db: Session, alarm_id: int, video_clip_url: str):
+    """
+    更新报警视频片段URL
+
+    Args:
+        db (Session): 数据库会话
+        alarm_id (int): 报警ID
+        video_clip_url (str): 报警视频片段URL
+
+    Returns:
+        int: 更新的记录数
+    """
+    updated_count = db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).update(
+        {AlarmDB.video_clip_url: video_clip_url, AlarmDB.update_time: datetime.now()},
+        synchronize_session=False
+    )
+    db.commit()
+    invalidate_response_cache(TAG_ALARM_DETAIL)
+    return updated_count
+
+
 def delete_alarm(db: Session, alarm_id: int):
     """
     删除指定的报警记录
@@ -317,14 +768,34 @@ def delete_alarm(db: Session, alarm_id: int):
     """
     alarm = db.query(AlarmDB).filter(AlarmDB.alarm_id == alarm_id).first()
     if alarm:
+        apply_alarm_stats_deltas(db, alarm_stats_deltas([alarm], -1))
         db.delete(alarm)
         db.commit()
+        invalidate_response_cache(TAG_ALARM_COUNT)
     return alarm
 
 
+# 批量删除时每条IN语句最多包含的告警ID数（避免单条语句过大）
+DELETE_CHUNK_SIZE = 1000
+
+
+def _chunks(ids: List[int], size: int = DELETE_CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _delete_alarm_chunks(db: Session, alarm_ids: List[int]) -> int:
+    """分批删除告警及其处理记录（不提交），返回删除的告警数"""
+    deleted_count = 0
+    for chunk in _chunks(alarm_ids):
+        db.execute(delete(AlarmHandleRecordDB).where(AlarmHandleRecordDB.alarm_id.in_(chunk)))
+        deleted_count += db.execute(delete(AlarmDB).where(AlarmDB.alarm_id.in_(chunk))).rowcount
+    return deleted_count
+
+
 def delete_alarms_and_related_records(db: Session, alarm_ids: List[int]) -> int:
     """
-    批量删除告警记录及其关联的处理记录
+    批量删除告警记录及其关联的处理记录（按DELETE_CHUNK_SIZE分批IN删除，整体一个事务）
 
     Args:
         db (Session): 数据库会话
@@ -333,70 +804,84 @@ def delete_alarms_and_related_records(db: Session, alarm_ids: List[int]) -> int:
     Returns:
         int: 成功删除的告警记录数
     """
-    deleted_count = 0
-
+    alarm_ids = list(dict.fromkeys(alarm_ids))
     try:
-        # 先删除所有关联的告警处理记录
-        for alarm_id in alarm_ids:
-            db.query(AlarmHandleRecordDB).filter(AlarmHandleRecordDB.alarm_id == alarm_id).delete()
+        deleted_count = _delete_alarm_chunks(db, alarm_ids)
+        db.commit()
+        invalidate_response_cache(TAG_ALARM_COUNT)
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    return deleted_count
+
 
-        # 再删除告警记录
-        deleted_count = db.query(AlarmDB).filter(AlarmDB.alarm_id.in_(alarm_ids)).delete(synchronize_session=False)
+def purge_alarms(db: Session, alarm_ids: List[int]) -> Tuple[int, List[str]]:
+    """
+    批量删除告警记录及其关联的处理记录（同时扣减告警小时统计），并返回它们引用的OSS文件URL（提交后由调用方删除文件）
 
+    Args:
+        db (Session): 数据库会话
+        alarm_ids (List[int]): 告警ID列表
+
+    Returns:
+        Tuple[int, List[str]]: (成功删除的告警记录数, 告警截图、告警视频片段、处理附件的URL)
+    """
+    alarm_ids = list(dict.fromkeys(alarm_ids))
+    file_urls = []
+    try:
+        for chunk in _chunks(alarm_ids):
+            alarms = db.execute(select(
+                AlarmDB.alarm_time, AlarmDB.camera_id, AlarmDB.alarm_type, AlarmDB.alarm_status,
+                AlarmDB.snapshot_url, AlarmDB.video_clip_url
+            ).where(AlarmDB.alarm_id.in_(chunk))).all()
+            apply_alarm_stats_deltas(db, alarm_stats_deltas(alarms, -1))
+            for alarm in alarms:
+                file_urls.extend(url for url in (alarm.snapshot_url, alarm.video_clip_url) if url)
+            file_urls.extend(db.execute(
+                select(AlarmHandleRecordDB.handle_attachment_url).where(
+                    AlarmHandleRecordDB.alarm_id.in_(chunk), AlarmHandleRecordDB.handle_attachment_url.isnot(None)
+                )
+            ).scalars())
+        deleted_count = _delete_alarm_chunks(db, alarm_ids)
         db.commit()
+        invalidate_response_cache(TAG_ALARM_COUNT)
     except Exception as e:
         db.rollback()
         raise e
 
-    return deleted_count
+    return deleted_count, file_urls
+
+
+# 未解决的告警（处理中或未处理）
+UNRESOLVED_ALARM_CONDITION = AlarmDB.alarm_status.in_([0, 2])
+
+
+def _recent_unresolved_alarms_stmt():
+    """未解决告警（处理中或未处理）的联表查询，按告警时间倒序"""
+    return _alarm_details_stmt().where(
+        UNRESOLVED_ALARM_CONDITION
+    ).order_by(
+        AlarmDB.alarm_time.desc()  # 按告警时间倒序排列
+    )
 
 
 def get_recent_unresolved_alarms(db: Session, limit: int = 5):
     """
     获取最近的未解决告警记录（alarm_status为0或2），默认最多5条
-    
+
     Args:
         db (Session): 数据库会话
         limit (int): 限制返回的记录数，默认为5
-        
+
     Returns:
         tuple: (总数, 告警记录列表)
     """
-    # 构建子查询，获取每个alarm_id的最新处理记录的处理时间
-    latest_handle_subquery = (
-        db.query(
-            AlarmHandleRecordDB.alarm_id,
-            func.max(AlarmHandleRecordDB.handle_time).label('latest_handle_time')
-        )
-        .group_by(AlarmHandleRecordDB.alarm_id)
-        .subquery()
-    )
+    count = db.execute(_alarm_count_stmt(UNRESOLVED_ALARM_CONDITION)).scalar_one()
+    return count, db.execute(_recent_unresolved_alarms_stmt().limit(limit)).all()
 
-    # 构建联表查询
-    query = db.query(
-        AlarmDB,
-        CameraInfoDB.camera_name,
-        ParkAreaDB.park_area,
-        UserDB.name.label('handle_user_name')
-    ).outerjoin(
-        CameraInfoDB, AlarmDB.camera_id == CameraInfoDB.camera_id
-    ).outerjoin(
-        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
-    ).outerjoin(
-        latest_handle_subquery, 
-        AlarmDB.alarm_id == latest_handle_subquery.c.alarm_id
-    ).outerjoin(
-        AlarmHandleRecordDB,
-        and_(
-            AlarmDB.alarm_id == AlarmHandleRecordDB.alarm_id,
-            AlarmHandleRecordDB.handle_time == latest_handle_subquery.c.latest_handle_time
-        )
-    ).outerjoin(
-        UserDB, AlarmHandleRecordDB.handler_user_id == UserDB.user_id
-    ).filter(
-        AlarmDB.alarm_status.in_([0,2])  # 未解决的告警（处理中或未处理）
-    ).order_by(
-        AlarmDB.alarm_time.desc()  # 按告警时间倒序排列
-    )
 
-    return query.count(), query.limit(limit).all()
\ No newline at end of file
+async def async_get_recent_unresolved_alarms(db: AsyncSession, limit: int = 5):
+    """get_recent_unresolved_alarms的异步版本（查询接口使用）"""
+    count = (await db.execute(_alarm_count_stmt(UNRESOLVED_ALARM_CONDITION))).scalar_one()
+    return count, (await db.execute(_recent_unresolved_alarms_stmt().limit(limit))).all()
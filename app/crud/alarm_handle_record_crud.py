@@ -1,9 +1,41 @@
+from datetime import datetime, date, timedelta, timezone
+
+import pytz
 from sqlalchemy.orm import Session
+from app.DB_models.alarm_db import AlarmDB
 from app.DB_models.alarm_handle_record_db import AlarmHandleRecordDB
 from typing import Optional, List
+from app.crud.alarm_archive_crud import get_archived_handle_records, get_archive_watermark
+from app.crud.alarm_stats_crud import apply_alarm_stats_deltas, alarm_status_change_deltas
 from app.JSON_schemas.alarm_handle_record_pydantic import AlarmHandleRecordCreate
 
 from app.JSON_schemas.alarm_handle_record_pydantic import AlarmHandleRecordCreate
+from app.utils.id_generator import SnowflakeIdGenerator
+from app.utils.response_cache import invalidate_response_cache, TAG_ALARM_STATUS
+
+# 处理动作对应的告警状态：0-标记误报 -> 1-确认误报，1-派单处理 -> 2-处理中（已派单），2-标记已解决 -> 3-处理完成
+HANDLE_ACTION_ALARM_STATUS = {0: 1, 1: 2, 2: 3}
+
+# 告警时间使用的时区（与告警创建时的get_now一致）
+ALARM_TIMEZONE = pytz.timezone('Asia/Shanghai')
+# 报警ID在记录告警时间前生成，借用时间戳、时钟回拨会使ID中的时间与告警时间略有偏差
+ALARM_ID_TIME_MARGIN = timedelta(minutes=1)
+# 雪花ID启用前的自增告警ID很小，解析出的生成时间都在ID纪元之后一天内
+LEGACY_ALARM_ID_BEFORE = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+def _alarm_days_from_id(alarm_id: int) -> Optional[List[date]]:
+    """
+    根据报警ID中的生成时间推算告警日期（归档分区日期）
+
+    Returns:
+        Optional[List[date]]: 可能的告警日期（生成时间接近零点时包含前后两天）；旧的自增ID无法推算时返回None
+    """
+    generated_time = SnowflakeIdGenerator.timestamp_of(alarm_id)
+    if generated_time < LEGACY_ALARM_ID_BEFORE:
+        return None
+    local_time = generated_time.astimezone(ALARM_TIMEZONE).replace(tzinfo=None)
+    return sorted({(local_time - ALARM_ID_TIME_MARGIN).date(), (local_time + ALARM_ID_TIME_MARGIN).date()})
 
 
 def get_alarm_handle_records(db: Session, alarm_id: int) -> List[AlarmHandleRecordDB]:
@@ -14,14 +46,44 @@ def get_alarm_handle_records(db: Session, alarm_id: int) -> List[AlarmHandleReco
         db (Session): 数据库会话
         alarm_id (int): 告警ID
 
+    Returns:
+        List[AlarmHandleRecordDB]: 告警处理记录对象列表（告警已归档时从归档中读取）
+    """
+    records = db.query(AlarmHandleRecordDB).filter(AlarmHandleRecordDB.alarm_id == alarm_id).all()
+    if records:
+        return records
+    # 只有告警已移入归档（不在告警表中，或告警时间早于归档水位）时才读取归档，且只读取告警日期所在的分区
+    watermark = get_archive_watermark()
+    if watermark is None:
+        return records
+    alarm_time = db.query(AlarmDB.alarm_time).filter(AlarmDB.alarm_id == alarm_id).scalar()
+    if alarm_time is None:
+        days = _alarm_days_from_id(alarm_id)
+    elif alarm_time < watermark:
+        days = [alarm_time.date()]
+    else:
+        return records  # 告警未归档，确实还没有处理记录
+    return get_archived_handle_records(alarm_id, days)
+
+
+def get_alarm_handle_records_by_alarm_ids(db: Session, alarm_ids: List[int]) -> List[AlarmHandleRecordDB]:
+    """
+    批量获取多个告警的处理记录（用于归档）
+
+    Args:
+        db (Session): 数据库会话
+        alarm_ids (List[int]): 告警ID列表
+
     Returns:
         List[AlarmHandleRecordDB]: 告警处理记录对象列表
     """
-    return db.query(AlarmHandleRecordDB).filter(AlarmHandleRecordDB.alarm_id == alarm_id).all()
+    if not alarm_ids:
+        return []
+    return db.query(AlarmHandleRecordDB).filter(AlarmHandleRecordDB.alarm_id.in_(alarm_ids)).all()
 
 def create_alarm_handle_record(db: Session, record_create: AlarmHandleRecordCreate) -> AlarmHandleRecordDB:
     """
-    创建新的告警处理记录
+    创建新的告警处理记录，并在同一事务中更新对应告警的状态和最新处理人、最新处理时间，以及告警小时统计
 
     Args:
         db (Session): 数据库会话
@@ -30,12 +92,38 @@ def create_alarm_handle_record(db: Session, record_create: AlarmHandleRecordCrea
     Returns:
         AlarmHandleRecordDB: 新创建的告警处理记录对象
     """
-    # 将Pydantic模型转换为数据库模型
+    # 将Pydantic模型转换为数据库模型（处理时间取当前时间，列默认值在模块导入时就已固定）
     db_record = AlarmHandleRecordDB(**record_create.model_dump(exclude_unset=True))
+    db_record.handle_time = datetime.now()
+
+    alarm_values = {
+        AlarmDB.latest_handle_user_id: db_record.handler_user_id,
+        AlarmDB.latest_handle_time: db_record.handle_time,
+        AlarmDB.update_time: db_record.handle_time,
+    }
+    new_status = HANDLE_ACTION_ALARM_STATUS.get(record_create.handle_action)
+    # 根据处理动作类型更新对应告警记录的状态
+    if new_status is not None:
+        alarm_values[AlarmDB.alarm_status] = new_status
 
-    # 添加到数据库
-    db.add(db_record)
-    db.commit()
+    # 添加到数据库，处理记录、告警记录和告警统计一起提交
+    try:
+        if new_status is not None:
+            # 锁住告警记录再读取旧状态，并发处理同一告警时统计不会重复扣减
+            alarm = db.query(
+                AlarmDB.alarm_time, AlarmDB.camera_id, AlarmDB.alarm_type, AlarmDB.alarm_status
+            ).filter(AlarmDB.alarm_id == record_create.alarm_id).with_for_update().first()
+            if alarm:
+                apply_alarm_stats_deltas(db, alarm_status_change_deltas(alarm, new_status))
+        db.add(db_record)
+        db.query(AlarmDB).filter(AlarmDB.alarm_id == record_create.alarm_id).update(
+            alarm_values, synchronize_session=False
+        )
+        db.commit()
+        invalidate_response_cache(TAG_ALARM_STATUS)
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_record)
 
-    return db_record
\ No newline at end of file
+    return db_record
@@ -0,0 +1,199 @@
+# 告警小时统计表（alarm_stats_hourly）的增量维护和重建
+# 告警创建、状态变更、删除时，在同一事务中按(小时, 摄像头, 告警类型, 告警状态)增减告警数，
+# 统计报表直接汇总该表，不再扫描告警表；数据不一致时（如手工改库）用rebuild_alarm_stats按告警表重建
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Tuple, Iterable, Optional
+
+from sqlalchemy import select, delete, func, insert as sql_insert
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.DB_models.alarm_db import AlarmDB
+from app.DB_models.alarm_stats_hourly_db import AlarmStatsHourlyDB
+from app.DB_models.camera_info_db import CameraInfoDB
+from app.utils.response_cache import invalidate_response_cache, TAG_ALARM_COUNT, TAG_ALARM_STATUS
+
+# 统计键：(小时, 摄像头ID, 告警类型, 告警状态)
+StatsKey = Tuple[datetime, int, int, int]
+
+
+def stat_hour(alarm_time: datetime) -> datetime:
+    """告警时间所在的小时（整点）"""
+    return alarm_time.replace(minute=0, second=0, microsecond=0)
+
+
+def alarm_stats_deltas(alarms: Iterable, sign: int = 1) -> Dict[StatsKey, int]:
+    """
+    按告警记录生成统计增量
+
+    Args:
+        alarms: 告警记录（含alarm_time、camera_id、alarm_type、alarm_status属性或字典键）
+        sign: 1表示新增告警，-1表示删除告警
+
+    Returns:
+        Dict[StatsKey, int]: {(小时, 摄像头ID, 告警类型, 告警状态): 告警数增量}
+    """
+    deltas = defaultdict(int)
+    for alarm in alarms:
+        if isinstance(alarm, dict):
+            alarm_time, camera_id = alarm["alarm_time"], alarm["camera_id"]
+            alarm_type, alarm_status = alarm["alarm_type"], alarm.get("alarm_status") or 0
+        else:
+            alarm_time, camera_id = alarm.alarm_time, alarm.camera_id
+            alarm_type, alarm_status = alarm.alarm_type, alarm.alarm_status or 0
+        deltas[(stat_hour(alarm_time), camera_id, alarm_type, alarm_status)] += sign
+    return deltas
+
+
+def alarm_status_change_deltas(alarm, new_status: int) -> Dict[StatsKey, int]:
+    """告警状态变更的统计增量（旧状态减一，新状态加一）"""
+    old_status = alarm.alarm_status or 0
+    if old_status == new_status:
+        return {}
+    hour = stat_hour(alarm.alarm_time)
+    return {
+        (hour, alarm.camera_id, alarm.alarm_type, old_status): -1,
+        (hour, alarm.camera_id, alarm.alarm_type, new_status): 1,
+    }
+
+
+def apply_alarm_stats_deltas(db: Session, deltas: Dict[StatsKey, int]) -> int:
+    """
+    将统计增量写入告警小时统计表（一条多行INSERT ... ON DUPLICATE KEY UPDATE，不提交，由调用方与告警变更一起提交）
+
+    Args:
+        db (Session): 数据库会话
+        deltas (Dict[StatsKey, int]): 统计增量
+
+    Returns:
+        int: 写入的统计行数
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    camera_ids = {camera_id for _, camera_id, _, _ in deltas}
+    park_area_ids = dict(db.execute(
+        select(CameraInfoDB.camera_id, CameraInfoDB.park_area_id).where(CameraInfoDB.camera_id.in_(camera_ids))
+    ).all())
+    stmt = insert(AlarmStatsHourlyDB).values([
+        {
+            "stat_hour": hour,
+            "camera_id": camera_id,
+            "alarm_type": alarm_type,
+            "alarm_status": alarm_status,
+            "park_area_id": park_area_ids.get(camera_id),
+            "alarm_count": delta,
+        }
+        for (hour, camera_id, alarm_type, alarm_status), delta in deltas.items()
+    ])
+    db.execute(stmt.on_duplicate_key_update(alarm_count=AlarmStatsHourlyDB.alarm_count + stmt.inserted.alarm_count))
+    return len(deltas)
+
+
+def _hourly_alarm_counts_stmt(start_time: datetime, end_time: datetime, camera_id: Optional[int] = None,
+                              park_area_id: Optional[int] = None, alarm_type: Optional[int] = None,
+                              alarm_status: Optional[int] = None):
+    """时间范围内每小时的告警数（汇总告警小时统计表，包含start_time所在的整个小时）"""
+    conditions = [AlarmStatsHourlyDB.stat_hour.between(stat_hour(start_time), end_time)]
+    if camera_id is not None:
+        conditions.append(AlarmStatsHourlyDB.camera_id == camera_id)
+    if park_area_id is not None:
+        conditions.append(AlarmStatsHourlyDB.park_area_id == park_area_id)
+    if alarm_type is not None:
+        conditions.append(AlarmStatsHourlyDB.alarm_type == alarm_type)
+    if alarm_status is not None:
+        conditions.append(AlarmStatsHourlyDB.alarm_status == alarm_status)
+    return select(
+        AlarmStatsHourlyDB.stat_hour,
+        func.sum(AlarmStatsHourlyDB.alarm_count)
+    ).where(*conditions).group_by(AlarmStatsHourlyDB.stat_hour)
+
+
+def get_hourly_alarm_counts(db: Session, start_time: datetime, end_time: datetime, camera_id: Optional[int] = None,
+                            park_area_id: Optional[int] = None, alarm_type: Optional[int] = None,
+                            alarm_status: Optional[int] = None) -> list:
+    """
+    获取时间范围内每小时的告警数（只返回有告警的小时）
+
+    Args:
+        db (Session): 数据库会话
+        start_time (datetime): 时间范围左边界（按所在的整点计）
+        end_time (datetime): 时间范围右边界
+        camera_id (Optional[int]): 摄像头ID
+        park_area_id (Optional[int]): 园区区域ID（告警时摄像头所在的区域）
+        alarm_type (Optional[int]): 告警类型
+        alarm_status (Optional[int]): 告警状态
+
+    Returns:
+        list: (小时, 告警数) 列表
+    """
+    return db.execute(_hourly_alarm_counts_stmt(
+        start_time, end_time, camera_id, park_area_id, alarm_type, alarm_status
+    )).all()
+
+
+async def async_get_hourly_alarm_counts(db: AsyncSession, start_time: datetime, end_time: datetime,
+                                        camera_id: Optional[int] = None, park_area_id: Optional[int] = None,
+                                        alarm_type: Optional[int] = None, alarm_status: Optional[int] = None) -> list:
+    """get_hourly_alarm_counts的异步版本（查询接口使用）"""
+    return (await db.execute(_hourly_alarm_counts_stmt(
+        start_time, end_time, camera_id, park_area_id, alarm_type, alarm_status
+    ))).all()
+
+
+def _stat_hour_expr(db: Session):
+    """SQL中告警时间截断到小时的表达式"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", AlarmDB.alarm_time)
+    return func.date_format(AlarmDB.alarm_time, "%Y-%m-%d %H:00:00")
+
+
+def rebuild_alarm_stats(db: Session, start_time: Optional[datetime] = None) -> int:
+    """
+    按告警表重建告警小时统计（一个事务内先删除再用INSERT ... SELECT重新汇总）
+
+    重建期间新增的告警会在重建提交后继续增量累加，建议在告警较少时执行。
+
+    告警表没有保存告警时摄像头所在的园区区域，重建的统计行使用摄像头当前的园区区域：
+    摄像头换过园区区域时，重建范围内的历史告警会计入新区域（影响告警最多的园区区域和按园区区域筛选的告警趋势），
+    与增量维护时"首次写入即固定"的园区区域不同。摄像头调整过园区区域后，应只重建调整之后的时间范围
+
+    Args:
+        db (Session): 数据库会话
+        start_time (Optional[datetime]): 只重建该时间所在小时及之后的统计（已归档的告警不在告警表中，
+            重建时应从归档水位开始，保留归档前的统计）；为None时重建全部
+
+    Returns:
+        int: 重建后的统计行数
+    """
+    hour = _stat_hour_expr(db)
+    aggregate = select(
+        hour,
+        AlarmDB.camera_id,
+        AlarmDB.alarm_type,
+        func.coalesce(AlarmDB.alarm_status, 0),
+        func.max(CameraInfoDB.park_area_id),
+        func.count(AlarmDB.alarm_id),
+    ).outerjoin(
+        CameraInfoDB, CameraInfoDB.camera_id == AlarmDB.camera_id
+    ).group_by(
+        hour, AlarmDB.camera_id, AlarmDB.alarm_type, func.coalesce(AlarmDB.alarm_status, 0)
+    )
+    clear = delete(AlarmStatsHourlyDB)
+    if start_time is not None:
+        start_hour = stat_hour(start_time)
+        aggregate = aggregate.where(AlarmDB.alarm_time >= start_hour)
+        clear = clear.where(AlarmStatsHourlyDB.stat_hour >= start_hour)
+    try:
+        db.execute(clear)
+        inserted = db.execute(sql_insert(AlarmStatsHourlyDB).from_select(
+            ["stat_hour", "camera_id", "alarm_type", "alarm_status", "park_area_id", "alarm_count"], aggregate
+        )).rowcount
+        db.commit()
+        invalidate_response_cache(TAG_ALARM_COUNT, TAG_ALARM_STATUS)
+    except Exception:
+        db.rollback()
+        raise
+    return inserted
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.DB_models.alarm_storm_summary_db import AlarmStormSummaryDB
+
+
+def create_alarm_storm_summaries(db: Session, summaries: Dict[Tuple[int, int], list]) -> int:
+    """
+    批量写入告警风暴汇总记录（一条多行INSERT）
+
+    Args:
+        db (Session): 数据库会话
+        summaries (Dict[Tuple[int, int], list]): {(摄像头ID, 告警类型): [被抑制次数, 第一次被抑制时间, 最后一次被抑制时间]}
+
+    Returns:
+        int: 写入的记录数
+    """
+    if not summaries:
+        return 0
+    now = datetime.now()
+    db.bulk_insert_mappings(AlarmStormSummaryDB, [
+        {
+            "camera_id": camera_id,
+            "alarm_type": alarm_type,
+            "suppressed_count": suppressed_count,
+            "window_start": window_start,
+            "window_end": window_end,
+            "create_time": now,
+        }
+        for (camera_id, alarm_type), (suppressed_count, window_start, window_end) in summaries.items()
+    ])
+    db.commit()
+    return len(summaries)
@@ -1,11 +1,24 @@
 from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select, tuple_
 from app.DB_models.camera_info_db import CameraInfoDB
 from app.DB_models.park_area_db import ParkAreaDB
 from app.JSON_schemas.camera_info_pydantic import CameraInfoCreate, CameraInfoUpdate
+from app.utils.pagination import Page, keyset_stmt, keyset_page, cached_count, async_cached_count
+from app.utils.response_cache import invalidate_response_cache, TAG_CAMERA
+
+
+def _camera_with_park_area_stmt():
+    """摄像头信息联表查询（包含园区区域名称），供同步和异步查询共用"""
+    return select(
+        CameraInfoDB,
+        ParkAreaDB.park_area
+    ).outerjoin(
+        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
+    )
 
 
 def get_camera_info(db: Session, camera_info_id: int) -> Optional[Tuple[CameraInfoDB, str]]:
@@ -19,16 +32,51 @@ def get_camera_info(db: Session, camera_info_id: int) -> Optional[Tuple[CameraIn
     Returns:
         Optional[Tuple[CameraInfoDB, str]]: 摄像头信息和园区区域名称的元组，或None
     """
-    result = db.query(
-        CameraInfoDB,
-        ParkAreaDB.park_area
-    ).outerjoin(
-        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
-    ).filter(
-        CameraInfoDB.camera_id == camera_info_id
+    return db.execute(
+        _camera_with_park_area_stmt().where(CameraInfoDB.camera_id == camera_info_id)
     ).first()
-    
-    return result
+
+
+async def async_get_camera_info(db: AsyncSession, camera_info_id: int) -> Optional[Tuple[CameraInfoDB, str]]:
+    """get_camera_info的异步版本（查询接口使用）"""
+    return (await db.execute(
+        _camera_with_park_area_stmt().where(CameraInfoDB.camera_id == camera_info_id)
+    )).first()
+
+
+# 摄像头列表的排序键：按摄像头ID升序（主键）
+CAMERA_PAGE_KEYS = (CameraInfoDB.camera_id,)
+
+
+def _camera_page_key(camera_info_row):
+    return camera_info_row[0].camera_id,
+
+
+def _camera_conditions(
+        park_area_id: Optional[int] = None,
+        analysis_mode: Optional[int] = None,
+        camera_status: Optional[int] = None
+) -> list:
+    """摄像头列表的筛选条件"""
+    conditions = []
+
+    # 添加园区区域ID条件
+    if park_area_id is not None:
+        conditions.append(CameraInfoDB.park_area_id == park_area_id)
+
+    # 添加分析模式条件
+    if analysis_mode is not None:
+        conditions.append(CameraInfoDB.analysis_mode == analysis_mode)
+
+    # 添加摄像头状态条件
+    if camera_status is not None:
+        conditions.append(CameraInfoDB.camera_status == camera_status)
+    return conditions
+
+
+def _camera_count_stmt(conditions: list):
+    """符合条件的摄像头总数（只查camera_info表，园区区域是多对一，不影响总数）"""
+    return select(func.count(CameraInfoDB.camera_id)).where(*conditions)
 
 
 def get_camera_infos_with_condition(
@@ -37,46 +85,53 @@ def get_camera_infos_with_condition(
         analysis_mode: Optional[int] = None,
         camera_status: Optional[int] = None,
         skip: int = 0,
-        limit: int = 10
-):
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Page:
     """
-    根据条件获取摄像头信息列表（支持分页），包含园区区域信息
+    根据条件获取摄像头信息列表（游标分页，按摄像头ID升序），包含园区区域信息
 
     Args:
         db (Session): 数据库会话
         park_area_id (Optional[int]): 园区区域ID
         analysis_mode (Optional[int]): 分析模式
         camera_status (Optional[int]): 摄像头状态
-        skip (int): 跳过的记录数，默认为0
+        skip (int): 跳过的记录数，默认为0（仅在不传游标时生效）
         limit (int): 限制返回的记录数，默认为10
+        cursor (Optional[str]): 上一次返回的next_cursor或prev_cursor
+        with_total (bool): 是否统计总数（总数会缓存一小段时间）
 
     Returns:
-        tuple: (总数, 摄像头信息列表)
+        Page: (总数, 摄像头信息列表, 下一页游标, 上一页游标)
     """
-    # 构建联表查询
-    query = db.query(
-        CameraInfoDB,
-        ParkAreaDB.park_area
-    ).outerjoin(
-        ParkAreaDB, CameraInfoDB.park_area_id == ParkAreaDB.park_area_id
+    conditions = _camera_conditions(park_area_id, analysis_mode, camera_status)
+    stmt, backward = keyset_stmt(
+        _camera_with_park_area_stmt().where(*conditions), CAMERA_PAGE_KEYS, False, cursor, skip, limit
     )
+    total = cached_count(db, _camera_count_stmt(conditions)) if with_total else None
+    cameras_with_details = db.execute(stmt).all()
+    return keyset_page(cameras_with_details, _camera_page_key, limit, backward, bool(cursor or skip), total)
 
-    # 添加园区区域ID条件
-    if park_area_id is not None:
-        query = query.filter(CameraInfoDB.park_area_id == park_area_id)
-
-    # 添加分析模式条件
-    if analysis_mode is not None:
-        query = query.filter(CameraInfoDB.analysis_mode == analysis_mode)
-
-    # 添加摄像头状态条件
-    if camera_status is not None:
-        query = query.filter(CameraInfoDB.camera_status == camera_status)
 
-    # 返回计数和分页结果
-    count = query.count()
-    cameras_with_details = query.offset(skip).limit(limit).all()
-    return count, cameras_with_details
+async def async_get_camera_infos_with_condition(
+        db: AsyncSession,
+        park_area_id: Optional[int] = None,
+        analysis_mode: Optional[int] = None,
+        camera_status: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+) -> Page:
+    """get_camera_infos_with_condition的异步版本（查询接口使用）"""
+    conditions = _camera_conditions(park_area_id, analysis_mode, camera_status)
+    stmt, backward = keyset_stmt(
+        _camera_with_park_area_stmt().where(*conditions), CAMERA_PAGE_KEYS, False, cursor, skip, limit
+    )
+    total = await async_cached_count(db, _camera_count_stmt(conditions)) if with_total else None
+    cameras_with_details = (await db.execute(stmt)).all()
+    return keyset_page(cameras_with_details, _camera_page_key, limit, backward, bool(cursor or skip), total)
 
 
 def get_all_camera_infos(db: Session, skip: int = 0, limit: int = 100) -> List[CameraInfoDB]:
@@ -110,6 +165,7 @@ def create_camera_info(db: Session, camera_info: CameraInfoCreate) -> Tuple[Came
     # 2. 提交到数据库
     db.add(db_camera_info)
     db.commit()
+    invalidate_response_cache(TAG_CAMERA)
     db.refresh(db_camera_info)  # 刷新实例，获取数据库自动生成的 id 等字段
     
     # 3. 查询关联的园区区域名称
@@ -155,6 +211,7 @@ def update_camera_info(
     
     # 提交修改
     db.commit()
+    invalidate_response_cache(TAG_CAMERA)
     db.refresh(db_camera_info)
     
     # 查询关联的园区区域名称
@@ -191,26 +248,84 @@ def delete_camera_infos(db: Session, camera_info_ids: List[int]) -> int:
 
     # 提交事务
     db.commit()
+    invalidate_response_cache(TAG_CAMERA)
 
     return deleted_count
 
 
+def _camera_status_stats_stmt():
+    """摄像头状态统计查询：一次扫描同时统计在线数和总数"""
+    return select(
+        # 在线摄像头数（camera_status = 1 或 2）
+        func.count(case((CameraInfoDB.camera_status.in_([1, 2]), 1))),
+        # 总摄像头数
+        func.count(CameraInfoDB.camera_id)
+    )
+
+
 def get_camera_status_stats(db: Session):
     """
     获取摄像头状态统计信息
-    
+
     Args:
         db (Session): 数据库会话
-        
+
     Returns:
         tuple: (在线摄像头数, 总摄像头数)
     """
-    # 查询在线摄像头数（camera_status = 1 或 2）
-    online_count = db.query(func.count(CameraInfoDB.camera_id)).filter(
-        CameraInfoDB.camera_status.in_([1, 2])
-    ).scalar()
-    
-    # 查询总摄像头数
-    total_count = db.query(func.count(CameraInfoDB.camera_id)).scalar()
-    
-    return online_count, total_count
\ No newline at end of file
+    return tuple(db.execute(_camera_status_stats_stmt()).one())
+
+
+async def async_get_camera_status_stats(db: AsyncSession):
+    """get_camera_status_stats的异步版本（查询接口使用）"""
+    return tuple((await db.execute(_camera_status_stats_stmt())).one())
+
+
+def get_camera_probe_targets(db: Session) -> List[Tuple[int, str, int]]:
+    """
+    获取所有摄像头的连通性探测目标
+
+    Args:
+        db (Session): 数据库会话
+
+    Returns:
+        List[Tuple[int, str, int]]: (摄像头ID, RTSP地址, 摄像头状态) 列表
+    """
+    return db.query(
+        CameraInfoDB.camera_id,
+        CameraInfoDB.rtsp_url,
+        CameraInfoDB.camera_status
+    ).all()
+
+
+def batch_update_camera_status(db: Session, camera_statuses: Dict[int, Tuple[int, int]]) -> int:
+    """
+    批量更新摄像头状态（一条UPDATE ... CASE语句，比较并设置：只更新状态仍为旧状态的摄像头，
+    探测期间被其他请求改过状态的摄像头不会被覆盖）
+
+    Args:
+        db (Session): 数据库会话
+        camera_statuses (Dict[int, Tuple[int, int]]): {摄像头ID: (旧状态, 新状态)}
+
+    Returns:
+        int: 更新的记录数
+    """
+    if not camera_statuses:
+        return 0
+    updated_count = db.query(CameraInfoDB).filter(
+        tuple_(CameraInfoDB.camera_id, CameraInfoDB.camera_status).in_(
+            [(camera_id, old_status) for camera_id, (old_status, _) in camera_statuses.items()]
+        )
+    ).update(
+        {
+            CameraInfoDB.camera_status: case(
+                {camera_id: new_status for camera_id, (_, new_status) in camera_statuses.items()},
+                value=CameraInfoDB.camera_id
+            ),
+            CameraInfoDB.update_time: datetime.now()
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    invalidate_response_cache(TAG_CAMERA)
+    return updated_count
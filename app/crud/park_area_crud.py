@@ -1,9 +1,12 @@
 from datetime import datetime
 from typing import Optional, List
 
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.DB_models.park_area_db import ParkAreaDB
 from app.JSON_schemas.park_area_pydantic import ParkAreaCreate, ParkAreaUpdate
+from app.utils.response_cache import invalidate_response_cache, TAG_PARK_AREA
 
 
 def get_park_area(db: Session, park_area_id: int) -> Optional[ParkAreaDB]:
@@ -20,6 +23,11 @@ def get_park_area(db: Session, park_area_id: int) -> Optional[ParkAreaDB]:
     return db.query(ParkAreaDB).filter(ParkAreaDB.park_area_id == park_area_id).first()
 
 
+async def async_get_park_area(db: AsyncSession, park_area_id: int) -> Optional[ParkAreaDB]:
+    """get_park_area的异步版本（查询接口使用）"""
+    return (await db.execute(select(ParkAreaDB).where(ParkAreaDB.park_area_id == park_area_id))).scalars().first()
+
+
 def get_park_area_by_name(db: Session, park_area: str) -> Optional[ParkAreaDB]:
     """
     根据名称获取园区区域信息
@@ -34,6 +42,16 @@ def get_park_area_by_name(db: Session, park_area: str) -> Optional[ParkAreaDB]:
     return db.query(ParkAreaDB).filter(ParkAreaDB.park_area == park_area).first()
 
 
+def _park_areas_with_condition_stmt(park_area: Optional[str] = None):
+    """按条件筛选的园区区域查询，供同步和异步查询共用"""
+    stmt = select(ParkAreaDB)
+
+    # 添加园区区域名称条件（模糊查询）
+    if park_area:
+        stmt = stmt.where(ParkAreaDB.park_area.like(f"%{park_area}%"))
+    return stmt
+
+
 def get_park_areas_with_condition(
         db: Session,
         park_area: Optional[str] = None,
@@ -52,13 +70,21 @@ def get_park_areas_with_condition(
     Returns:
         tuple: (总数, 园区区域信息列表)
     """
-    query = db.query(ParkAreaDB)
+    stmt = _park_areas_with_condition_stmt(park_area)
+    count = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    return count, db.execute(stmt.offset(skip).limit(limit)).scalars().all()
 
-    # 添加园区区域名称条件（模糊查询）
-    if park_area:
-        query = query.filter(ParkAreaDB.park_area.like(f"%{park_area}%"))
 
-    return query.count(), query.offset(skip).limit(limit).all()
+async def async_get_park_areas_with_condition(
+        db: AsyncSession,
+        park_area: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 10
+):
+    """get_park_areas_with_condition的异步版本（查询接口使用）"""
+    stmt = _park_areas_with_condition_stmt(park_area)
+    count = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar_one()
+    return count, (await db.execute(stmt.offset(skip).limit(limit))).scalars().all()
 
 
 def create_park_area(db: Session, park_area: ParkAreaCreate) -> ParkAreaDB:
@@ -77,6 +103,7 @@ def create_park_area(db: Session, park_area: ParkAreaCreate) -> ParkAreaDB:
     # 提交到数据库
     db.add(db_park_area)
     db.commit()
+    invalidate_response_cache(TAG_PARK_AREA)
     db.refresh(db_park_area)  # 刷新实例，获取数据库自动生成的 id 等字段
     return db_park_area
 
@@ -112,6 +139,7 @@ def update_park_area(
 
     # 提交修改
     db.commit()
+    invalidate_response_cache(TAG_PARK_AREA)
     db.refresh(db_park_area)
     return db_park_area
 
@@ -141,5 +169,6 @@ def delete_park_areas(db: Session, park_area_ids: List[int]) -> int:
 
     # 提交事务
     db.commit()
+    invalidate_response_cache(TAG_PARK_AREA)
 
     return deleted_count
\ No newline at end of file
@@ -1,8 +1,11 @@
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.DB_models.user_db import UserDB  # 数据库模型
 from app.JSON_schemas.user_pydantic import UserCreate, UserUpdate  # 请求模型
 from typing import Optional, List
 
+from app.utils.pagination import Page, keyset_stmt, keyset_page, cached_count, async_cached_count
 from app.utils.password_utils import get_password_hash
 
 """
@@ -29,42 +32,81 @@ def get_user(db: Session, user_id: int) -> Optional[UserDB]:
     """
     return db.query(UserDB).filter(UserDB.user_id == user_id).first()
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 10, 
-                 name: str = None, gender: int = None,
-                 start_time: str = None, end_time: str = None) -> List[UserDB]:
+
+async def async_get_user(db: AsyncSession, user_id: int) -> Optional[UserDB]:
+    """get_user的异步版本（查询接口使用）"""
+    return (await db.execute(select(UserDB).where(UserDB.user_id == user_id))).scalars().first()
+
+
+# 用户列表的排序键：按用户ID升序（主键）
+USER_PAGE_KEYS = (UserDB.user_id,)
+
+
+def _user_page_key(user: UserDB):
+    return user.user_id,
+
+
+def _user_conditions(name: str = None, gender: int = None,
+                     start_time: str = None, end_time: str = None) -> list:
+    """用户列表的筛选条件，供同步和异步查询共用"""
+    conditions = []
+
+    # 根据姓名筛选
+    if name:
+        conditions.append(UserDB.name.like(f"%{name}%"))
+
+    # 根据性别筛选
+    if gender is not None:
+        conditions.append(UserDB.gender == gender)
+
+    # 根据入职时间范围筛选
+    if start_time:
+        conditions.append(UserDB.create_time >= start_time)
+
+    if end_time:
+        conditions.append(UserDB.create_time <= end_time)
+    return conditions
+
+
+def get_all_users(db: Session, skip: int = 0, limit: int = 10,
+                  name: str = None, gender: int = None,
+                  start_time: str = None, end_time: str = None,
+                  cursor: Optional[str] = None, with_total: bool = True) -> Page:
     """
-    获取所有用户信息（支持分页和筛选）
+    获取所有用户信息（游标分页，按用户ID升序，支持筛选）
 
     Args:
         db (Session): 数据库会话
-        skip (int): 跳过的记录数，默认为0
+        skip (int): 跳过的记录数，默认为0（仅在不传游标时生效）
         limit (int): 限制返回的记录数，默认为10
         name (str): 用户姓名（模糊查询）
         gender (int): 用户性别
         start_time (str): 入职时间起始时间
         end_time (str): 入职时间结束时间
+        cursor (Optional[str]): 上一次返回的next_cursor或prev_cursor
+        with_total (bool): 是否统计总数（总数会缓存一小段时间）
 
     Returns:
-        List[UserDB]: 用户信息列表
+        Page: (总数, 用户信息列表, 下一页游标, 上一页游标)
     """
-    query = db.query(UserDB)
-    
-    # 根据姓名筛选
-    if name:
-        query = query.filter(UserDB.name.like(f"%{name}%"))
-    
-    # 根据性别筛选
-    if gender is not None:
-        query = query.filter(UserDB.gender == gender)
-    
-    # 根据入职时间范围筛选
-    if start_time:
-        query = query.filter(UserDB.create_time >= start_time)
-    
-    if end_time:
-        query = query.filter(UserDB.create_time <= end_time)
-    
-    return query.offset(skip).limit(limit).all()
+    conditions = _user_conditions(name, gender, start_time, end_time)
+    stmt, backward = keyset_stmt(select(UserDB).where(*conditions), USER_PAGE_KEYS, False, cursor, skip, limit)
+    total = cached_count(db, select(func.count(UserDB.user_id)).where(*conditions)) if with_total else None
+    users = db.execute(stmt).scalars().all()
+    return keyset_page(users, _user_page_key, limit, backward, bool(cursor or skip), total)
+
+
+async def async_get_all_users(db: AsyncSession, skip: int = 0, limit: int = 10,
+                              name: str = None, gender: int = None,
+                              start_time: str = None, end_time: str = None,
+                              cursor: Optional[str] = None, with_total: bool = True) -> Page:
+    """get_all_users的异步版本（查询接口使用）"""
+    conditions = _user_conditions(name, gender, start_time, end_time)
+    stmt, backward = keyset_stmt(select(UserDB).where(*conditions), USER_PAGE_KEYS, False, cursor, skip, limit)
+    total = await async_cached_count(db, select(func.count(UserDB.user_id)).where(*conditions)) if with_total else None
+    users = (await db.execute(stmt)).scalars().all()
+    return keyset_page(users, _user_page_key, limit, backward, bool(cursor or skip), total)
+
 
 def create_user(db: Session, user: UserCreate) -> UserDB:
     """
@@ -1,4 +1,4 @@
-from app.config.database import SessionLocal  # 导入数据库会话工厂
+from app.config.database import SessionLocal, AsyncSessionLocal  # 导入数据库会话工厂
 
 # 依赖函数：获取数据库会话（供接口调用）
 def get_db():
@@ -6,4 +6,10 @@ def get_db():
     try:
         yield db  # 把会话交给接口使用
     finally:
-        db.close()  # 接口处理完后，自动关闭会话（避免连接泄漏）
\ No newline at end of file
+        db.close()  # 接口处理完后，自动关闭会话（避免连接泄漏）
+
+
+# 依赖函数：获取异步数据库会话（供查询接口调用，不占用线程池）
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db  # 接口处理完后自动关闭会话，连接还回连接池
@@ -16,7 +16,16 @@ from app.api.v1.endpoints import camera_router  # 导入商品接口路由
 from app.api.v1.endpoints import safety_analysis_router  # 导入安全分析路由
 from app.api.v1.endpoints import sign_in_or_up_router  # 导入注册登录接口路由
 from app.api.v1.endpoints import user_router  # 导入用户接口路由
+from app.api.v1.endpoints import metrics_router  # 导入运行状态指标路由
+from app.api.v1.endpoints import dashboard_router  # 导入看板路由
+from app.config.database import async_engine
+from app.services.alarm_archive_service import AlarmArchiveService
+from app.services.alarm_storm_service import AlarmStormService
+from app.services.alarm_write_queue import alarm_write_queue
+from app.services.camera_probe_service import CameraProbeService
+from app.services.oss_delete_queue import oss_delete_queue
 from app.services.thread_pool_manager import shutdown_executor
+from app.services.tracker_recovery_service import TrackerRecoveryService
 from app.utils.jwt_utils import verify_token
 from app.utils.logger import get_logger
 
@@ -25,9 +34,21 @@ logger=get_logger()
 @asynccontextmanager
 async def lifespan(app66: FastAPI):
     # 启动前要执行的
+    alarm_write_queue.start()  # 告警后写队列的写入线程
+    await TrackerRecoveryService.start()  # 恢复告警跟踪器状态，并定期保存快照
+    CameraProbeService.start()  # 摄像头连通性后台探测
+    AlarmStormService.start()  # 告警风暴汇总定期写入
+    AlarmArchiveService.start()  # 超过保留天数的告警定期移入Parquet归档
     yield
     # 结束后要执行的
+    CameraProbeService.stop()
+    AlarmStormService.stop()
+    AlarmArchiveService.stop()
+    alarm_write_queue.stop()  # 写完队列中剩余的告警
+    oss_delete_queue.stop()  # 删完队列中剩余的OSS文件
+    TrackerRecoveryService.stop()
     shutdown_executor()
+    await async_engine.dispose()  # 关闭查询接口的异步连接池
 
 
 # 创建 FastAPI 实例
@@ -85,6 +106,8 @@ app.include_router(alarm_router.router,prefix="/api/v1/alarms",tags=["告警管
 app.include_router(user_router.router, prefix="/api/v1/users", tags=["用户管理"])
 app.include_router(camera_router.router, prefix="/api/v1/camera_infos", tags=["摄像头管理"])
 app.include_router(park_area_router.router, prefix="/api/v1/park_areas", tags=["园区区域管理"])
+app.include_router(metrics_router.router, prefix="/api/v1/metrics", tags=["运行状态指标"])
+app.include_router(dashboard_router.router, prefix="/api/v1/dashboard", tags=["看板"])
 
 # 根路径
 @app.get("/")
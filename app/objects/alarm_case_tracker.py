@@ -1,12 +1,59 @@
 import os
+import threading
 import time
 from datetime import datetime
 from collections import defaultdict
+
+import numpy as np
+
 from app.utils.oss_utils import get_now
 
 # 读取防抖配置
 DEBOUNCE_NORMAL_TO_VIOLATION = int(os.getenv("DEBOUNCE_NORMAL_TO_VIOLATION", 2))
 DEBOUNCE_VIOLATION_TO_NORMAL = int(os.getenv("DEBOUNCE_VIOLATION_TO_NORMAL", 3))
+# 按帧投票的防抖策略（k-of-n）：逗号分隔的"摄像头ID:告警类型=k/n"，摄像头ID和告警类型均可用*表示全部，
+# 如"12:0=3/5,*:2=4/6"；未配置的告警场景使用上面的时间窗口防抖
+ALARM_VOTING_POLICIES = os.getenv("ALARM_VOTING_POLICIES", "")
+
+# 投票窗口的最大帧数（每个来源的最近n帧检测结果存放在一个64位整数中）
+MAX_VOTING_WINDOW = 63
+
+
+def parse_voting_policies(spec: str) -> dict:
+    """
+    解析k-of-n投票策略配置
+
+    Args:
+        spec: 配置字符串，如"12:0=3/5,*:2=4/6"
+
+    Returns:
+        dict: {(camera_id | None, alarm_type | None): (k, n)}，None表示全部
+    """
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        source, _, vote = item.partition("=")
+        camera_id, _, alarm_type = source.strip().partition(":")
+        k, _, n = vote.strip().partition("/")
+        k, n = int(k), int(n)
+        # k必须超过半数，否则"k帧告警"和"k帧正常"可能同时成立，状态会来回切换
+        if not (n // 2 < k <= n <= MAX_VOTING_WINDOW):
+            raise ValueError(f"无效的告警投票策略: {item}（要求 n/2 < k <= n <= {MAX_VOTING_WINDOW}）")
+        key = (None if camera_id.strip() in ("", "*") else int(camera_id),
+               None if alarm_type.strip() in ("", "*") else int(alarm_type))
+        policies[key] = (k, n)
+    return policies
+
+
+VOTING_POLICIES = parse_voting_policies(ALARM_VOTING_POLICIES)
+
+
+def voting_policy_for(camera_id: int, alarm_type: int):
+    """获取告警场景的投票策略(k, n)，越具体的配置优先级越高；未配置时返回None（使用时间窗口防抖）"""
+    for key in ((camera_id, alarm_type), (camera_id, None), (None, alarm_type), (None, None)):
+        if key in VOTING_POLICIES:
+            return VOTING_POLICIES[key]
+    return None
+
 
 class DebouncedAlarmCaseTracker:
     def __init__(self):
@@ -99,3 +146,400 @@ class DebouncedAlarmCaseTracker:
     def bind_alarm_id(self, alarm_case_source, alarm_id):
         """将告警ID与当前告警状态绑定（用于后续更新告警记录）"""
         self.alarm_case_states[alarm_case_source]["alarm_id"] = alarm_id
+
+
+# 状态切换类型编码（CompactAlarmCaseTracker的返回值）
+TRANSITION_NONE = 0                 # 无状态切换
+TRANSITION_NORMAL_TO_VIOLATION = 1  # 正常→告警
+TRANSITION_VIOLATION_TO_NORMAL = 2  # 告警→正常
+
+# 状态切换类型编码 → DebouncedAlarmCaseTracker中的change_type
+TRANSITION_CHANGE_TYPES = {
+    TRANSITION_NONE: None,
+    TRANSITION_NORMAL_TO_VIOLATION: "normal_to_violation",
+    TRANSITION_VIOLATION_TO_NORMAL: "violation_to_normal",
+}
+
+
+class CompactAlarmCaseTracker:
+    """
+    紧凑版防抖告警跟踪器，状态切换逻辑与DebouncedAlarmCaseTracker完全一致
+
+    与DebouncedAlarmCaseTracker的区别：
+    1. 每个告警场景来源（如"12_0"）只在首次出现时分配一个整数槽位，之后用槽位号访问，不再做字符串拼接和字典查找
+    2. 所有状态存放在按槽位索引的NumPy数组中，每次更新不分配任何对象，返回整数切换编码
+    3. 使用time.monotonic()计时，不构造带时区的datetime，且不受系统时间调整影响
+    4. 支持一次性批量（向量化）更新多个槽位
+
+    每个槽位可单独改用k-of-n投票策略：最近n帧中有k帧检测到则确认告警，有k帧未检测到则确认恢复正常。
+    最近n帧的检测结果以位图形式存放（最新一帧在最低位），与分析帧率无关，单帧漏检也不会重置确认进度
+
+    多个安防分析线程共享同一个跟踪器，扩容时会替换状态数组，因此读写状态都在锁内进行
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.lock = threading.Lock()
+        self.slots = {}  # {alarm_case_source: 槽位号}
+        self.sources = []  # [alarm_case_source]，按槽位号排列
+        self.current_state = np.zeros(capacity, dtype=np.bool_)          # 当前确认状态（True=告警）
+        self.pending_state = np.full(capacity, -1, dtype=np.int8)        # 待确认状态：-1=无，0/1=待确认的状态
+        self.debounce_start_time = np.full(capacity, np.nan)             # 待确认状态的开始时间（monotonic秒），NaN=无
+        self.alarm_id = np.full(capacity, -1, dtype=np.int64)            # 关联的告警ID，-1=无
+        self.episode = np.zeros(capacity, dtype=np.int64)                # 告警轮次：每次确认正常→告警时加1
+        self.vote_k = np.zeros(capacity, dtype=np.int8)                  # 投票策略的k，0=使用时间窗口防抖
+        self.vote_n = np.zeros(capacity, dtype=np.int8)                  # 投票策略的n（窗口帧数）
+        self.vote_bits = np.zeros(capacity, dtype=np.uint64)             # 最近n帧的检测结果位图
+        self.unbound_closed_episodes = set()  # 绑定告警ID之前就已结束的告警轮次 {(槽位号, 告警轮次)}
+        self.detached_episodes = set()  # 不会绑定告警ID的告警轮次（如被限流） {(槽位号, 告警轮次)}
+
+    def slot_of(self, alarm_case_source) -> int:
+        """获取告警场景来源对应的槽位号，首次出现时分配新槽位"""
+        slot = self.slots.get(alarm_case_source)
+        if slot is None:
+            with self.lock:
+                slot = self.slots.get(alarm_case_source)
+                if slot is None:
+                    slot = len(self.sources)
+                    if slot == len(self.current_state):
+                        self._grow(slot * 2)
+                    self.sources.append(alarm_case_source)
+                    self.slots[alarm_case_source] = slot
+        return slot
+
+    def _grow(self, capacity):
+        """扩容状态数组（新槽位为初始状态）"""
+        size = len(self.current_state)
+        self.current_state = np.concatenate([self.current_state, np.zeros(capacity - size, dtype=np.bool_)])
+        self.pending_state = np.concatenate([self.pending_state, np.full(capacity - size, -1, dtype=np.int8)])
+        self.debounce_start_time = np.concatenate([self.debounce_start_time, np.full(capacity - size, np.nan)])
+        self.alarm_id = np.concatenate([self.alarm_id, np.full(capacity - size, -1, dtype=np.int64)])
+        self.episode = np.concatenate([self.episode, np.zeros(capacity - size, dtype=np.int64)])
+        self.vote_k = np.concatenate([self.vote_k, np.zeros(capacity - size, dtype=np.int8)])
+        self.vote_n = np.concatenate([self.vote_n, np.zeros(capacity - size, dtype=np.int8)])
+        self.vote_bits = np.concatenate([self.vote_bits, np.zeros(capacity - size, dtype=np.uint64)])
+
+    def set_voting_policy(self, slot: int, k: int, n: int):
+        """槽位改用k-of-n投票策略（k=0时恢复时间窗口防抖）"""
+        if k and not (n // 2 < k <= n <= MAX_VOTING_WINDOW):
+            raise ValueError(f"无效的告警投票策略: {k}/{n}（要求 n/2 < k <= n <= {MAX_VOTING_WINDOW}）")
+        with self.lock:
+            self.vote_k[slot] = k
+            self.vote_n[slot] = n
+            self.vote_bits[slot] = 0
+            self.pending_state[slot] = -1
+            self.debounce_start_time[slot] = np.nan
+
+    def update_slot(self, slot: int, alarm_case_detected: bool, now: float | None = None) -> int:
+        """
+        更新单个槽位的状态
+
+        Args:
+            slot: 槽位号（slot_of的返回值）
+            alarm_case_detected: 单帧检测结果
+            now: 当前时间（monotonic秒），默认取time.monotonic()
+
+        Returns:
+            int: 状态切换编码 TRANSITION_*
+        """
+        with self.lock:
+            return self._update_slot(slot, alarm_case_detected, now)
+
+    def _update_slot(self, slot, alarm_case_detected, now):
+        k = int(self.vote_k[slot])
+        if k:
+            return self._vote_slot(slot, alarm_case_detected, k)
+
+        current_state = bool(self.current_state[slot])
+        # 1. 检测结果与当前确认状态一致：重置待确认状态
+        if alarm_case_detected == current_state:
+            if self.pending_state[slot] >= 0:
+                self.pending_state[slot] = -1
+                self.debounce_start_time[slot] = np.nan
+            return TRANSITION_NONE
+
+        if now is None:
+            now = time.monotonic()
+        # 2.1 首次出现不一致：记录待确认状态和防抖开始时间
+        if self.pending_state[slot] < 0:
+            self.pending_state[slot] = alarm_case_detected
+            self.debounce_start_time[slot] = now
+            return TRANSITION_NONE
+
+        # 2.2 已存在待确认状态（必然与检测结果相同）：检查是否满足防抖时间窗口
+        required_debounce = DEBOUNCE_VIOLATION_TO_NORMAL if current_state else DEBOUNCE_NORMAL_TO_VIOLATION
+        if now - self.debounce_start_time[slot] < required_debounce:
+            return TRANSITION_NONE
+
+        # 2.3 防抖时间达标：确认状态切换
+        self.pending_state[slot] = -1
+        self.debounce_start_time[slot] = np.nan
+        return self._confirm_transition(slot, current_state)
+
+    def _vote_slot(self, slot, alarm_case_detected, k):
+        """k-of-n投票策略：把本帧检测结果移入位图，再按最近n帧的票数确认状态"""
+        n = int(self.vote_n[slot])
+        bits = ((int(self.vote_bits[slot]) << 1) | bool(alarm_case_detected)) & ((1 << n) - 1)
+        self.vote_bits[slot] = bits
+        positives = bits.bit_count()
+        current_state = bool(self.current_state[slot])
+        # 正常状态下k帧检测到则确认告警；告警状态下k帧未检测到则确认恢复正常
+        votes = n - positives if current_state else positives
+        if votes >= k:
+            return self._confirm_transition(slot, current_state)
+        return TRANSITION_NONE
+
+    def _confirm_transition(self, slot, current_state):
+        """确认状态切换"""
+        self.current_state[slot] = not current_state
+        if not current_state:
+            # 新的告警轮次，告警ID待绑定
+            self.episode[slot] += 1
+            self.alarm_id[slot] = -1
+        return TRANSITION_VIOLATION_TO_NORMAL if current_state else TRANSITION_NORMAL_TO_VIOLATION
+
+    def update_many(self, slots: np.ndarray, alarm_case_detected: np.ndarray, now: float | None = None) -> np.ndarray:
+        """
+        向量化更新多个槽位的状态（同一批次内槽位号不能重复）
+
+        Args:
+            slots: 槽位号数组
+            alarm_case_detected: 与slots一一对应的单帧检测结果（bool数组）
+            now: 当前时间（monotonic秒），默认取time.monotonic()
+
+        Returns:
+            np.ndarray: 与slots一一对应的状态切换编码 TRANSITION_*（int8数组）
+        """
+        if now is None:
+            now = time.monotonic()
+        slots = np.asarray(slots, dtype=np.intp)
+        detected = np.asarray(alarm_case_detected, dtype=np.bool_)
+        transitions = np.zeros(len(slots), dtype=np.int8)
+        with self.lock:
+            voting = self.vote_k[slots] > 0
+            if voting.any():
+                transitions[voting] = self._vote_many(slots[voting], detected[voting])
+                transitions[~voting] = self._update_many(slots[~voting], detected[~voting], now)
+            else:
+                transitions[:] = self._update_many(slots, detected, now)
+        return transitions
+
+    def _vote_many(self, slots, detected):
+        """k-of-n投票策略的向量化更新"""
+        k = self.vote_k[slots]
+        n = self.vote_n[slots]
+        masks = (np.uint64(1) << n.astype(np.uint64)) - np.uint64(1)
+        bits = ((self.vote_bits[slots] << np.uint64(1)) | detected.astype(np.uint64)) & masks
+        self.vote_bits[slots] = bits
+        positives = np.bitwise_count(bits)
+        current_state = self.current_state[slots]
+        confirmed = np.where(current_state, n - positives >= k, positives >= k)
+        return self._confirm_many(slots, current_state, confirmed)
+
+    def _confirm_many(self, slots, current_state, confirmed):
+        """批量确认状态切换，返回状态切换编码"""
+        self.current_state[slots] = current_state ^ confirmed
+        started = slots[confirmed & ~current_state]
+        self.episode[started] += 1
+        self.alarm_id[started] = -1
+        return np.where(confirmed,
+                        np.where(current_state, TRANSITION_VIOLATION_TO_NORMAL, TRANSITION_NORMAL_TO_VIOLATION),
+                        TRANSITION_NONE).astype(np.int8)
+
+    def _update_many(self, slots, detected, now):
+        """时间窗口防抖的向量化更新"""
+        current_state = self.current_state[slots]
+        pending_state = self.pending_state[slots]
+        debounce_start_time = self.debounce_start_time[slots]
+
+        same = detected == current_state
+        first = ~same & (pending_state < 0)
+        required_debounce = np.where(current_state, DEBOUNCE_VIOLATION_TO_NORMAL, DEBOUNCE_NORMAL_TO_VIOLATION)
+        confirmed = ~same & (pending_state >= 0) & (now - debounce_start_time >= required_debounce)
+
+        reset = same | confirmed
+        self.pending_state[slots] = np.where(reset, -1, np.where(first, detected, pending_state))
+        self.debounce_start_time[slots] = np.where(reset, np.nan, np.where(first, now, debounce_start_time))
+        return self._confirm_many(slots, current_state, confirmed)
+
+    def get_alarm_id(self, slot: int) -> int | None:
+        """获取槽位当前关联的告警ID"""
+        with self.lock:
+            alarm_id = int(self.alarm_id[slot])
+        return alarm_id if alarm_id >= 0 else None
+
+    def bind_slot_alarm_id(self, slot: int, alarm_id: int):
+        """将告警ID与槽位的当前告警状态绑定"""
+        with self.lock:
+            self.alarm_id[slot] = alarm_id
+
+    def current_episode(self, slot: int) -> int:
+        """获取槽位当前的告警轮次（在确认正常→告警后立即调用，用于之后绑定告警ID）"""
+        with self.lock:
+            return int(self.episode[slot])
+
+    def bind_episode_alarm_id(self, slot: int, episode: int, alarm_id: int):
+        """
+        将告警ID绑定到指定告警轮次（创建告警记录的后台线程调用）
+
+        该轮告警在绑定前已经确认结束时不再绑定（告警记录由所在的告警事件结束，见IncidentCorrelator.leave）
+
+        Args:
+            slot: 槽位号
+            episode: 告警轮次（current_episode的返回值）
+            alarm_id: 告警ID
+        """
+        with self.lock:
+            closed = (slot, episode) in self.unbound_closed_episodes
+            self.unbound_closed_episodes.discard((slot, episode))
+            if not closed and episode == self.episode[slot]:
+                self.alarm_id[slot] = alarm_id
+
+    def close_episode(self, slot: int):
+        """
+        结束槽位当前的告警轮次（确认告警→正常后由安防分析线程调用）
+
+        Args:
+            slot: 槽位号
+
+        Returns:
+            int | None: 已绑定的告警ID，调用方负责结束该告警记录；告警ID尚未绑定时返回None，
+                        该轮次会被记下，之后bind_episode_alarm_id不再绑定
+        """
+        with self.lock:
+            alarm_id = int(self.alarm_id[slot])
+            if alarm_id >= 0:
+                return alarm_id
+            key = (slot, int(self.episode[slot]))
+            if key in self.detached_episodes:
+                self.detached_episodes.discard(key)
+            else:
+                self.unbound_closed_episodes.add(key)
+            return None
+
+    def detach_episode(self, slot: int, episode: int):
+        """标记告警轮次不会绑定告警ID（如被限流未创建告警记录），结束时无需记下该轮次"""
+        with self.lock:
+            key = (slot, episode)
+            if key in self.unbound_closed_episodes:
+                # 该轮告警已经结束
+                self.unbound_closed_episodes.discard(key)
+            elif episode == self.episode[slot] and self.alarm_id[slot] < 0:
+                self.detached_episodes.add(key)
+
+    def restore_slot(self, slot: int, alarm_id: int, vote_bits: int | None = None):
+        """
+        恢复槽位的告警状态（服务重启后，将仍未结束的告警重新绑定到跟踪器）
+
+        Args:
+            slot: 槽位号
+            alarm_id: 未结束的告警ID
+            vote_bits: 投票策略的检测结果位图（来自状态快照），None时视为最近n帧全部检测到
+        """
+        with self.lock:
+            self.current_state[slot] = True
+            self.pending_state[slot] = -1
+            self.debounce_start_time[slot] = np.nan
+            self.episode[slot] += 1
+            self.alarm_id[slot] = alarm_id
+            if self.vote_k[slot]:
+                self.vote_bits[slot] = vote_bits if vote_bits is not None else (1 << int(self.vote_n[slot])) - 1
+
+    def get_state(self, alarm_case_source) -> dict:
+        """以DebouncedAlarmCaseTracker的状态结构返回某个告警场景的状态（用于日志）"""
+        slot = self.slot_of(alarm_case_source)
+        with self.lock:
+            current_state = bool(self.current_state[slot])
+            pending_state = int(self.pending_state[slot])
+            debounce_start_time = float(self.debounce_start_time[slot])
+        return {
+            "current_state": current_state,
+            "pending_state": bool(pending_state) if pending_state >= 0 else None,
+            "debounce_start_time": None if np.isnan(debounce_start_time) else debounce_start_time,
+            "alarm_id": self.get_alarm_id(slot)
+        }
+
+    # -------------------------- 兼容DebouncedAlarmCaseTracker的接口 --------------------------
+    def update_state(self, alarm_case_source, alarm_case_detected):
+        """与DebouncedAlarmCaseTracker.update_state的参数和返回值一致"""
+        slot = self.slot_of(alarm_case_source)
+        with self.lock:
+            alarm_id = int(self.alarm_id[slot])
+            transition = self._update_slot(slot, alarm_case_detected, None)
+            confirmed_state = bool(self.current_state[slot])
+        return {
+            "confirmed_state": confirmed_state,
+            "state_changed": transition != TRANSITION_NONE,
+            "change_type": TRANSITION_CHANGE_TYPES[transition],
+            "alarm_id": alarm_id if alarm_id >= 0 else None
+        }
+
+    def bind_alarm_id(self, alarm_case_source, alarm_id):
+        """将告警ID与当前告警状态绑定（用于后续更新告警记录）"""
+        self.bind_slot_alarm_id(self.slot_of(alarm_case_source), alarm_id)
+
+
+class ShardedAlarmCaseTracker:
+    """
+    按摄像头分片的告警跟踪器
+
+    每个摄像头独占一个CompactAlarmCaseTracker分片（槽位号即告警类型），分片有各自的锁，
+    不同摄像头的安防分析线程更新状态时互不竞争；只有摄像头首次出现时创建分片需要获取全局锁。
+    创建分片时按ALARM_VOTING_POLICIES为各告警类型选择防抖策略
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shards = {}  # {camera_id: CompactAlarmCaseTracker}
+
+    def shard_of(self, camera_id: int) -> CompactAlarmCaseTracker:
+        """获取摄像头的跟踪器分片，首次出现时创建"""
+        shard = self.shards.get(camera_id)
+        if shard is None:
+            with self.lock:
+                shard = self.shards.get(camera_id)
+                if shard is None:
+                    shard = CompactAlarmCaseTracker(capacity=3)
+                    for alarm_type in range(3):
+                        slot = shard.slot_of(f"{camera_id}_{alarm_type}")
+                        policy = voting_policy_for(camera_id, alarm_type)
+                        if policy:
+                            shard.set_voting_policy(slot, *policy)
+                    self.shards[camera_id] = shard
+        return shard
+
+    def _shard_of_source(self, alarm_case_source) -> CompactAlarmCaseTracker:
+        return self.shard_of(int(alarm_case_source.split("_")[0]))
+
+    def get_state(self, alarm_case_source) -> dict:
+        return self._shard_of_source(alarm_case_source).get_state(alarm_case_source)
+
+    # -------------------------- 兼容DebouncedAlarmCaseTracker的接口 --------------------------
+    def update_state(self, alarm_case_source, alarm_case_detected):
+        return self._shard_of_source(alarm_case_source).update_state(alarm_case_source, alarm_case_detected)
+
+    def bind_alarm_id(self, alarm_case_source, alarm_id):
+        self._shard_of_source(alarm_case_source).bind_alarm_id(alarm_case_source, alarm_id)
+
+    def restore_alarm(self, camera_id: int, alarm_type: int, alarm_id: int, vote_bits: int | None = None):
+        """将未结束的告警重新绑定到摄像头的跟踪器分片（服务重启后恢复状态）"""
+        self.shard_of(camera_id).restore_slot(alarm_type, alarm_id, vote_bits)
+
+    def export_snapshot(self) -> dict:
+        """
+        导出所有分片的紧凑状态快照
+
+        Returns:
+            dict: {"camera_ids": (N,), "current_state": (N, 3), "alarm_id": (N, 3), "vote_bits": (N, 3)}，第二维为告警类型
+        """
+        with self.lock:
+            shards = list(self.shards.items())
+        camera_ids = np.array([camera_id for camera_id, _ in shards], dtype=np.int64)
+        current_state = np.zeros((len(shards), 3), dtype=np.bool_)
+        alarm_id = np.full((len(shards), 3), -1, dtype=np.int64)
+        vote_bits = np.zeros((len(shards), 3), dtype=np.uint64)
+        for i, (_, shard) in enumerate(shards):
+            with shard.lock:
+                current_state[i] = shard.current_state[:3]
+                alarm_id[i] = shard.alarm_id[:3]
+                vote_bits[i] = shard.vote_bits[:3]
+        return {"camera_ids": camera_ids, "current_state": current_state, "alarm_id": alarm_id, "vote_bits": vote_bits}
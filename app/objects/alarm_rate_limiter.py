@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+
+from app.utils.oss_utils import get_now
+
+load_dotenv()
+
+# 告警限流配置（令牌桶，每个摄像头每种告警类型一个桶）
+ALARM_RATE_LIMIT_BURST = float(os.getenv("ALARM_RATE_LIMIT_BURST", 3))            # 桶容量：允许连续创建的告警数
+ALARM_RATE_LIMIT_PER_MINUTE = float(os.getenv("ALARM_RATE_LIMIT_PER_MINUTE", 2))  # 令牌补充速率：每分钟允许创建的告警数
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated_at", "allowed_total", "suppressed_total")
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated_at = now
+        self.allowed_total = 0      # 累计放行的告警数
+        self.suppressed_total = 0   # 累计被限流的告警数
+
+
+class AlarmRateLimiter:
+    """
+    告警创建限流器
+
+    每个(摄像头ID, 告警类型)一个令牌桶，创建新告警前先取令牌；取不到令牌的告警不创建告警记录、不上传截图、不广播，
+    只按来源累计被抑制的次数，由后台任务定期汇总写入告警风暴汇总表。一个异常摄像头造成的写入和上传量因此有硬上限
+    """
+
+    def __init__(self, capacity: float = ALARM_RATE_LIMIT_BURST, per_minute: float = ALARM_RATE_LIMIT_PER_MINUTE):
+        self.capacity = capacity
+        self.refill_rate = per_minute / 60.0  # 每秒补充的令牌数
+        self.lock = threading.Lock()
+        self.buckets: Dict[Tuple[int, int], _TokenBucket] = {}
+        # 尚未写入汇总表的被抑制告警 {(摄像头ID, 告警类型): [被抑制次数, 第一次被抑制时间, 最后一次被抑制时间]}
+        self.pending_summaries: Dict[Tuple[int, int], list] = {}
+
+    def try_acquire(self, camera_id: int, alarm_type: int) -> bool:
+        """
+        尝试为一次新告警取令牌
+
+        Returns:
+            bool: True=允许创建告警；False=被限流（已计入汇总）
+        """
+        now = time.monotonic()
+        key = (camera_id, alarm_type)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = _TokenBucket(self.capacity, now)
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_rate)
+            bucket.updated_at = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.allowed_total += 1
+                return True
+
+            bucket.suppressed_total += 1
+            alarm_time = get_now()
+            summary = self.pending_summaries.get(key)
+            if summary is None:
+                self.pending_summaries[key] = [1, alarm_time, alarm_time]
+            else:
+                summary[0] += 1
+                summary[2] = alarm_time
+            return False
+
+    def drain_summaries(self) -> Dict[Tuple[int, int], list]:
+        """取出并清空尚未写入的告警风暴汇总"""
+        with self.lock:
+            summaries, self.pending_summaries = self.pending_summaries, {}
+        return summaries
+
+    def restore_summaries(self, summaries: Dict[Tuple[int, int], list]):
+        """汇总写入失败时放回，下次一并写入"""
+        with self.lock:
+            for key, (count, window_start, window_end) in summaries.items():
+                summary = self.pending_summaries.get(key)
+                if summary is None:
+                    self.pending_summaries[key] = [count, window_start, window_end]
+                else:
+                    summary[0] += count
+                    summary[1] = window_start
+
+    def get_metrics(self) -> dict:
+        """限流器状态（用于监控指标接口）"""
+        now = time.monotonic()
+        with self.lock:
+            buckets = [
+                {
+                    "camera_id": camera_id,
+                    "alarm_type": alarm_type,
+                    "tokens": round(min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_rate), 2),
+                    "allowed_total": bucket.allowed_total,
+                    "suppressed_total": bucket.suppressed_total,
+                    "pending_suppressed": self.pending_summaries.get((camera_id, alarm_type), [0])[0],
+                }
+                for (camera_id, alarm_type), bucket in self.buckets.items()
+            ]
+        return {
+            "burst": self.capacity,
+            "per_minute": self.refill_rate * 60,
+            "limited_sources": sum(1 for bucket in buckets if bucket["tokens"] < 1),
+            "suppressed_total": sum(bucket["suppressed_total"] for bucket in buckets),
+            "buckets": buckets,
+        }
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 同一园区区域、同一告警类型的告警在该时间窗口内（距事件最近一次有摄像头加入）合并为一个事件（秒）
+INCIDENT_WINDOW_SECONDS = float(os.getenv("INCIDENT_WINDOW_SECONDS", 60))
+
+
+class Incident:
+    """一个跨摄像头的告警事件（对应一条告警记录）"""
+
+    __slots__ = ("park_area_id", "alarm_type", "camera_ids", "last_join_time", "alarm_future", "insert_future")
+
+    def __init__(self, park_area_id, alarm_type, now):
+        self.park_area_id = park_area_id
+        self.alarm_type = alarm_type
+        self.camera_ids = set()         # 当前仍处于告警状态的摄像头
+        self.last_join_time = now       # 最近一次有摄像头加入的时间（monotonic秒）
+        self.alarm_future = Future()    # 结果：事件对应的告警ID（创建告警记录之前出错时为None）
+        self.insert_future = None       # 告警记录的写入结果（恢复的事件为None，告警记录已存在）
+
+
+class IncidentCorrelator:
+    """
+    跨摄像头告警事件关联器
+
+    同一园区区域内多个摄像头拍到同一起事件（如同一处火情）时，只有第一个确认告警的摄像头创建告警记录、
+    上传截图并广播，之后在时间窗口内确认告警的摄像头直接加入该事件；所有成员摄像头都恢复正常后事件才结束。
+    键为(园区区域ID, 告警类型)
+    """
+
+    def __init__(self, window_seconds: float = INCIDENT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self.incidents: Dict[Tuple[int, int], Incident] = {}             # {(园区区域ID, 告警类型): 最新的未结束事件}
+        self.camera_incidents: Dict[Tuple[int, int], Incident] = {}      # {(摄像头ID, 告警类型): 摄像头所在的事件}
+
+    def join(self, park_area_id: int, alarm_type: int, camera_id: int,
+             admit: Optional[Callable[[], bool]] = None) -> Tuple[Incident | None, bool]:
+        """
+        摄像头确认告警（正常→告警）时调用
+
+        Args:
+            park_area_id: 园区区域ID
+            alarm_type: 告警类型
+            camera_id: 摄像头ID
+            admit: 需要创建新事件时调用（在锁内，如告警限流），返回False时不创建事件，
+                   其他摄像头也就不会加入一个不会有告警记录的事件
+
+        Returns:
+            Tuple[Incident | None, bool]: (摄像头所在的事件, 是否为新事件)；新事件由调用方创建告警记录并设置alarm_future；
+                                          admit拒绝创建时返回(None, False)
+        """
+        now = time.monotonic()
+        key = (park_area_id, alarm_type)
+        with self.lock:
+            incident = self.incidents.get(key)
+            created = incident is None or not incident.camera_ids or now - incident.last_join_time > self.window_seconds
+            if created:
+                if admit is not None and not admit():
+                    return None, False
+                incident = Incident(park_area_id, alarm_type, now)
+                self.incidents[key] = incident
+            incident.camera_ids.add(camera_id)
+            incident.last_join_time = now
+            self.camera_incidents[(camera_id, alarm_type)] = incident
+            return incident, created
+
+    def leave(self, alarm_type: int, camera_id: int) -> Tuple[Incident | None, bool]:
+        """
+        摄像头确认恢复正常（告警→正常）时调用
+
+        Returns:
+            Tuple[Incident | None, bool]: (摄像头所在的事件, 事件是否已结束)；事件结束时由调用方写入告警结束时间
+        """
+        with self.lock:
+            incident = self.camera_incidents.pop((camera_id, alarm_type), None)
+            if incident is None:
+                return None, False
+            incident.camera_ids.discard(camera_id)
+            if incident.camera_ids:
+                return incident, False
+            key = (incident.park_area_id, alarm_type)
+            if self.incidents.get(key) is incident:
+                del self.incidents[key]
+            return incident, True
+
+    def restore(self, park_area_id: int, alarm_type: int, camera_id: int, alarm_id: int):
+        """服务重启后恢复未结束的事件（由告警跟踪器状态恢复调用）"""
+        incident = Incident(park_area_id, alarm_type, time.monotonic())
+        incident.camera_ids.add(camera_id)
+        incident.alarm_future.set_result(alarm_id)
+        with self.lock:
+            # 每条未结束的告警单独恢复为一个事件，保证每条告警记录最终都会结束
+            self.incidents[(park_area_id, alarm_type)] = incident
+            self.camera_incidents[(camera_id, alarm_type)] = incident
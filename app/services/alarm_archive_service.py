@@ -0,0 +1,112 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.config.database import analysis_session
+from app.crud.alarm_archive_crud import (
+    ALARM_COLUMNS, HANDLE_RECORD_COLUMNS, get_archive_watermark, set_archive_watermark, write_archive_partition
+)
+from app.crud.alarm_crud import get_oldest_alarm_time, get_alarm_details_in_range, delete_alarms_and_related_records
+from app.crud.alarm_handle_record_crud import get_alarm_handle_records_by_alarm_ids
+from app.services.thread_pool_manager import db_executor
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 告警在数据库中保留的天数，更早的告警（及其处理记录）移入Parquet归档
+ALARM_RETENTION_DAYS = int(os.getenv("ALARM_RETENTION_DAYS", 180))
+# 归档任务运行周期（秒）
+ALARM_ARCHIVE_INTERVAL = float(os.getenv("ALARM_ARCHIVE_INTERVAL", 3600))
+
+
+class AlarmArchiveService:
+    """
+    告警归档服务
+
+    定期将超过保留天数的告警和处理记录按告警日期写入Parquet分区文件，再从数据库中删除，
+    数据库只保留近期的热数据；告警列表查询的时间范围早于归档水位时会合并查询归档
+    """
+    archive_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def archive_expired_alarms(retention_days: int = ALARM_RETENTION_DAYS) -> int:
+        """
+        归档超过保留天数的告警，每次处理一天的告警（写入分区 -> 推进归档水位 -> 删除数据库记录）
+
+        先推进水位再删除：中途失败时告警列表会同时查到两边的同一条告警（按告警ID去重），而不会漏查；
+        重新归档同一天时分区文件按主键去重，不会产生重复记录
+
+        Args:
+            retention_days (int): 数据库中保留的天数
+
+        Returns:
+            int: 归档的告警数
+        """
+        cutoff = datetime.combine(datetime.now().date() - timedelta(days=retention_days), datetime.min.time())
+        archived_count = 0
+        while True:
+            with analysis_session() as db:
+                oldest = get_oldest_alarm_time(db)
+                if oldest is None or oldest >= cutoff:
+                    break
+                day = oldest.date()
+                day_start = datetime.combine(day, datetime.min.time())
+                day_end = min(day_start + timedelta(days=1), cutoff)
+
+                alarm_rows = []
+                for row in get_alarm_details_in_range(db, day_start, day_end):
+                    alarm_row = {name: getattr(row.AlarmDB, name) for name in ALARM_COLUMNS}
+                    alarm_row.update(camera_name=row.camera_name, park_area=row.park_area,
+                                     handle_user_name=row.handle_user_name)
+                    alarm_rows.append(alarm_row)
+                alarm_ids = [alarm_row["alarm_id"] for alarm_row in alarm_rows]
+                handle_record_rows = [
+                    {name: getattr(record, name) for name in HANDLE_RECORD_COLUMNS}
+                    for record in get_alarm_handle_records_by_alarm_ids(db, alarm_ids)
+                ]
+
+                write_archive_partition(day, alarm_rows, handle_record_rows)
+                watermark = get_archive_watermark()
+                if watermark is None or watermark < day_end:
+                    set_archive_watermark(day_end)
+                delete_alarms_and_related_records(db, alarm_ids)
+
+            archived_count += len(alarm_ids)
+            logger.info(f"已归档 {day} 的告警 {len(alarm_ids)} 条，处理记录 {len(handle_record_rows)} 条")
+        return archived_count
+
+    @classmethod
+    async def _archive_loop(cls):
+        """后台周期归档"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(db_executor, cls.archive_expired_alarms)
+            except Exception as e:
+                logger.error(f"归档告警失败: {e}")
+            await asyncio.sleep(ALARM_ARCHIVE_INTERVAL)
+
+    @classmethod
+    def start(cls):
+        """启动后台归档任务（需在事件循环中调用）"""
+        if cls.archive_task is None or cls.archive_task.done():
+            cls.archive_task = asyncio.create_task(cls._archive_loop())
+
+    @classmethod
+    def stop(cls):
+        """停止后台归档任务"""
+        if cls.archive_task is not None:
+            cls.archive_task.cancel()
+            cls.archive_task = None
+
+
+if __name__ == "__main__":
+    # 手动归档：python -m app.services.alarm_archive_service [保留天数]
+    import sys
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ALARM_RETENTION_DAYS
+    print(f"已归档告警 {AlarmArchiveService.archive_expired_alarms(days)} 条")
@@ -19,22 +19,65 @@ broadcast_thread = threading.Thread(
 )
 broadcast_thread.start()
 
-async def _async_broadcast_alarm(alarm):
+# 告警截图状态（截图在告警广播之后并行上传）
+SNAPSHOT_STATUS_PENDING = "pending"  # 截图上传中
+SNAPSHOT_STATUS_READY = "ready"      # 截图已上传
+SNAPSHOT_STATUS_FAILED = "failed"    # 截图全部上传失败
+
+async def _async_broadcast_alarm(alarm, snapshot_status):
     """内部异步广播告警函数（供事件循环调用）"""
     alarm_dict = {
+        "event": "alarm_created",
         "alarm_id": alarm.alarm_id,
         "camera_id": alarm.camera_id,
         "alarm_type": alarm.alarm_type,
         "alarm_status": alarm.alarm_status,
         "alarm_time": alarm.alarm_time.isoformat() if alarm.alarm_time else None,
         "snapshot_url": alarm.snapshot_url,
+        "snapshot_status": snapshot_status,
     }
     await manager.broadcast(alarm_dict)
 
-def sync_broadcast_alarm(alarm):
+def sync_broadcast_alarm(alarm, snapshot_status=SNAPSHOT_STATUS_READY):
     """同步接口：将告警广播任务提交到全局事件循环（线程安全）"""
     logger.info(f"广播告警: Alarm ID={alarm.alarm_id}, 类型={AlarmCase.descs[alarm.alarm_type]}")
     asyncio.run_coroutine_threadsafe(
-        _async_broadcast_alarm(alarm),
+        _async_broadcast_alarm(alarm, snapshot_status),
+        loop=broadcast_loop
+    )
+
+
+async def _async_broadcast_alarm_snapshot(alarm_id, snapshot_url, snapshot_status):
+    """内部异步广播告警截图函数（供事件循环调用）"""
+    await manager.broadcast({
+        "event": "alarm_snapshot",
+        "alarm_id": alarm_id,
+        "snapshot_url": snapshot_url,
+        "snapshot_status": snapshot_status,
+    })
+
+def sync_broadcast_alarm_snapshot(alarm_id, snapshot_url, snapshot_status):
+    """同步接口：告警截图上传完成（或失败）后广播截图URL，线程安全"""
+    logger.info(f"广播告警截图: Alarm ID={alarm_id}, 状态={snapshot_status}")
+    asyncio.run_coroutine_threadsafe(
+        _async_broadcast_alarm_snapshot(alarm_id, snapshot_url, snapshot_status),
+        loop=broadcast_loop
+    )
+
+
+async def _async_broadcast_incident_update(alarm_id, alarm_type, camera_ids):
+    """内部异步广播事件更新函数（供事件循环调用）"""
+    await manager.broadcast({
+        "event": "incident_update",
+        "alarm_id": alarm_id,
+        "alarm_type": alarm_type,
+        "camera_ids": camera_ids,
+    })
+
+def sync_broadcast_incident_update(alarm_id, alarm_type, camera_ids):
+    """同步接口：广播跨摄像头事件更新（有新的摄像头加入已有告警），线程安全"""
+    logger.info(f"广播事件更新: Alarm ID={alarm_id}, 类型={AlarmCase.descs[alarm_type]}, 涉及摄像头={camera_ids}")
+    asyncio.run_coroutine_threadsafe(
+        _async_broadcast_incident_update(alarm_id, alarm_type, camera_ids),
         loop=broadcast_loop
     )
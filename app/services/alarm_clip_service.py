@@ -0,0 +1,202 @@
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.services.storage_service import StorageService
+from app.services.thread_pool_manager import upload_executor
+from app.utils.logger import get_logger
+from app.utils.pyav_capture import av
+
+load_dotenv()
+logger = get_logger()
+
+# 告警视频片段配置
+CLIP_PRE_SECONDS = float(os.getenv("CLIP_PRE_SECONDS", 10))   # 告警前缓存的视频时长（秒）
+CLIP_POST_SECONDS = float(os.getenv("CLIP_POST_SECONDS", 10))  # 告警后继续录制的视频时长（秒）
+CLIP_BUFFER_MAX_BYTES = int(os.getenv("CLIP_BUFFER_MAX_BYTES", 32 * 1024 * 1024))  # 每路摄像头缓存的压缩包总字节数上限
+
+
+class _ClipRecording:
+    """一次正在进行的告警视频片段录制（告警前缓存 + 告警后M秒）"""
+
+    def __init__(self, camera_id, stream, packets, end_seconds):
+        self.camera_id = camera_id
+        self.stream = stream
+        self.packets = packets          # [(packet, pts, dts, 时间戳秒)]
+        self.end_seconds = end_seconds  # 录制截止的码流时间（秒）
+        self.future = Future()          # 结果：视频片段URL（失败时为None）
+
+
+class CameraPacketBuffer:
+    """
+    单路摄像头的压缩包环形缓存
+
+    只缓存解复用得到的压缩包（不缓存解码后的帧），内存按时长和字节数双重限制；
+    按GOP（从一个关键帧到下一个关键帧之前的包）整体淘汰，缓存总是从关键帧开始，保证截取的片段可以直接封装播放，
+    并且至少保留最近一个GOP（GOP比缓存时长还长时也有告警前的画面，字节数因此最多超出上限一个GOP）
+    """
+
+    def __init__(self, camera_id: int, max_seconds: float = CLIP_PRE_SECONDS, max_bytes: int = CLIP_BUFFER_MAX_BYTES):
+        self.camera_id = camera_id
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.stream = None
+        self.packets = deque()  # (packet, pts, dts, 时间戳秒)
+        self.gops = deque()     # 缓存中的GOP [起始关键帧时间戳秒, 字节数, 包数]，与packets顺序一致
+        self.total_bytes = 0
+        self.recordings: List[_ClipRecording] = []
+        self.lock = threading.Lock()
+
+    def on_packet(self, packet, stream):
+        """PyAV解复用回调：缓存压缩包，并追加到正在进行的录制中（在安防分析线程中调用）"""
+        if packet.pts is None or packet.time_base is None:
+            return
+        seconds = float(packet.pts * packet.time_base)
+        item = (packet, packet.pts, packet.dts, seconds)
+        finished = []
+        with self.lock:
+            self.stream = stream
+            if packet.is_keyframe:
+                self.gops.append([seconds, 0, 0])
+            if self.gops:
+                # 第一个关键帧之前的包无法单独解码，不缓存
+                self.packets.append(item)
+                self.total_bytes += packet.size
+                self.gops[-1][1] += packet.size
+                self.gops[-1][2] += 1
+                self._evict(seconds)
+
+            for recording in self.recordings:
+                if seconds > recording.end_seconds:
+                    finished.append(recording)
+                else:
+                    recording.packets.append(item)
+            if finished:
+                self.recordings = [r for r in self.recordings if r not in finished]
+
+        for recording in finished:
+            AlarmClipService.finish_recording(recording)
+
+    def _evict(self, newest_seconds):
+        """按GOP整体淘汰：下一个GOP仍能覆盖整个缓存时长，或超出字节数上限时淘汰最早的GOP（至少保留一个GOP）"""
+        gops = self.gops
+        while len(gops) > 1 and (newest_seconds - gops[1][0] >= self.max_seconds or self.total_bytes > self.max_bytes):
+            self._drop_oldest_gop()
+
+    def _drop_oldest_gop(self):
+        _, gop_bytes, gop_packets = self.gops.popleft()
+        for _ in range(gop_packets):
+            self.packets.popleft()
+        self.total_bytes -= gop_bytes
+
+    def start_recording(self, post_seconds: float = CLIP_POST_SECONDS) -> Optional[_ClipRecording]:
+        """以当前缓存为起点开始录制，再继续录制post_seconds秒"""
+        with self.lock:
+            if self.stream is None or not self.packets:
+                return None
+            recording = _ClipRecording(self.camera_id, self.stream, list(self.packets),
+                                       self.packets[-1][3] + post_seconds)
+            self.recordings.append(recording)
+            return recording
+
+    def close(self):
+        """摄像头停止分析：以已录制的内容结束所有进行中的录制，并清空缓存"""
+        with self.lock:
+            recordings, self.recordings = self.recordings, []
+            self.packets.clear()
+            self.gops.clear()
+            self.total_bytes = 0
+        for recording in recordings:
+            AlarmClipService.finish_recording(recording)
+
+
+class AlarmClipService:
+    # 各摄像头的压缩包缓存 {camera_id: CameraPacketBuffer}
+    buffers: Dict[int, CameraPacketBuffer] = {}
+    buffers_lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, camera_id: int) -> Optional[CameraPacketBuffer]:
+        """为摄像头创建压缩包缓存，返回的缓存对象的on_packet作为PyAV的packet_listener"""
+        if av is None:
+            return None
+        buffer = CameraPacketBuffer(camera_id)
+        with cls.buffers_lock:
+            cls.buffers[camera_id] = buffer
+        return buffer
+
+    @classmethod
+    def detach(cls, camera_id: int):
+        """移除摄像头的压缩包缓存"""
+        with cls.buffers_lock:
+            buffer = cls.buffers.pop(camera_id, None)
+        if buffer is not None:
+            buffer.close()
+
+    @classmethod
+    def request_clip(cls, camera_id: int) -> Optional[Future]:
+        """
+        为告警请求一段视频片段（告警前N秒缓存 + 告警后M秒）
+
+        Args:
+            camera_id: 摄像头ID
+
+        Returns:
+            Optional[Future]: 录制完成并上传后得到视频片段URL的Future；摄像头没有压缩包缓存（如使用OpenCV解码）时返回None
+        """
+        buffer = cls.buffers.get(camera_id)
+        if buffer is None:
+            return None
+        recording = buffer.start_recording()
+        return recording.future if recording else None
+
+    @classmethod
+    def finish_recording(cls, recording: _ClipRecording):
+        """录制结束：提交到后台线程封装为MP4并上传"""
+        def remux_and_upload():
+            try:
+                clip_bytes = cls.remux_to_mp4(recording.stream, recording.packets)
+                clip_url = StorageService.upload_alarm_clip(clip_bytes, recording.camera_id)
+                logger.info(f"已经保存告警视频片段到云OSS，访问URL: {clip_url}")
+                recording.future.set_result(clip_url)
+            except Exception as e:
+                logger.error(f"生成告警视频片段时发生错误: {e}")
+                recording.future.set_result(None)
+
+        # 任务因上传线程池队列已满被丢弃时，告警不关联视频片段
+        upload_executor.submit(remux_and_upload).add_done_callback(
+            lambda future: recording.future.set_result(None) if future.cancelled() else None
+        )
+
+    @staticmethod
+    def remux_to_mp4(stream, packets) -> bytes:
+        """
+        将压缩包直接封装为MP4（只做重封装，不解码、不重新编码）
+
+        Args:
+            stream: 输入视频流（作为输出流的编码参数模板）
+            packets: [(packet, pts, dts, 时间戳秒)]，第一个包为关键帧
+
+        Returns:
+            bytes: MP4文件内容
+        """
+        output_buffer = io.BytesIO()
+        with av.open(output_buffer, mode="w", format="mp4", options={"movflags": "faststart"}) as output:
+            output_stream = output.add_stream_from_template(stream)
+            # 时间戳以片段第一个包为零点
+            base = packets[0][2] if packets[0][2] is not None else packets[0][1]
+            for packet, pts, dts, _ in packets:
+                # 缓存中的包可能同时属于多个片段，复制一份再修改时间戳
+                clip_packet = av.Packet(bytes(packet))
+                clip_packet.is_keyframe = packet.is_keyframe
+                clip_packet.time_base = packet.time_base
+                clip_packet.pts = pts - base
+                clip_packet.dts = dts - base if dts is not None else None
+                clip_packet.stream = output_stream
+                output.mux(clip_packet)
+        return output_buffer.getvalue()
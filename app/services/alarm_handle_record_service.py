@@ -10,9 +10,8 @@ from app.crud.alarm_handle_record_crud import (
     get_alarm_handle_records as crud_get_alarm_handle_records,
     create_alarm_handle_record as crud_create_alarm_handle_record
 )
-from app.crud.alarm_crud import update_alarm_status
 from app.services.storage_service import StorageService
-from app.services.thread_pool_manager import executor as db_executor
+from app.services.thread_pool_manager import db_executor, upload_executor
 
 
 class AlarmHandleRecordService:
@@ -50,19 +49,10 @@ class AlarmHandleRecordService:
         """
         try:
             def _create_record():
-                # 创建告警处理记录
+                # 创建告警处理记录（同一事务中按处理动作更新告警状态和最新处理人）
                 created_record = crud_create_alarm_handle_record(db, record_create)
-
-                # 根据处理动作类型更新对应告警记录的状态
-                if record_create.handle_action == 1:  # 派单处理
-                    update_alarm_status(db, record_create.alarm_id, 2)  # 告警状态为2表示"处理中（已派单）"
-                elif record_create.handle_action == 2:  # 标记已解决
-                    update_alarm_status(db, record_create.alarm_id, 3)  # 告警状态为3表示"处理完成"
-                elif record_create.handle_action == 0:  # 标记误报
-                    update_alarm_status(db, record_create.alarm_id, 1)  # 告警状态为1表示"确认误报"
-
                 return Result.SUCCESS(created_record, "处理记录创建成功")
-            
+
             # 使用线程池执行数据库操作
             return await asyncio.get_event_loop().run_in_executor(db_executor, _create_record)
         except Exception as e:
@@ -89,6 +79,6 @@ class AlarmHandleRecordService:
                 return Result.SUCCESS(file_url, "附件上传成功")
             
             # 使用线程池执行存储操作
-            return await asyncio.get_event_loop().run_in_executor(db_executor, _upload_attachment)
+            return await asyncio.get_event_loop().run_in_executor(upload_executor, _upload_attachment)
         except Exception as e:
             return Result.ERROR(f"附件上传失败: {str(e)}")
\ No newline at end of file
@@ -2,34 +2,103 @@ import asyncio
 from datetime import datetime
 from typing import Optional, List
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
-from app.JSON_schemas.alarm_pydantic import AlarmPageResponse, AlarmResponse, AlarmReport, AlarmPercent, TopAlarmAreasReport, TopAlarmArea, TodayAlarmHandleReport
+from app.JSON_schemas.alarm_pydantic import AlarmPageResponse, AlarmResponse, AlarmReport, AlarmPercent, TopAlarmAreasReport, TopAlarmArea, TodayAlarmHandleReport, AlarmHistogram
 from app.crud.alarm_crud import (
-    get_alarms_with_condition as crud_get_alarms_with_condition,
-    delete_alarms_and_related_records as crud_delete_alarms_and_related_records,
-    get_recent_unresolved_alarms as crud_get_recent_unresolved_alarms,
-    get_today_alarm_counts as crud_get_today_alarm_counts,
-    get_today_alarm_handle_stats as crud_get_today_alarm_handle_stats,
-    get_all_alarm_counts as crud_get_all_alarm_counts,
-    get_top3_alarm_areas as crud_get_top3_alarm_areas
+    async_get_alarms_with_condition as crud_get_alarms_with_condition,
+    async_get_hot_alarms_for_merge as crud_get_hot_alarms_for_merge,
+    archive_watermark_in_range,
+    read_archived_alarms_for_merge,
+    merge_archived_alarm_page,
+    purge_alarms as crud_purge_alarms,
+    async_get_recent_unresolved_alarms as crud_get_recent_unresolved_alarms,
+    async_get_today_alarm_counts as crud_get_today_alarm_counts,
+    async_get_today_alarm_handle_stats as crud_get_today_alarm_handle_stats,
+    async_get_all_alarm_counts as crud_get_all_alarm_counts,
+    async_get_top3_alarm_areas as crud_get_top3_alarm_areas,
+    async_get_minute_alarm_counts as crud_get_minute_alarm_counts
 )
-from app.services.thread_pool_manager import executor as db_executor
+from app.crud.alarm_stats_crud import async_get_hourly_alarm_counts as crud_get_hourly_alarm_counts
+from app.services.oss_delete_queue import oss_delete_queue
+from app.services.thread_pool_manager import db_executor
+from app.utils.histogram import BUCKET_SIZES, bucket_count, fill_histogram
+from app.utils.response_cache import (
+    cached_response, TAG_ALARM_COUNT, TAG_ALARM_STATUS, TAG_ALARM_DETAIL, TAG_CAMERA,
+    TAG_PARK_AREA
+)
+
+
+# 告警趋势图最多返回的时间桶个数（如按分钟最多约3.5天，按小时约208天）
+MAX_HISTOGRAM_BUCKETS = 5000
 
 
 class AlarmService:
+    @staticmethod
+    def build_alarm_responses(alarm_rows) -> List[AlarmResponse]:
+        """将告警联表查询结果（或归档告警）转换为AlarmResponse对象列表"""
+        return [
+            AlarmResponse(
+                alarm_id=alarm_row.AlarmDB.alarm_id,
+                camera_id=alarm_row.AlarmDB.camera_id,
+                alarm_type=alarm_row.AlarmDB.alarm_type,
+                alarm_status=alarm_row.AlarmDB.alarm_status,
+                alarm_time=alarm_row.AlarmDB.alarm_time,
+                alarm_end_time=alarm_row.AlarmDB.alarm_end_time,
+                snapshot_url=alarm_row.AlarmDB.snapshot_url,
+                video_clip_url=alarm_row.AlarmDB.video_clip_url,
+                create_time=alarm_row.AlarmDB.create_time,
+                update_time=alarm_row.AlarmDB.update_time,
+                park_area=alarm_row.park_area,
+                camera_name=alarm_row.camera_name,
+                handle_user_name=alarm_row.handle_user_name
+            )
+            for alarm_row in alarm_rows
+        ]
+
+    @staticmethod
+    def build_alarm_report(alarm_counts) -> AlarmReport:
+        """将各类型告警数转换为告警统计报告（percent字段存储占比，保留4位小数）"""
+        total_alarms = sum(alarm_number for _, alarm_number in alarm_counts)
+        return AlarmReport(alarms=[
+            AlarmPercent(
+                alarm_type=alarm_type,
+                percent=round(alarm_number / total_alarms, 4) if total_alarms > 0 else 0.0
+            )
+            for alarm_type, alarm_number in alarm_counts
+        ])
+
+    @staticmethod
+    def build_today_alarm_handle_report(handle_stats) -> TodayAlarmHandleReport:
+        """将(今日告警总数, 已处理数, 未处理数)转换为本日告警处理统计报告"""
+        total_count, handled_count, unhandled_count = handle_stats
+        # 计算处理率
+        handle_rate = round(handled_count / total_count, 4) if total_count > 0 else 0.0
+        return TodayAlarmHandleReport(handle_rate=handle_rate, unhandled_count=unhandled_count)
+
+    @staticmethod
+    def build_top3_alarm_areas_report(top_areas_data) -> TopAlarmAreasReport:
+        """将(园区区域名称, 告警数)列表转换为前3个告警区域统计报告"""
+        return TopAlarmAreasReport(top_areas=[
+            TopAlarmArea(park_area=park_area, alarm_count=alarm_count)
+            for park_area, alarm_count in top_areas_data
+        ])
+
     @staticmethod
     async def get_alarms_with_condition(
-        db: Session,
+        db: AsyncSession,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
         alarm_type: Optional[int] = None,
         alarm_status: Optional[int] = None,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ) -> Result[AlarmPageResponse]:
         """
-        根据条件获取告警记录列表（支持分页）
+        根据条件获取告警记录列表（游标分页，按告警时间倒序）
 
         Args:
             db: 数据库会话
@@ -37,46 +106,44 @@ class AlarmService:
             end_time: 告警结束时间
             alarm_type: 告警类型
             alarm_status: 告警状态
-            skip: 跳过的记录数
+            skip: 跳过的记录数（仅在不传游标时生效）
             limit: 限制返回的记录数
+            cursor: 翻页游标（上一次返回的next_cursor或prev_cursor）
+            with_total: 是否统计总数
 
         Returns:
             Result[dict]: 包含告警记录列表的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            total, alarms_with_details = await asyncio.get_event_loop().run_in_executor(
-                db_executor, 
-                crud_get_alarms_with_condition,
-                db, start_time, end_time, alarm_type, alarm_status, skip, limit
-            )
-            
-            # 转换查询结果为AlarmResponse对象
-            alarms = []
-            for alarm_row in alarms_with_details:
-                # 处理 SQLAlchemy 查询结果对象
-                alarm_response = AlarmResponse(
-                    alarm_id=alarm_row.AlarmDB.alarm_id,
-                    camera_id=alarm_row.AlarmDB.camera_id,
-                    alarm_type=alarm_row.AlarmDB.alarm_type,
-                    alarm_status=alarm_row.AlarmDB.alarm_status,
-                    alarm_time=alarm_row.AlarmDB.alarm_time,
-                    alarm_end_time=alarm_row.AlarmDB.alarm_end_time,
-                    snapshot_url=alarm_row.AlarmDB.snapshot_url,
-                    create_time=alarm_row.AlarmDB.create_time,
-                    update_time=alarm_row.AlarmDB.update_time,
-                    park_area=alarm_row.park_area,
-                    camera_name=alarm_row.camera_name,
-                    handle_user_name=alarm_row.handle_user_name
+            if archive_watermark_in_range(start_time) is None:
+                # 异步查询，不占用线程池
+                page = await crud_get_alarms_with_condition(
+                    db, start_time, end_time, alarm_type, alarm_status, skip, limit, cursor, with_total
+                )
+            else:
+                # 时间范围覆盖到已归档的告警：先查数据库，再在线程池中读取Parquet归档，合并为一页
+                hot_rows, backward, total = await crud_get_hot_alarms_for_merge(
+                    db, start_time, end_time, alarm_type, alarm_status, skip, limit, cursor, with_total
+                )
+                archived_rows, archived_total = await asyncio.get_event_loop().run_in_executor(
+                    db_executor, read_archived_alarms_for_merge,
+                    hot_rows, backward, start_time, end_time, alarm_type, alarm_status, skip, limit, cursor, with_total
+                )
+                page = merge_archived_alarm_page(
+                    hot_rows, archived_rows, backward, skip, limit, cursor,
+                    None if total is None else total + archived_total
                 )
-                alarms.append(alarm_response)
 
-            return Result.SUCCESS(AlarmPageResponse(total=total, rows=alarms))
+            return Result.SUCCESS(AlarmPageResponse(
+                total=page.total, rows=AlarmService.build_alarm_responses(page.rows),
+                next_cursor=page.next_cursor, prev_cursor=page.prev_cursor
+            ))
         except Exception as e:
             return Result.ERROR(f"查询告警记录失败: {str(e)}")
 
     @staticmethod
-    async def get_recent_unresolved_alarms(db: Session, limit: int = 5) -> Result[AlarmPageResponse]:
+    @cached_response(TAG_ALARM_COUNT, TAG_ALARM_STATUS, TAG_ALARM_DETAIL, TAG_CAMERA, TAG_PARK_AREA)
+    async def get_recent_unresolved_alarms(db: AsyncSession, limit: int = 5) -> Result[AlarmPageResponse]:
         """
         获取最近的未解决告警记录（alarm_status in [0,2]，默认最多5条
 
@@ -88,40 +155,17 @@ class AlarmService:
             Result[AlarmPageResponse]: 包含最近未解决告警记录的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            total, alarms_with_details = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_recent_unresolved_alarms,
-                db, limit
-            )
-
-            # 转换查询结果为AlarmResponse对象
-            alarms = []
-            for alarm_row in alarms_with_details:
-                # 处理 SQLAlchemy 查询结果对象
-                alarm_response = AlarmResponse(
-                    alarm_id=alarm_row.AlarmDB.alarm_id,
-                    camera_id=alarm_row.AlarmDB.camera_id,
-                    alarm_type=alarm_row.AlarmDB.alarm_type,
-                    alarm_status=alarm_row.AlarmDB.alarm_status,
-                    alarm_time=alarm_row.AlarmDB.alarm_time,
-                    alarm_end_time=alarm_row.AlarmDB.alarm_end_time,
-                    snapshot_url=alarm_row.AlarmDB.snapshot_url,
-                    create_time=alarm_row.AlarmDB.create_time,
-                    update_time=alarm_row.AlarmDB.update_time,
-                    park_area=alarm_row.park_area,
-                    camera_name=alarm_row.camera_name,
-                    handle_user_name=alarm_row.handle_user_name
-                )
-                alarms.append(alarm_response)
+            # 异步查询，不占用线程池
+            total, alarms_with_details = await crud_get_recent_unresolved_alarms(db, limit)
 
-            # 返回结果，total设为实际获取的数量
-            return Result.SUCCESS(AlarmPageResponse(total=total, rows=alarms))
+            # 返回结果，total为未解决的告警总数
+            return Result.SUCCESS(AlarmPageResponse(total=total, rows=AlarmService.build_alarm_responses(alarms_with_details)))
         except Exception as e:
             return Result.ERROR(f"查询最近未解决告警记录失败: {str(e)}")
 
     @staticmethod
-    async def get_today_alarm_report(db: Session) -> Result[AlarmReport]:
+    @cached_response(TAG_ALARM_COUNT, per_day=True)
+    async def get_today_alarm_report(db: AsyncSession) -> Result[AlarmReport]:
         """
         获取本日告警统计报告
 
@@ -132,36 +176,16 @@ class AlarmService:
             Result[AlarmReport]: 包含本日告警统计数据的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            alarm_counts = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_today_alarm_counts,
-                db
-            )
+            # 异步查询，不占用线程池
+            alarm_counts = await crud_get_today_alarm_counts(db)
 
-            # 计算告警总数
-            total_alarms = sum(alarm_number for _, alarm_number in alarm_counts)
-            
-            # 转换查询结果为AlarmCount对象列表，percent字段存储占比
-            alarm_count_list = []
-            for alarm_type, alarm_number in alarm_counts:
-                if total_alarms > 0:
-                    alarm_count_list.append(AlarmPercent(
-                        alarm_type=alarm_type,
-                        percent=round(alarm_number / total_alarms, 4)  # 保留4位小数
-                    ))
-                else:
-                    alarm_count_list.append(AlarmPercent(
-                        alarm_type=alarm_type,
-                        percent=0.0
-                    ))
-
-            return Result.SUCCESS(AlarmReport(alarms=alarm_count_list))
+            return Result.SUCCESS(AlarmService.build_alarm_report(alarm_counts))
         except Exception as e:
             return Result.ERROR(f"查询本日告警统计失败: {str(e)}")
 
     @staticmethod
-    async def get_today_alarm_handle_report(db: Session) -> Result[TodayAlarmHandleReport]:
+    @cached_response(TAG_ALARM_COUNT, TAG_ALARM_STATUS, per_day=True)
+    async def get_today_alarm_handle_report(db: AsyncSession) -> Result[TodayAlarmHandleReport]:
         """
         获取本日告警处理统计报告
 
@@ -172,27 +196,16 @@ class AlarmService:
             Result[TodayAlarmHandleReport]: 包含本日告警处理统计数据的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            total_count, handled_count, unhandled_count = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_today_alarm_handle_stats,
-                db
-            )
+            # 异步查询，不占用线程池
+            handle_stats = await crud_get_today_alarm_handle_stats(db)
 
-            # 计算处理率
-            handle_rate = 0.0
-            if total_count > 0:
-                handle_rate = round(handled_count / total_count, 4)
-
-            return Result.SUCCESS(TodayAlarmHandleReport(
-                handle_rate=handle_rate,
-                unhandled_count=unhandled_count
-            ))
+            return Result.SUCCESS(AlarmService.build_today_alarm_handle_report(handle_stats))
         except Exception as e:
             return Result.ERROR(f"查询本日告警处理统计失败: {str(e)}")
 
     @staticmethod
-    async def get_all_alarm_report(db: Session) -> Result[AlarmReport]:
+    @cached_response(TAG_ALARM_COUNT)
+    async def get_all_alarm_report(db: AsyncSession) -> Result[AlarmReport]:
         """
         获取所有告警统计报告
 
@@ -203,36 +216,16 @@ class AlarmService:
             Result[AlarmReport]: 包含所有告警统计数据的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            alarm_counts = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_all_alarm_counts,
-                db
-            )
+            # 异步查询，不占用线程池
+            alarm_counts = await crud_get_all_alarm_counts(db)
 
-            # 计算告警总数
-            total_alarms = sum(alarm_number for _, alarm_number in alarm_counts)
-            
-            # 转换查询结果为AlarmCount对象列表，percent字段存储占比
-            alarm_count_list = []
-            for alarm_type, alarm_number in alarm_counts:
-                if total_alarms > 0:
-                    alarm_count_list.append(AlarmPercent(
-                        alarm_type=alarm_type,
-                        percent=round(alarm_number / total_alarms, 4)  # 保留4位小数
-                    ))
-                else:
-                    alarm_count_list.append(AlarmPercent(
-                        alarm_type=alarm_type,
-                        percent=0.0
-                    ))
-
-            return Result.SUCCESS(AlarmReport(alarms=alarm_count_list))
+            return Result.SUCCESS(AlarmService.build_alarm_report(alarm_counts))
         except Exception as e:
             return Result.ERROR(f"查询所有告警统计失败: {str(e)}")
 
     @staticmethod
-    async def get_top3_alarm_areas_report(db: Session) -> Result[TopAlarmAreasReport]:
+    @cached_response(TAG_ALARM_COUNT, TAG_PARK_AREA)
+    async def get_top3_alarm_areas_report(db: AsyncSession) -> Result[TopAlarmAreasReport]:
         """
         获取告警数位居前3的园区区域统计报告
 
@@ -243,29 +236,70 @@ class AlarmService:
             Result[TopAlarmAreasReport]: 包含前3个告警区域统计数据的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            top_areas_data = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_top3_alarm_areas,
-                db
-            )
-
-            # 转换查询结果为TopAlarmArea对象列表
-            top_areas_list = []
-            for park_area, alarm_count in top_areas_data:
-                top_areas_list.append(TopAlarmArea(
-                    park_area=park_area,
-                    alarm_count=alarm_count
-                ))
+            # 异步查询，不占用线程池
+            top_areas_data = await crud_get_top3_alarm_areas(db)
 
-            return Result.SUCCESS(TopAlarmAreasReport(top_areas=top_areas_list))
+            return Result.SUCCESS(AlarmService.build_top3_alarm_areas_report(top_areas_data))
         except Exception as e:
             return Result.ERROR(f"查询前3个告警区域统计失败: {str(e)}")
 
+    @staticmethod
+    @cached_response(TAG_ALARM_COUNT, TAG_ALARM_STATUS, TAG_CAMERA)
+    async def get_alarm_histogram(
+        db: AsyncSession,
+        start_time: datetime,
+        end_time: datetime,
+        bucket: str = "hour",
+        camera_id: Optional[int] = None,
+        park_area_id: Optional[int] = None,
+        alarm_type: Optional[int] = None,
+        alarm_status: Optional[int] = None
+    ) -> Result[AlarmHistogram]:
+        """
+        获取告警趋势（按分钟、小时或天统计时间范围内的告警数，没有告警的时间桶补0）
+
+        按小时、天统计时汇总告警小时统计表（不扫描告警表，包含已归档的告警，范围起点按所在整点计）；
+        按分钟统计时在告警表中按分钟分组计数（不包含已归档的告警）。
+        按园区区域筛选时，按小时、天统计的是告警时摄像头所在的园区区域（统计表记录的），
+        按分钟统计的是摄像头当前所在的园区区域（告警表不记录园区区域），摄像头换过园区区域时两者可能不同
+
+        Args:
+            db: 数据库会话
+            start_time: 时间范围左边界
+            end_time: 时间范围右边界
+            bucket: 时间桶宽度：minute/hour/day
+            camera_id: 摄像头ID
+            park_area_id: 园区区域ID（含义见上）
+            alarm_type: 告警类型
+            alarm_status: 告警状态
+
+        Returns:
+            Result[AlarmHistogram]: 包含每个时间桶告警数的响应对象
+        """
+        if bucket not in BUCKET_SIZES:
+            return Result.ERROR(f"不支持的时间桶宽度: {bucket}，可选 {'/'.join(BUCKET_SIZES)}")
+        if start_time > end_time:
+            return Result.ERROR("时间范围左边界不能晚于右边界")
+        if bucket_count(start_time, end_time, bucket) > MAX_HISTOGRAM_BUCKETS:
+            return Result.ERROR(f"时间范围过大: 最多返回{MAX_HISTOGRAM_BUCKETS}个时间桶，请缩小时间范围或增大时间桶宽度")
+        try:
+            # 异步查询，不占用线程池
+            query_counts = crud_get_minute_alarm_counts if bucket == "minute" else crud_get_hourly_alarm_counts
+            bucket_counts = await query_counts(
+                db, start_time, end_time, camera_id, park_area_id, alarm_type, alarm_status
+            )
+            times, counts = fill_histogram(
+                [bucket_time for bucket_time, _ in bucket_counts], start_time, end_time, bucket,
+                weights=[count for _, count in bucket_counts]
+            )
+            return Result.SUCCESS(AlarmHistogram(bucket=bucket, times=times, counts=counts, total=sum(counts)))
+        except Exception as e:
+            return Result.ERROR(f"查询告警趋势失败: {str(e)}")
+
     @staticmethod
     async def delete_alarms(db: Session, alarm_ids_str: str) -> Result:
         """
-        批量删除告警记录及其关联的处理记录
+        批量删除告警记录及其关联的处理记录，引用的OSS文件（截图、视频片段、处理附件）提交后交给后台批量删除
 
         Args:
             db: 数据库会话
@@ -284,11 +318,12 @@ class AlarmService:
 
         try:
             # 使用线程池执行数据库操作
-            deleted_count = await asyncio.get_event_loop().run_in_executor(
+            deleted_count, file_urls = await asyncio.get_event_loop().run_in_executor(
                 db_executor,
-                crud_delete_alarms_and_related_records,
+                crud_purge_alarms,
                 db, ids
             )
+            oss_delete_queue.submit_urls(file_urls)
 
             # 构造并返回响应结果
             if deleted_count == 0:
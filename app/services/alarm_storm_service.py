@@ -0,0 +1,71 @@
+import asyncio
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.config.database import analysis_session
+from app.crud.alarm_storm_summary_crud import create_alarm_storm_summaries
+from app.services.safety_analysis_service import SafetyAnalysisService
+from app.services.thread_pool_manager import db_executor
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 告警风暴汇总写入周期（秒）
+ALARM_STORM_FLUSH_INTERVAL = float(os.getenv("ALARM_STORM_FLUSH_INTERVAL", 60))
+
+
+class AlarmStormService:
+    """
+    告警风暴汇总服务
+
+    定期取出告警限流器累计的被抑制告警，每个(摄像头, 告警类型)写一条汇总记录（被抑制次数+时间范围），
+    多个来源用一条多行INSERT写入
+    """
+    flush_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def flush_summaries() -> int:
+        """写入告警风暴汇总，返回写入的记录数；写入失败时放回限流器，下次一并写入"""
+        rate_limiter = SafetyAnalysisService.alarm_rate_limiter
+        summaries = rate_limiter.drain_summaries()
+        if not summaries:
+            return 0
+        try:
+            with analysis_session() as db:
+                count = create_alarm_storm_summaries(db, summaries)
+        except Exception:
+            rate_limiter.restore_summaries(summaries)
+            raise
+        logger.info(f"已写入 {count} 条告警风暴汇总记录，共抑制告警 {sum(s[0] for s in summaries.values())} 次")
+        return count
+
+    @classmethod
+    async def _flush_loop(cls):
+        """后台周期写入"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(ALARM_STORM_FLUSH_INTERVAL)
+            try:
+                await loop.run_in_executor(db_executor, cls.flush_summaries)
+            except Exception as e:
+                logger.error(f"写入告警风暴汇总失败: {e}")
+
+    @classmethod
+    def start(cls):
+        """启动后台写入任务（需在事件循环中调用）"""
+        if cls.flush_task is None or cls.flush_task.done():
+            cls.flush_task = asyncio.create_task(cls._flush_loop())
+
+    @classmethod
+    def stop(cls):
+        """停止后台写入任务，并写入剩余的汇总"""
+        if cls.flush_task is not None:
+            cls.flush_task.cancel()
+            cls.flush_task = None
+        try:
+            cls.flush_summaries()
+        except Exception as e:
+            logger.error(f"写入告警风暴汇总失败: {e}")
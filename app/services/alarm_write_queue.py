@@ -0,0 +1,192 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from app.config.database import AnalysisSessionLocal
+from app.crud.alarm_crud import batch_create_alarms, batch_update_alarm_end_time
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 告警写入队列配置
+ALARM_WRITE_BATCH_SIZE = int(os.getenv("ALARM_WRITE_BATCH_SIZE", 100))              # 每批最多写入的操作数
+ALARM_WRITE_MAX_LATENCY_MS = float(os.getenv("ALARM_WRITE_MAX_LATENCY_MS", 50))     # 操作入队后最长等待多久必须写入（毫秒）
+ALARM_WRITE_RETRIES = int(os.getenv("ALARM_WRITE_RETRIES", 2))                       # 写入失败后的重试次数（写入是幂等的）
+
+# 操作类型
+_OP_INSERT = "insert"
+_OP_END_TIME = "end_time"
+
+
+class AlarmWriteQueue:
+    """
+    告警后写队列
+
+    安防分析产生的告警创建和结束时间更新不再各自占用一次数据库往返，而是交给独立的写入线程合并：
+    一批内的新告警用一条多行INSERT写入，结束时间更新用一条UPDATE ... CASE写入。
+    队列积累到ALARM_WRITE_BATCH_SIZE个操作，或最早的操作等待超过ALARM_WRITE_MAX_LATENCY_MS时立即写入。
+    新告警的报警ID由调用方预先生成，跟踪器绑定和广播不必等待写入；写入幂等，失败时整批重试。
+    每个操作返回Future：新告警的Future结果为AlarmDB对象，之后依赖该记录的更新（截图、视频片段）应等它完成
+    """
+
+    def __init__(self, batch_size: int = ALARM_WRITE_BATCH_SIZE, max_latency_ms: float = ALARM_WRITE_MAX_LATENCY_MS):
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.queue = queue.Queue()
+        self.stopped = False
+        # 统计指标
+        self.flush_count = 0
+        self.insert_count = 0
+        self.update_count = 0
+        self.error_count = 0
+        self.last_flush_ms = 0.0
+        self.writer_thread = None
+
+    def start(self):
+        """启动写入线程（应用启动时调用）；启动前提交的操作会在队列中等待"""
+        if self.writer_thread is not None and self.writer_thread.is_alive():
+            return
+        self.stopped = False
+        self.writer_thread = threading.Thread(target=self._run, daemon=True, name="Alarm-Write-Queue")
+        self.writer_thread.start()
+
+    def submit_insert(self, alarm_id: int, camera_id: int, alarm_type: int, alarm_status: int, alarm_time: datetime,
+                      snapshot_url: str) -> Future:
+        """
+        提交一条新告警
+
+        Args:
+            alarm_id (int): 预先生成的报警ID
+
+        Returns:
+            Future: 结果为AlarmDB对象（不关联会话）
+        """
+        future = Future()
+        self.queue.put((_OP_INSERT, {
+            "alarm_id": alarm_id,
+            "camera_id": camera_id,
+            "alarm_type": alarm_type,
+            "alarm_status": alarm_status,
+            "alarm_time": alarm_time,
+            "snapshot_url": snapshot_url,
+        }, future))
+        return future
+
+    def submit_end_time(self, alarm_id: int, alarm_end_time: datetime) -> Future:
+        """
+        提交一次告警结束时间更新
+
+        Returns:
+            Future: 结果为报警ID
+        """
+        future = Future()
+        self.queue.put((_OP_END_TIME, (alarm_id, alarm_end_time), future))
+        return future
+
+    def _run(self):
+        """写入线程：攒批并写入"""
+        while True:
+            try:
+                first = self.queue.get(timeout=1)
+            except queue.Empty:
+                if self.stopped:
+                    return
+                continue
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)  # 写完本批后再退出
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """写入一批操作：新告警一条多行INSERT，结束时间更新一条UPDATE ... CASE"""
+        inserts = [(row, future) for op, row, future in batch if op == _OP_INSERT]
+        updates = [(args, future) for op, args, future in batch if op == _OP_END_TIME]
+        start = time.perf_counter()
+        db = AnalysisSessionLocal()
+        try:
+            if inserts:
+                alarms = self._write_with_retry(db, "批量创建告警", len(inserts),
+                                                lambda: batch_create_alarms(db, [row for row, _ in inserts]))
+                for i, (_, future) in enumerate(inserts):
+                    if isinstance(alarms, Exception):
+                        future.set_exception(alarms)
+                    elif isinstance(alarms[i], Exception):
+                        # 告警ID冲突：该告警没有写入
+                        future.set_exception(alarms[i])
+                    else:
+                        future.set_result(alarms[i])
+                if not isinstance(alarms, Exception):
+                    self.insert_count += sum(1 for alarm in alarms if not isinstance(alarm, Exception))
+
+            if updates:
+                # 同一告警多次更新时以最后一次为准
+                end_times = {alarm_id: alarm_end_time for (alarm_id, alarm_end_time), _ in updates}
+                result = self._write_with_retry(db, "批量更新告警结束时间", len(updates),
+                                                lambda: batch_update_alarm_end_time(db, end_times))
+                for (alarm_id, _), future in updates:
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(alarm_id)
+                if not isinstance(result, Exception):
+                    self.update_count += len(updates)
+        finally:
+            db.close()
+        self.flush_count += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _write_with_retry(self, db, name, count, write):
+        """执行一次批量写入，失败时回滚并重试，重试用完后返回最后一次的异常"""
+        for attempt in range(ALARM_WRITE_RETRIES + 1):
+            try:
+                return write()
+            except Exception as e:
+                db.rollback()
+                self.error_count += 1
+                logger.error(f"{name}失败（{count} 条，第 {attempt + 1} 次）: {e}")
+                error = e
+        return error
+
+    def stop(self, timeout: float = 5):
+        """停止写入线程，队列中剩余的操作写完后退出"""
+        if self.writer_thread is None:
+            return
+        self.stopped = True
+        self.queue.put(None)
+        self.writer_thread.join(timeout)
+        self.writer_thread = None
+
+    def get_metrics(self) -> dict:
+        """写入队列状态（用于监控指标接口）"""
+        return {
+            "pending": self.queue.qsize(),
+            "flush_count": self.flush_count,
+            "insert_count": self.insert_count,
+            "update_count": self.update_count,
+            "error_count": self.error_count,
+            "avg_batch_size": round((self.insert_count + self.update_count) / self.flush_count, 2) if self.flush_count else 0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+# 全局告警写入队列（写入线程在应用启动时启动，关闭时写完剩余操作后停止）
+alarm_write_queue = AlarmWriteQueue()
@@ -3,26 +3,41 @@ import threading
 from typing import Optional
 
 import cv2
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.JSON_schemas.Result_pydantic import Result
 from app.JSON_schemas.camera_info_pydantic import CameraInfoResponse, CameraInfoCreate, CameraInfoUpdate, \
-    CameraInfoPageResponse, CameraStatusReport
+    CameraInfoPageResponse, CameraStatusReport, CameraProbeReport
 from app.crud.camera_crud import (
     get_camera_info,
-    get_camera_infos_with_condition as crud_get_camera_infos_with_condition,
+    async_get_camera_info as crud_get_camera_info,
+    async_get_camera_infos_with_condition as crud_get_camera_infos_with_condition,
     create_camera_info as crud_create_camera_info,
     update_camera_info as crud_update_camera_info,
     delete_camera_infos as crud_delete_camera_infos,
-    get_camera_status_stats as crud_get_camera_status_stats
+    async_get_camera_status_stats as crud_get_camera_status_stats
 )
 from app.crud.park_area_crud import get_park_area as crud_get_park_area
-from app.services.thread_pool_manager import executor as db_executor
+from app.services.camera_probe_service import CameraProbeService
+from app.services.thread_pool_manager import db_executor
+from app.utils.response_cache import cached_response, TAG_CAMERA
 
 
 class CameraInfoService:
     @staticmethod
-    async def get_camera_info(db: Session, camera_info_id: int) -> Result[CameraInfoResponse]:
+    def build_camera_status_report(camera_status_stats) -> CameraStatusReport:
+        """将(在线摄像头数, 总摄像头数)转换为摄像头状态统计报告"""
+        online_count, total_count = camera_status_stats
+        # 计算离线摄像头数
+        return CameraStatusReport(
+            online_count=online_count,
+            total_count=total_count,
+            offline_count=total_count - online_count
+        )
+
+    @staticmethod
+    async def get_camera_info(db: AsyncSession, camera_info_id: int) -> Result[CameraInfoResponse]:
         """
         获取单个摄像头信息
 
@@ -33,10 +48,8 @@ class CameraInfoService:
         Returns:
             Result[CameraInfoResponse]: 包含摄像头信息的响应对象
         """
-        # 使用线程池执行数据库操作
-        camera_info_with_park_area = await asyncio.get_event_loop().run_in_executor(
-            db_executor, get_camera_info, db, camera_info_id
-        )
+        # 异步查询，不占用线程池
+        camera_info_with_park_area = await crud_get_camera_info(db, camera_info_id)
         if not camera_info_with_park_area:
             return Result.ERROR(f"CameraInfo not found with given id={camera_info_id}")
         
@@ -60,7 +73,8 @@ class CameraInfoService:
         return Result.SUCCESS(camera_response)
 
     @staticmethod
-    async def get_camera_status_report(db: Session) -> Result[CameraStatusReport]:
+    @cached_response(TAG_CAMERA)
+    async def get_camera_status_report(db: AsyncSession) -> Result[CameraStatusReport]:
         """
         获取摄像头状态统计报告
 
@@ -71,58 +85,49 @@ class CameraInfoService:
             Result[CameraStatusReport]: 包含摄像头状态统计数据的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            online_count, total_count = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_camera_status_stats,
-                db
-            )
-
-            # 计算离线摄像头数
-            offline_count = total_count - online_count
+            # 异步查询，不占用线程池
+            camera_status_stats = await crud_get_camera_status_stats(db)
 
-            return Result.SUCCESS(CameraStatusReport(
-                online_count=online_count,
-                total_count=total_count,
-                offline_count=offline_count
-            ))
+            return Result.SUCCESS(CameraInfoService.build_camera_status_report(camera_status_stats))
         except Exception as e:
             return Result.ERROR(f"查询摄像头状态统计失败: {str(e)}")
 
     @staticmethod
     async def get_camera_infos_with_condition(
-            db: Session,
+            db: AsyncSession,
             park_area_id: Optional[int] = None,
             analysis_mode: Optional[int] = None,
             camera_status: Optional[int] = None,
             skip: int = 0,
-            limit: int = 10
+            limit: int = 10,
+            cursor: Optional[str] = None,
+            with_total: bool = True
     ) -> Result[CameraInfoPageResponse]:
         """
-        根据条件获取摄像头信息（支持分页）
+        根据条件获取摄像头信息（游标分页，按摄像头ID升序）
 
         Args:
             db: 数据库会话
             park_area_id: 园区位置ID
             analysis_mode: 分析模式
             camera_status: 摄像头状态
-            skip: 跳过的记录数
+            skip: 跳过的记录数（仅在不传游标时生效）
             limit: 限制返回的记录数
+            cursor: 翻页游标（上一次返回的next_cursor或prev_cursor）
+            with_total: 是否统计总数
 
         Returns:
             Result[CameraInfoPageResponse]: 包含摄像头信息列表和分页信息的响应对象
         """
         try:
-            # 使用线程池执行数据库操作，分别获取符合条件的总记录数和当前页数据
-            total, camera_infos_with_details = await asyncio.get_event_loop().run_in_executor(
-                    db_executor,
-                    crud_get_camera_infos_with_condition,
-                    db, park_area_id, analysis_mode, camera_status, skip, limit
-                )
+            # 异步查询，分别获取符合条件的总记录数和当前页数据
+            page = await crud_get_camera_infos_with_condition(
+                db, park_area_id, analysis_mode, camera_status, skip, limit, cursor, with_total
+            )
             
             # 转换查询结果为CameraInfoResponse对象
             camera_responses = []
-            for camera_info_row in camera_infos_with_details:
+            for camera_info_row in page.rows:
                 # 从联表查询结果中提取信息
                 camera_info = camera_info_row[0]  # CameraInfoDB instance
                 park_area_name = camera_info_row[1]  # Park area name
@@ -141,7 +146,9 @@ class CameraInfoService:
                 )
                 camera_responses.append(camera_response)
 
-            return Result.SUCCESS(CameraInfoPageResponse(total=total, rows=camera_responses))
+            return Result.SUCCESS(CameraInfoPageResponse(
+                total=page.total, rows=camera_responses, next_cursor=page.next_cursor, prev_cursor=page.prev_cursor
+            ))
         except Exception as e:
             return Result.ERROR(f"查询摄像头信息失败: {str(e)}")
 
@@ -317,4 +324,18 @@ class CameraInfoService:
             return result_container['result']
 
         # 使用线程池执行阻塞的视频连接测试
-        return await asyncio.get_event_loop().run_in_executor(db_executor, _test_connection)
\ No newline at end of file
+        return await asyncio.get_event_loop().run_in_executor(db_executor, _test_connection)
+
+    @staticmethod
+    async def probe_all_cameras() -> Result[CameraProbeReport]:
+        """
+        立即并发探测所有摄像头的连通性，并同步摄像头状态
+
+        Returns:
+            Result[CameraProbeReport]: 包含本次探测统计的响应对象
+        """
+        try:
+            report = await CameraProbeService.probe_all()
+            return Result.SUCCESS(report)
+        except Exception as e:
+            return Result.ERROR(f"探测摄像头连通性失败: {str(e)}")
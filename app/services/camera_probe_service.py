@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from app.JSON_schemas.camera_info_pydantic import CameraProbeReport
+from app.config.database import analysis_session
+from app.crud.camera_crud import get_camera_probe_targets, batch_update_camera_status
+from app.services.safety_analysis_service import SafetyAnalysisService
+from app.services.thread_pool_manager import db_executor
+from app.utils.logger import get_logger
+from app.utils.oss_utils import get_now
+
+load_dotenv()
+logger = get_logger()
+
+# 摄像头连通性探测配置
+CAMERA_PROBE_INTERVAL = float(os.getenv("CAMERA_PROBE_INTERVAL", 60))      # 后台探测周期（秒）
+CAMERA_PROBE_TIMEOUT = float(os.getenv("CAMERA_PROBE_TIMEOUT", 3))         # 单个摄像头探测超时（秒）
+CAMERA_PROBE_CONCURRENCY = int(os.getenv("CAMERA_PROBE_CONCURRENCY", 100))  # 同时探测的摄像头数上限
+CAMERA_PROBE_OFFLINE_FAILURES = int(os.getenv("CAMERA_PROBE_OFFLINE_FAILURES", 3))  # 连续探测失败多少次才标记为离线
+
+
+class CameraProbeService:
+    """
+    摄像头连通性后台探测服务
+
+    所有摄像头在事件循环中并发探测（RTSP OPTIONS请求，只建立控制连接，不拉流、不解码），
+    每个探测有独立超时，并发数由信号量限制；探测结果缓存在内存中，
+    状态有变化的摄像头用一条批量UPDATE写回camera_info表（比较并设置，不覆盖探测期间其他请求改过的状态）。
+    连续失败CAMERA_PROBE_OFFLINE_FAILURES次才标记为离线，避免偶发超时打断安防检测状态
+    """
+    # 最近一次探测结果 {camera_id: {"online": bool, "checked_at": datetime, "error": str | None}}
+    probe_results: Dict[int, dict] = {}
+    # 连续探测失败次数 {camera_id: 次数}
+    failure_counts: Dict[int, int] = {}
+    # 后台探测任务
+    probe_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def probe_stream(rtsp_url: str, timeout: float = CAMERA_PROBE_TIMEOUT) -> Tuple[bool, Optional[str]]:
+        """
+        探测单个视频流地址是否可达
+
+        Args:
+            rtsp_url: 视频流地址（rtsp/http地址或服务器本地视频文件路径）
+            timeout: 超时时间（秒）
+
+        Returns:
+            Tuple[bool, Optional[str]]: (是否可达, 失败原因)
+        """
+        url = urlsplit(rtsp_url)
+        if url.scheme not in ("rtsp", "rtsps", "http", "https"):
+            # 服务器本地视频文件（测试用）
+            exists = os.path.exists(rtsp_url)
+            return exists, None if exists else "文件不存在"
+
+        default_port = {"rtsp": 554, "rtsps": 322, "http": 80, "https": 443}[url.scheme]
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(url.hostname, url.port or default_port, ssl=url.scheme in ("rtsps", "https")),
+                timeout
+            )
+            if url.scheme.startswith("rtsp"):
+                # 发送OPTIONS请求，能收到RTSP响应（包括401未授权）即认为设备在线
+                writer.write(f"OPTIONS {rtsp_url} RTSP/1.0\r\nCSeq: 1\r\n\r\n".encode())
+                await writer.drain()
+                status_line = await asyncio.wait_for(reader.readline(), timeout)
+                if not status_line.startswith(b"RTSP/"):
+                    return False, "非RTSP响应"
+            return True, None
+        except asyncio.TimeoutError:
+            return False, "连接超时"
+        except Exception as e:
+            return False, str(e)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    @classmethod
+    async def probe_all(cls) -> CameraProbeReport:
+        """
+        并发探测所有摄像头，并把状态变化批量写回数据库
+
+        Returns:
+            CameraProbeReport: 本次探测统计
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        targets = await loop.run_in_executor(db_executor, cls._load_targets)
+
+        semaphore = asyncio.Semaphore(CAMERA_PROBE_CONCURRENCY)
+
+        async def probe_one(rtsp_url):
+            async with semaphore:
+                return await cls.probe_stream(rtsp_url)
+
+        outcomes = await asyncio.gather(*(probe_one(rtsp_url) for _, rtsp_url, _ in targets))
+
+        checked_at = get_now()
+        changed_statuses = {}
+        online_count = 0
+        for (camera_id, _, camera_status), (online, error) in zip(targets, outcomes):
+            cls.probe_results[camera_id] = {"online": online, "checked_at": checked_at, "error": error}
+            if online:
+                online_count += 1
+                cls.failure_counts.pop(camera_id, None)
+                # 离线→在线（安防分析线程仍在运行时恢复为2，否则为1）；在线的摄像头保持原状态（1或2）
+                if camera_status == 0:
+                    changed_statuses[camera_id] = (0, 2 if SafetyAnalysisService.is_analysing(camera_id) else 1)
+            else:
+                failures = cls.failure_counts.get(camera_id, 0) + 1
+                cls.failure_counts[camera_id] = failures
+                if camera_status != 0 and failures >= CAMERA_PROBE_OFFLINE_FAILURES:
+                    changed_statuses[camera_id] = (camera_status, 0)
+
+        # 清理已删除摄像头的缓存结果
+        target_ids = {camera_id for camera_id, _, _ in targets}
+        for camera_id in list(cls.probe_results.keys()):
+            if camera_id not in target_ids:
+                del cls.probe_results[camera_id]
+                cls.failure_counts.pop(camera_id, None)
+
+        changed_count = 0
+        if changed_statuses:
+            changed_count = await loop.run_in_executor(db_executor, cls._save_statuses, changed_statuses)
+
+        report = CameraProbeReport(
+            total_count=len(targets),
+            online_count=online_count,
+            offline_count=len(targets) - online_count,
+            changed_count=changed_count,
+            elapsed_ms=int((time.perf_counter() - start) * 1000)
+        )
+        logger.info(f"摄像头连通性探测完成: {report.model_dump()}")
+        return report
+
+    @staticmethod
+    def _load_targets():
+        with analysis_session() as db:
+            return get_camera_probe_targets(db)
+
+    @staticmethod
+    def _save_statuses(camera_statuses):
+        with analysis_session() as db:
+            return batch_update_camera_status(db, camera_statuses)
+
+    @classmethod
+    async def _probe_loop(cls):
+        """后台周期探测"""
+        while True:
+            try:
+                await cls.probe_all()
+            except Exception as e:
+                logger.error(f"摄像头连通性探测失败: {e}")
+            await asyncio.sleep(CAMERA_PROBE_INTERVAL)
+
+    @classmethod
+    def start(cls):
+        """启动后台探测任务（需在事件循环中调用）"""
+        if cls.probe_task is None or cls.probe_task.done():
+            cls.probe_task = asyncio.create_task(cls._probe_loop())
+
+    @classmethod
+    def stop(cls):
+        """停止后台探测任务"""
+        if cls.probe_task is not None:
+            cls.probe_task.cancel()
+            cls.probe_task = None
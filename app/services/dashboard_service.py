@@ -0,0 +1,68 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.JSON_schemas.Result_pydantic import Result
+from app.JSON_schemas.alarm_pydantic import AlarmPageResponse
+from app.JSON_schemas.dashboard_pydantic import DashboardSummary
+from app.config.database import AsyncSessionLocal
+from app.crud.alarm_crud import (
+    async_get_dashboard_alarm_stats as crud_get_dashboard_alarm_stats,
+    async_get_top3_alarm_areas as crud_get_top3_alarm_areas,
+    async_get_recent_unresolved_alarms as crud_get_recent_unresolved_alarms
+)
+from app.crud.camera_crud import async_get_camera_status_stats as crud_get_camera_status_stats
+from app.services.alarm_service import AlarmService
+from app.services.camera_info_service import CameraInfoService
+from app.utils.logger import get_logger
+from app.utils.response_cache import (
+    cached_response, TAG_ALARM_COUNT, TAG_ALARM_STATUS, TAG_ALARM_DETAIL, TAG_CAMERA, TAG_PARK_AREA
+)
+
+logger = get_logger()
+
+
+async def _with_session(query, *args):
+    """在单独的会话中执行一个查询（同一个异步会话不能并发执行多条语句）"""
+    async with AsyncSessionLocal() as db:
+        return await query(db, *args)
+
+
+class DashboardService:
+    @staticmethod
+    @cached_response(TAG_ALARM_COUNT, TAG_ALARM_STATUS, TAG_ALARM_DETAIL, TAG_CAMERA, TAG_PARK_AREA, per_day=True)
+    async def get_summary(db: AsyncSession, recent_limit: int = 5) -> Result[DashboardSummary]:
+        """
+        获取看板所有组件的数据（一次请求代替六个统计接口）
+
+        本日/所有告警统计和本日处理统计合并为一条查询，其余查询互不依赖，
+        各用一个连接并发执行（共4个连接、5条语句，耗时取决于最慢的一组）
+
+        Args:
+            db: 数据库会话（用于告警统计查询）
+            recent_limit: 最近未解决告警的条数
+
+        Returns:
+            Result[DashboardSummary]: 包含看板所有组件数据的统一响应
+        """
+        try:
+            (today_counts, all_counts, handle_stats), top_areas_data, (unresolved_total, unresolved_rows), \
+                camera_status_stats = await asyncio.gather(
+                    crud_get_dashboard_alarm_stats(db),
+                    _with_session(crud_get_top3_alarm_areas),
+                    _with_session(crud_get_recent_unresolved_alarms, recent_limit),
+                    _with_session(crud_get_camera_status_stats),
+                )
+            return Result.SUCCESS(DashboardSummary(
+                today_report=AlarmService.build_alarm_report(today_counts),
+                all_report=AlarmService.build_alarm_report(all_counts),
+                today_handle_report=AlarmService.build_today_alarm_handle_report(handle_stats),
+                top3_areas=AlarmService.build_top3_alarm_areas_report(top_areas_data),
+                recent_unresolved=AlarmPageResponse(
+                    total=unresolved_total, rows=AlarmService.build_alarm_responses(unresolved_rows)
+                ),
+                camera_status=CameraInfoService.build_camera_status_report(camera_status_stats),
+            ))
+        except Exception as e:
+            logger.error(f"获取看板数据失败: {str(e)}")
+            return Result.ERROR(f"获取看板数据失败: {str(e)}")
@@ -0,0 +1,118 @@
+import os
+import queue
+import threading
+import time
+from typing import Iterable
+
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+from app.utils.oss_utils import batch_delete_files_on_OSS, get_object_key_from_url, OSS_BATCH_DELETE_LIMIT
+
+load_dotenv()
+logger = get_logger()
+
+# OSS文件删除队列配置
+OSS_DELETE_MAX_LATENCY_MS = float(os.getenv("OSS_DELETE_MAX_LATENCY_MS", 1000))   # 文件入队后最长等待多久必须删除（毫秒）
+OSS_DELETE_RETRIES = int(os.getenv("OSS_DELETE_RETRIES", 2))                       # 删除失败后的重试次数（删除是幂等的）
+
+
+class OssDeleteQueue:
+    """
+    OSS文件后删除队列
+
+    删除告警时，告警截图、告警视频片段、处理附件等文件不在删除请求中逐个删除，而是交给独立的删除线程：
+    积累到OSS_BATCH_DELETE_LIMIT个文件，或最早的文件等待超过OSS_DELETE_MAX_LATENCY_MS时，用一次批量删除请求删除。
+    数据库记录提交后才入队，删除失败时整批重试，重试用完后记录日志（文件残留，不影响数据）
+    """
+
+    def __init__(self, batch_size: int = OSS_BATCH_DELETE_LIMIT, max_latency_ms: float = OSS_DELETE_MAX_LATENCY_MS):
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.queue = queue.Queue()
+        self.stopped = False
+        # 统计指标
+        self.flush_count = 0
+        self.deleted_count = 0
+        self.error_count = 0
+        self.worker_thread = threading.Thread(target=self._run, daemon=True, name="OSS-Delete-Queue")
+        self.worker_thread.start()
+
+    def submit_urls(self, file_urls: Iterable[str]) -> int:
+        """
+        提交要删除的文件（upload_file_on_OSS返回的URL，多个截图URL用英文逗号分隔的也可以直接传入）
+
+        Args:
+            file_urls (Iterable[str]): 文件URL
+
+        Returns:
+            int: 入队的文件数（不属于当前bucket的URL会被忽略）
+        """
+        count = 0
+        for file_url in file_urls:
+            for url in (file_url or "").split(","):
+                object_key = get_object_key_from_url(url.strip())
+                if object_key:
+                    self.queue.put(object_key)
+                    count += 1
+        return count
+
+    def _run(self):
+        """删除线程：攒批并删除"""
+        while True:
+            try:
+                first = self.queue.get(timeout=1)
+            except queue.Empty:
+                if self.stopped:
+                    return
+                continue
+            if first is None:
+                return
+            batch = {first}
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)  # 删完本批后再退出
+                    break
+                batch.add(item)
+            self._flush(sorted(batch))
+
+    def _flush(self, object_keys):
+        """删除一批文件，失败时重试"""
+        for attempt in range(OSS_DELETE_RETRIES + 1):
+            try:
+                batch_delete_files_on_OSS(object_keys)
+                self.deleted_count += len(object_keys)
+                break
+            except Exception as e:
+                self.error_count += 1
+                logger.error(f"批量删除OSS文件失败（{len(object_keys)} 个，第 {attempt + 1} 次）: {e}")
+        else:
+            logger.error(f"放弃删除OSS文件: {object_keys}")
+        self.flush_count += 1
+
+    def stop(self, timeout: float = 5):
+        """停止删除线程，队列中剩余的文件删完后退出"""
+        self.stopped = True
+        self.queue.put(None)
+        self.worker_thread.join(timeout)
+
+    def get_metrics(self) -> dict:
+        """删除队列状态（用于监控指标接口）"""
+        return {
+            "pending": self.queue.qsize(),
+            "flush_count": self.flush_count,
+            "deleted_count": self.deleted_count,
+            "error_count": self.error_count,
+        }
+
+
+# 全局OSS文件删除队列（删除线程随模块导入启动）
+oss_delete_queue = OssDeleteQueue()
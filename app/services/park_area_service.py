@@ -1,23 +1,24 @@
 import asyncio
 from typing import List, Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
 from app.JSON_schemas.park_area_pydantic import ParkAreaResponse, ParkAreaCreate, ParkAreaUpdate, ParkAreaPageResponse
 from app.crud.park_area_crud import (
-    get_park_area as crud_get_park_area,
-    get_park_areas_with_condition as crud_get_park_areas_with_condition,
+    async_get_park_area as crud_get_park_area,
+    async_get_park_areas_with_condition as crud_get_park_areas_with_condition,
     create_park_area as crud_create_park_area,
     update_park_area as crud_update_park_area,
     delete_park_areas as crud_delete_park_areas,
     get_park_area_by_name as crud_get_park_area_by_name
 )
-from app.services.thread_pool_manager import executor as db_executor
+from app.services.thread_pool_manager import db_executor
 
 
 class ParkAreaService:
     @staticmethod
-    async def get_park_area(db: Session, park_area_id: int) -> Result[ParkAreaResponse]:
+    async def get_park_area(db: AsyncSession, park_area_id: int) -> Result[ParkAreaResponse]:
         """
         获取单个园区区域信息
 
@@ -28,10 +29,8 @@ class ParkAreaService:
         Returns:
             Result[ParkAreaResponse]: 包含园区区域信息的响应对象
         """
-        # 使用线程池执行数据库操作
-        db_park_area = await asyncio.get_event_loop().run_in_executor(
-            db_executor, crud_get_park_area, db, park_area_id
-        )
+        # 异步查询，不占用线程池
+        db_park_area = await crud_get_park_area(db, park_area_id)
         if not db_park_area:
             return Result.ERROR(f"ParkArea not found with given id={park_area_id}")
         return Result.SUCCESS(db_park_area)
@@ -58,7 +57,7 @@ class ParkAreaService:
 
     @staticmethod
     async def get_park_areas_with_condition(
-            db: Session,
+            db: AsyncSession,
             park_area: Optional[str] = None,
             skip: int = 0,
             limit: int = 10
@@ -76,12 +75,8 @@ class ParkAreaService:
             Result[ParkAreaPageResponse]: 包含园区区域信息列表和分页信息的响应对象
         """
         try:
-            # 使用线程池执行数据库操作
-            total, park_areas = await asyncio.get_event_loop().run_in_executor(
-                db_executor,
-                crud_get_park_areas_with_condition,
-                db, park_area, skip, limit
-            )
+            # 异步查询，不占用线程池
+            total, park_areas = await crud_get_park_areas_with_condition(db, park_area, skip, limit)
 
             parkAreaPageResponse = ParkAreaPageResponse(total=total, rows=park_areas)
 
@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Dict
+
+import cv2
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 实时预览配置
+PREVIEW_MAX_FPS = float(os.getenv("PREVIEW_MAX_FPS", 10))          # 每路摄像头预览画面的最大编码帧率
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", 70))  # 预览画面JPEG质量
+
+# MJPEG流的分隔符
+MJPEG_BOUNDARY = "frame"
+
+
+class CameraPreviewChannel:
+    """
+    单路摄像头的预览频道
+
+    安防分析线程把已经标注好检测结果的帧发布到频道，每帧只做一次JPEG编码，所有观看者共享同一份编码结果；
+    没有观看者时直接跳过编码。每个观看者只取最新一帧，消费慢的观看者自动跳过中间帧，互不影响
+    """
+
+    def __init__(self, camera_id: int):
+        self.camera_id = camera_id
+        self.lock = threading.Lock()
+        self.publishers = 0      # 正在发布画面的安防分析线程数（重启分析时新旧线程可能短暂并存）
+        self.viewers: Dict[int, tuple] = {}  # {观看者ID: (事件循环, asyncio.Event)}
+        self.jpeg = None         # 最新一帧的JPEG编码
+        self.seq = 0             # 最新一帧的序号
+        self.last_encode_time = 0.0
+
+    @property
+    def live(self) -> bool:
+        """频道是否有画面来源"""
+        return self.publishers > 0
+
+    def has_viewers(self) -> bool:
+        return bool(self.viewers)
+
+    def is_idle(self) -> bool:
+        """既无画面来源也无观看者，可以移除"""
+        return self.publishers == 0 and not self.viewers
+
+    def publish(self, frame):
+        """发布一帧（在安防分析线程中调用）：无人观看或超过帧率上限时直接返回，不做编码"""
+        if not self.viewers:
+            return
+        now = time.monotonic()
+        if now - self.last_encode_time < 1.0 / PREVIEW_MAX_FPS:
+            return
+        self.last_encode_time = now
+
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+        if not ok:
+            return
+        with self.lock:
+            self.jpeg = buffer.tobytes()
+            self.seq += 1
+            viewers = list(self.viewers.values())
+        self._notify(viewers)
+
+    def attach_publisher(self):
+        """画面来源（安防分析线程）接入"""
+        with self.lock:
+            self.publishers += 1
+
+    def detach_publisher(self):
+        """画面来源断开；最后一个来源断开时唤醒所有观看者使其结束"""
+        with self.lock:
+            self.publishers = max(self.publishers - 1, 0)
+            if self.publishers:
+                return
+            self.jpeg = None
+            viewers = list(self.viewers.values())
+        self._notify(viewers)
+
+    @staticmethod
+    def _notify(viewers):
+        for loop, event in viewers:
+            loop.call_soon_threadsafe(event.set)
+
+    def add_viewer(self, viewer_id: int) -> asyncio.Event:
+        event = asyncio.Event()
+        with self.lock:
+            self.viewers[viewer_id] = (asyncio.get_running_loop(), event)
+            if self.jpeg is not None or not self.publishers:
+                event.set()  # 新观看者立即收到最近一帧；画面来源已断开时立即结束
+        return event
+
+    def remove_viewer(self, viewer_id: int):
+        with self.lock:
+            self.viewers.pop(viewer_id, None)
+            if not self.viewers:
+                self.jpeg = None  # 没人观看时不保留过期画面
+
+
+class PreviewService:
+    # 各摄像头的预览频道 {camera_id: CameraPreviewChannel}
+    channels: Dict[int, CameraPreviewChannel] = {}
+    channels_lock = threading.Lock()
+    viewer_ids = itertools.count(1)
+
+    @classmethod
+    def attach_publisher(cls, camera_id: int) -> CameraPreviewChannel:
+        """安防分析线程接入预览频道（频道不存在时创建），返回频道供其发布画面"""
+        with cls.channels_lock:
+            channel = cls.channels.setdefault(camera_id, CameraPreviewChannel(camera_id))
+            channel.attach_publisher()
+        return channel
+
+    @classmethod
+    def detach_publisher(cls, channel: CameraPreviewChannel):
+        """安防分析线程断开预览频道；其他分析线程仍在发布时频道保持开启"""
+        with cls.channels_lock:
+            channel.detach_publisher()
+            cls._remove_if_idle(channel)
+
+    @classmethod
+    def _remove_if_idle(cls, channel: CameraPreviewChannel):
+        """频道既无画面来源也无观看者时移除（需持有channels_lock）"""
+        if channel.is_idle() and cls.channels.get(channel.camera_id) is channel:
+            del cls.channels[channel.camera_id]
+
+    @classmethod
+    def is_live(cls, camera_id: int) -> bool:
+        channel = cls.channels.get(camera_id)
+        return channel is not None and channel.live
+
+    @classmethod
+    async def mjpeg_stream(cls, camera_id: int):
+        """
+        MJPEG流生成器（multipart/x-mixed-replace），每次产出一帧
+
+        StreamingResponse在上一帧发送完成后才会取下一帧，因此发送速度自动适配客户端的消费速度
+        """
+        viewer_id = next(cls.viewer_ids)
+        with cls.channels_lock:
+            channel = cls.channels.setdefault(camera_id, CameraPreviewChannel(camera_id))
+            event = channel.add_viewer(viewer_id)
+        logger.info(f"摄像头 {camera_id} 预览观看者加入，当前观看人数: {len(channel.viewers)}")
+        last_seq = 0
+        try:
+            while True:
+                await event.wait()
+                event.clear()
+                with channel.lock:
+                    jpeg, seq, live = channel.jpeg, channel.seq, channel.live
+                if not live:
+                    break
+                if jpeg is None or seq == last_seq:
+                    continue
+                last_seq = seq
+                yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg + b"\r\n"
+        finally:
+            # 最后一个观看者离开后停止编码（publish在无观看者时直接返回），画面来源也已断开时移除频道
+            with cls.channels_lock:
+                channel.remove_viewer(viewer_id)
+                cls._remove_if_idle(channel)
+            logger.info(f"摄像头 {camera_id} 预览观看者离开，当前观看人数: {len(channel.viewers)}")
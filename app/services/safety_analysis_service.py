@@ -1,17 +1,28 @@
 import threading
 from pathlib import Path
 from typing import Literal, Dict
-import cv2
 from sqlalchemy.orm import Session
 from app.JSON_schemas.Result_pydantic import Result
-from app.crud.alarm_crud import update_alarm_end_time, create_alarm
+from app.config.database import analysis_session
+from app.crud.alarm_crud import update_alarm_end_time, create_alarm, update_alarm_video_clip_url, update_alarm_snapshot_url
 from app.crud.camera_crud import get_camera_info
+from app.DB_models.alarm_db import AlarmDB
 from app.objects.alarm_case import AlarmCase
-from app.objects.alarm_case_tracker import DebouncedAlarmCaseTracker
-from app.services.alarm_broadcast_service import sync_broadcast_alarm
+from app.objects.alarm_rate_limiter import AlarmRateLimiter
+from app.objects.incident_correlator import IncidentCorrelator
+from app.objects.alarm_case_tracker import ShardedAlarmCaseTracker, TRANSITION_NONE, TRANSITION_NORMAL_TO_VIOLATION, \
+    TRANSITION_VIOLATION_TO_NORMAL
+from app.services.alarm_broadcast_service import sync_broadcast_alarm, sync_broadcast_incident_update, \
+    sync_broadcast_alarm_snapshot, SNAPSHOT_STATUS_PENDING, SNAPSHOT_STATUS_READY, SNAPSHOT_STATUS_FAILED
+from app.services.alarm_clip_service import AlarmClipService
+from app.services.alarm_write_queue import alarm_write_queue
 from app.services.detection_service import DetectionService
+from app.services.preview_service import PreviewService
 from app.services.storage_service import StorageService
-from app.services.thread_pool_manager import executor as io_executor
+from app.services.thread_pool_manager import alarm_executor, upload_executor
+from app.services.video_service import open_video_capture
+from app.utils.future_utils import when_all
+from app.utils.id_generator import alarm_id_generator
 from app.utils.logger import get_logger
 from app.utils.oss_utils import get_now
 
@@ -24,8 +35,12 @@ class SafetyAnalysisService:
     active_threads: Dict[str, threading.Thread] = {}
     thread_stop_flags: Dict[str, bool] = {}
 
-    # 全局告警跟踪器实例
-    alarm_tracker = DebouncedAlarmCaseTracker()
+    # 全局告警跟踪器实例（按摄像头分片，各摄像头的状态更新互不竞争）
+    alarm_tracker = ShardedAlarmCaseTracker()
+    # 全局跨摄像头告警事件关联器（同一园区区域同一告警类型的告警合并为一条告警记录）
+    incident_correlator = IncidentCorrelator()
+    # 全局告警创建限流器（每个摄像头每种告警类型一个令牌桶）
+    alarm_rate_limiter = AlarmRateLimiter()
 
     # 分析模式编码对应描述
     analysis_mode_descs = {
@@ -139,11 +154,17 @@ class SafetyAnalysisService:
             logger.info(f"摄像头 {camera_id} 安防分析已停止：处理帧 {frame_count} 帧")
 
     @classmethod
-    def _safety_analysis_loop_v2(cls, camera_id: int, rtsp_url: str | int, analysis_mode: Literal[1, 2, 3, 4], db: Session):
+    def _safety_analysis_loop_v2(cls, camera_id: int, rtsp_url: str | int, analysis_mode: Literal[1, 2, 3, 4], park_area_id: int):
         thread_name=threading.current_thread().name
         logger.info(f"安防分析线程已启动，线程名：{thread_name}")
         frame_count = 0
-        cap = cv2.VideoCapture(rtsp_url)
+        # 压缩包缓存（用于生成告警视频片段），仅PyAV解码后端可用
+        clip_buffer = AlarmClipService.attach(camera_id)
+        cap = open_video_capture(rtsp_url, camera_id, packet_listener=clip_buffer.on_packet if clip_buffer else None)
+        # 实时预览频道（复用本线程的检测标注结果，无人观看时不编码）
+        preview_channel = PreviewService.attach_publisher(camera_id)
+        # 本摄像头的告警跟踪器分片（槽位号即告警类型）
+        tracker = cls.alarm_tracker.shard_of(camera_id)
         try:
             while cap.isOpened():
                 # 检查停止信号（优先判断，确保及时退出）
@@ -157,23 +178,31 @@ class SafetyAnalysisService:
                         frame_count = 0
                         logger.info("已处理2147483647帧，现重置frame_count为0")
 
+                    preview_frame = None
                     if analysis_mode>=2: # 只分析一种告警场景
                         alarm_type = analysis_mode - 2
                         alarm_case_detected,annotated_frames = DetectionService.detect_alarm_case(frame,alarm_type)
+                        if annotated_frames:
+                            preview_frame = annotated_frames[0]
                         if alarm_case_detected is not None:
-                            alarm_case_source = f"{camera_id}_{alarm_type}"
-                            state_result = cls.alarm_tracker.update_state(alarm_case_source, alarm_case_detected)
+                            transition = tracker.update_slot(alarm_type, alarm_case_detected)
                             # 处理本次状态分析结果
-                            cls.handle_state_result_v2(state_result, camera_id, alarm_type, alarm_case_source, annotated_frames, db)
+                            if transition != TRANSITION_NONE:
+                                cls.handle_state_result_v2(transition, camera_id, park_area_id, alarm_type, annotated_frames)
                     elif analysis_mode==1: # 分析3种告警场景
                         for analysis_mode_temp in range(2,5):
                             alarm_type = analysis_mode_temp - 2
                             alarm_case_detected, annotated_frames = DetectionService.detect_alarm_case(frame, alarm_type)
+                            if annotated_frames and preview_frame is None:
+                                preview_frame = annotated_frames[0]
                             if alarm_case_detected is not None:
-                                alarm_case_source = f"{camera_id}_{alarm_type}"
-                                state_result = cls.alarm_tracker.update_state(alarm_case_source, alarm_case_detected)
+                                transition = tracker.update_slot(alarm_type, alarm_case_detected)
                                 # 处理本次状态分析结果
-                                cls.handle_state_result_v2(state_result, camera_id, alarm_type, alarm_case_source, annotated_frames, db)
+                                if transition != TRANSITION_NONE:
+                                    cls.handle_state_result_v2(transition, camera_id, park_area_id, alarm_type, annotated_frames)
+                    # 发布预览画面：没有标注结果时发布原始帧
+                    if preview_channel.has_viewers():
+                        preview_channel.publish(preview_frame if preview_frame is not None else frame)
                 else:
                     logger.info(f"{thread_name}本次获取视频帧失败")
 
@@ -182,6 +211,8 @@ class SafetyAnalysisService:
         finally:
             # 释放资源
             cap.release()
+            AlarmClipService.detach(camera_id)
+            PreviewService.detach_publisher(preview_channel)
             # 从线程管理中移除
             if thread_name in cls.active_threads:
                 del cls.active_threads[thread_name]
@@ -196,13 +227,22 @@ class SafetyAnalysisService:
         return f"安防分析线程- 摄像头ID: {camera_id}, 分析模式: {cls.analysis_mode_descs[analysis_mode]}"
 
     @classmethod
-    def start_thread(cls, camera_id, rtsp_url, t_mode, db):
+    def is_analysing(cls, camera_id: int) -> bool:
+        """摄像头的安防分析线程是否在运行（任一分析模式）"""
+        for analysis_mode in cls.analysis_mode_descs:
+            thread = cls.active_threads.get(cls.get_thread_name(camera_id, analysis_mode))
+            if thread is not None and thread.is_alive():
+                return True
+        return False
+
+    @classmethod
+    def start_thread(cls, camera_id, rtsp_url, t_mode, park_area_id):
         t_name = cls.get_thread_name(camera_id, t_mode)
         cls.thread_stop_flags[t_name] = False
 
         thread = threading.Thread(
             target=cls._safety_analysis_loop_v2,
-            args=(camera_id, rtsp_url, t_mode, db),
+            args=(camera_id, rtsp_url, t_mode, park_area_id),
             daemon=True,
             name=t_name
         )
@@ -244,7 +284,8 @@ class SafetyAnalysisService:
             if rtsp_url is None:
                 return Result.ERROR(f"未找到摄像头: {camera_info.camera_name} 的视频流URL，无法开启实时分析")
             else:
-                thread_name = cls.start_thread(camera_id, rtsp_url, analysis_mode, db)
+                # 请求的数据库会话只在本次请求内使用，分析线程及其后台任务使用分析子系统的独立连接池
+                thread_name = cls.start_thread(camera_id, rtsp_url, analysis_mode, camera_info.park_area_id)
 
                 result_data = {
                     "camera_id": camera_id,
@@ -314,7 +355,7 @@ class SafetyAnalysisService:
 
                         # 绑定告警ID到跟踪器
                         cls.alarm_tracker.bind_alarm_id(alarm_case_source, alarm.alarm_id)
-                        logger.info(f"已经绑定告警(Alarm ID:{alarm.alarm_id}) 到告警场景状态:{cls.alarm_tracker.alarm_case_states[alarm_case_source]}")
+                        logger.info(f"已经绑定告警(Alarm ID:{alarm.alarm_id}) 到告警场景状态:{cls.alarm_tracker.get_state(alarm_case_source)}")
 
                         # 广播告警
                         sync_broadcast_alarm(alarm)
@@ -322,7 +363,7 @@ class SafetyAnalysisService:
                         logger.error(f"处理告警时发生错误: {e}")
 
                 # 提交到后台线程执行，不阻塞主线程
-                io_executor.submit(process_alarm_async)
+                alarm_executor.submit(process_alarm_async)
 
             elif change_type == "violation_to_normal":
                 # 异步更新告警结束时间（数据库操作）
@@ -337,53 +378,170 @@ class SafetyAnalysisService:
                     except Exception as e:
                         logger.error(f"更新告警结束时间时发生错误: {e}")
 
-                io_executor.submit(update_alarm_async)
+                alarm_executor.submit(update_alarm_async)
 
     @classmethod
-    def handle_state_result_v2(cls, state_result, camera_id, alarm_type, alarm_case_source, annotated_frames, db):
-        state_changed = state_result["state_changed"]
-        change_type = state_result["change_type"]
-        if state_changed:
-            if change_type == "normal_to_violation":
-                # 完全异步处理：保存截图、创建告警、广播告警都在后台线程执行
-                def process_alarm_async():
-                    try:
-                        snapshot_urls="" # 包含本次告警的所有经过标注的帧的url
-                        for i,annotated_frame in enumerate(annotated_frames):
-                            # 保存截图到云OSS并获取URL
-                            snapshot_url = StorageService.upload_alarm_snapshot(annotated_frame, camera_id)
-                            snapshot_urls+=snapshot_url
-                            if i > 0:
-                                snapshot_urls+=','
-                            logger.info(f"已经保存告警截图到云OSS，访问URL: {snapshot_url}")
+    def handle_state_result_v2(cls, transition, camera_id, park_area_id, alarm_type, annotated_frames):
+        tracker = cls.alarm_tracker.shard_of(camera_id)
+        if transition == TRANSITION_NORMAL_TO_VIOLATION:
+            # 本轮告警的轮次号：告警ID只能绑定到本轮告警
+            episode = tracker.current_episode(alarm_type)
+            # 同一园区区域已有进行中的同类事件时直接加入，不再创建告警记录、上传截图；
+            # 需要创建新事件时先取限流令牌，超过限流的不创建事件（其他摄像头不会加入它），计入告警风暴汇总
+            incident, created = cls.incident_correlator.join(
+                park_area_id, alarm_type, camera_id,
+                admit=lambda: cls.alarm_rate_limiter.try_acquire(camera_id, alarm_type)
+            )
+            if incident is None:
+                tracker.detach_episode(alarm_type, episode)
+                logger.info(f"摄像头 {camera_id} 的告警（告警类型：{AlarmCase.descs[alarm_type]}）超过限流，已计入告警风暴汇总")
+                return
+
+            # 事件的告警记录创建完成后，把告警ID绑定到本摄像头的跟踪器（用于服务重启后恢复状态）；
+            # 没有告警ID时（创建告警记录之前出错）本轮告警不会绑定，结束时无需暂存
+            def bind_incident_alarm(future):
+                if future.result() is not None:
+                    tracker.bind_episode_alarm_id(alarm_type, episode, future.result())
+                    logger.info(f"已经绑定告警(Alarm ID:{future.result()}) 到告警场景状态:{tracker.get_state(f'{camera_id}_{alarm_type}')}")
+                else:
+                    tracker.detach_episode(alarm_type, episode)
+
+            if not created:
+                logger.info(f"摄像头 {camera_id} 加入园区区域 {park_area_id} 的进行中事件（告警类型：{AlarmCase.descs[alarm_type]}），"
+                            f"当前涉及摄像头: {sorted(incident.camera_ids)}")
+                # 告警记录创建完成后绑定告警ID，并广播一次事件更新
+                def on_incident_alarm(future):
+                    bind_incident_alarm(future)
+                    if future.result() is not None:
+                        sync_broadcast_incident_update(future.result(), alarm_type, sorted(incident.camera_ids))
+
+                incident.alarm_future.add_done_callback(on_incident_alarm)
+                return
+
+            try:
+                cls.create_incident_alarm(incident, camera_id, alarm_type, annotated_frames, bind_incident_alarm)
+            except Exception as e:
+                # 告警记录没有创建：结束事件，已加入的摄像头不会等待一个永远没有结果的告警ID
+                logger.error(f"为摄像头（ID： {camera_id}）创建告警时发生错误: {e}")
+                if not incident.alarm_future.done():
+                    incident.alarm_future.add_done_callback(bind_incident_alarm)
+                    incident.alarm_future.set_result(None)
+
+        elif transition == TRANSITION_VIOLATION_TO_NORMAL:
+            alarm_end_time = get_now()
+            alarm_id = tracker.close_episode(alarm_type)
+            incident, ended = cls.incident_correlator.leave(alarm_type, camera_id)
+            if incident is not None and not ended:
+                logger.info(f"摄像头 {camera_id} 已恢复正常，园区区域 {park_area_id} 的事件仍涉及摄像头: {sorted(incident.camera_ids)}")
+                return
+
+            # 更新告警结束时间（交给告警写入队列批量写入）
+            def update_alarm_end(alarm_id):
+                if alarm_id is None:
+                    return
+
+                def on_end_time_updated(future):
+                    if future.exception() is not None:
+                        logger.error(f"更新告警结束时间时发生错误: {future.exception()}")
+                    else:
+                        logger.info(f"摄像头 {camera_id} 更新告警（ID：{alarm_id}）")
+
+                alarm_write_queue.submit_end_time(alarm_id, alarm_end_time).add_done_callback(on_end_time_updated)
+
+            if incident is not None:
+                # 事件的最后一个摄像头恢复正常：告警记录创建完成后（可能已完成）结束告警，
+                # 告警记录没有写入时（如告警ID冲突）不更新，避免结束时间写到另一条告警上
+                def end_incident_alarm(future):
+                    if incident.insert_future is None:
+                        update_alarm_end(future.result())
+                    else:
+                        incident.insert_future.add_done_callback(
+                            lambda insert_future: update_alarm_end(future.result())
+                            if insert_future.exception() is None else None
+                        )
 
-                        # 创建告警记录
-                        alarm = create_alarm(db, camera_id, alarm_type, 0, get_now(), snapshot_urls)
-                        logger.info(f"已经为摄像头（ID： {camera_id}）创建告警（Alarm ID：{alarm.alarm_id}，告警类型：{AlarmCase.descs[alarm_type]}）")
+                incident.alarm_future.add_done_callback(end_incident_alarm)
+            else:
+                # 不属于任何事件（如仅从本地快照恢复的告警）
+                update_alarm_end(alarm_id)
 
-                        # 绑定告警ID到跟踪器
-                        cls.alarm_tracker.bind_alarm_id(alarm_case_source, alarm.alarm_id)
-                        logger.info(f"已经绑定告警(Alarm ID:{alarm.alarm_id}) 到告警场景状态:{cls.alarm_tracker.alarm_case_states[alarm_case_source]}")
+    @classmethod
+    def create_incident_alarm(cls, incident, camera_id, alarm_type, annotated_frames, bind_incident_alarm):
+        """为新事件创建告警记录、上传截图、录制视频片段并广播，告警ID通过事件的alarm_future通知所有成员摄像头"""
+        # 开始录制告警视频片段（告警前缓存 + 告警后若干秒）
+        clip_future = AlarmClipService.request_clip(camera_id)
+
+        # 预先生成报警ID：绑定告警ID、广播告警、截图命名都不必等待数据库写入
+        alarm = AlarmDB(alarm_id=alarm_id_generator.next_id(), camera_id=camera_id, alarm_type=alarm_type,
+                        alarm_status=0, alarm_time=get_now(), snapshot_url="")
+
+        # 截图并行上传到云OSS，不等上传完成就广播告警（截图待上传）
+        upload_futures = [upload_executor.submit(StorageService.upload_alarm_snapshot, annotated_frame, camera_id, alarm.alarm_id)
+                          for annotated_frame in annotated_frames]
+
+        # 创建告警记录（交给告警写入队列批量写入，写入幂等，失败时会重试）
+        insert_future = alarm_write_queue.submit_insert(alarm.alarm_id, camera_id, alarm_type, alarm.alarm_status,
+                                                        alarm.alarm_time, alarm.snapshot_url)
+        insert_future.add_done_callback(
+            lambda future: logger.error(f"创建告警记录（Alarm ID：{alarm.alarm_id}）时发生错误: {future.exception()}")
+            if future.exception() is not None else None
+        )
 
-                        # 广播告警
-                        sync_broadcast_alarm(alarm)
-                    except Exception as e:
-                        logger.error(f"处理告警时发生错误: {e}")
+        # 通知事件的所有成员摄像头（绑定告警ID、结束告警）
+        incident.insert_future = insert_future
+        incident.alarm_future.add_done_callback(bind_incident_alarm)
+        incident.alarm_future.set_result(alarm.alarm_id)
+        logger.info(f"已经为摄像头（ID： {camera_id}）创建告警（Alarm ID：{alarm.alarm_id}，告警类型：{AlarmCase.descs[alarm_type]}）")
 
-                # 提交到后台线程执行，不阻塞主线程
-                io_executor.submit(process_alarm_async)
+        # 广播告警（截图待上传）
+        sync_broadcast_alarm(alarm, snapshot_status=SNAPSHOT_STATUS_PENDING)
 
-            elif change_type == "violation_to_normal":
-                # 异步更新告警结束时间（数据库操作）
-                def update_alarm_async():
-                    try:
-                        update_alarm_end_time(
-                            db=db,
-                            alarm_id=state_result["alarm_id"],
-                            alarm_end_time=get_now()
-                        )
-                        logger.info(f"摄像头 {camera_id} 更新告警（ID：{state_result['alarm_id']}）")
-                    except Exception as e:
-                        logger.error(f"更新告警结束时间时发生错误: {e}")
+        # 告警记录写入且所有截图上传完成后更新告警记录，并再广播一次截图
+        when_all([insert_future, *upload_futures],
+                 lambda: alarm_executor.submit(cls.link_alarm_snapshots, alarm.alarm_id, insert_future, upload_futures))
+
+        # 告警记录写入且视频片段录制完成后关联到告警
+        if clip_future is not None:
+            when_all([insert_future, clip_future],
+                     lambda: cls.link_alarm_clip(alarm.alarm_id, clip_future.result())
+                     if insert_future.exception() is None else None)
 
-                io_executor.submit(update_alarm_async)
+    @classmethod
+    def link_alarm_snapshots(cls, alarm_id, insert_future, upload_futures):
+        """截图全部上传完成后，将截图URL写入告警记录并广播（部分截图上传失败时只保留成功的）"""
+        if insert_future.exception() is not None:
+            # 告警记录没有写入，截图无处关联
+            sync_broadcast_alarm_snapshot(alarm_id, "", SNAPSHOT_STATUS_FAILED)
+            return
+        snapshot_urls = []
+        for upload_future in upload_futures:
+            if upload_future.cancelled():
+                logger.error("上传告警截图的任务因上传线程池队列已满被丢弃")
+            elif upload_future.exception() is not None:
+                logger.error(f"上传告警截图时发生错误: {upload_future.exception()}")
+            else:
+                snapshot_urls.append(upload_future.result())
+                logger.info(f"已经保存告警截图到云OSS，访问URL: {upload_future.result()}")
+        if not snapshot_urls:
+            sync_broadcast_alarm_snapshot(alarm_id, "", SNAPSHOT_STATUS_FAILED)
+            return
+        # 包含本次告警的所有经过标注的帧的url，逗号分隔
+        snapshot_url = ",".join(snapshot_urls)
+        try:
+            with analysis_session() as db:
+                update_alarm_snapshot_url(db, alarm_id, snapshot_url)
+            sync_broadcast_alarm_snapshot(alarm_id, snapshot_url, SNAPSHOT_STATUS_READY)
+        except Exception as e:
+            logger.error(f"关联告警截图时发生错误: {e}")
+
+    @classmethod
+    def link_alarm_clip(cls, alarm_id, clip_url):
+        """将录制完成的告警视频片段URL写入告警记录"""
+        if not clip_url:
+            return
+        try:
+            with analysis_session() as db:
+                update_alarm_video_clip_url(db, alarm_id, clip_url)
+            logger.info(f"已经关联告警视频片段到告警（Alarm ID：{alarm_id}）")
+        except Exception as e:
+            logger.error(f"关联告警视频片段时发生错误: {e}")
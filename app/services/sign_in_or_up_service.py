@@ -11,7 +11,7 @@ from app.JSON_schemas.security_pydantic import Token
 from app.JSON_schemas.user_pydantic import UserCreate, UserRegister
 from app.config.security_config import ACCESS_TOKEN_EXPIRE_MINUTES
 from app.crud.user_crud import get_user_by_username, create_user
-from app.services.thread_pool_manager import executor as db_executor
+from app.services.thread_pool_manager import db_executor
 from app.utils.jwt_utils import create_access_token
 from app.utils.logger import get_logger
 from app.utils.password_utils import verify_password, get_password_hash
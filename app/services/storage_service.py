@@ -27,15 +27,23 @@ class StorageService:
         return filepath
 
     @staticmethod
-    def upload_alarm_snapshot(annotated_frame, camera_id):
-        """上传告警截图到云存储"""
+    def upload_alarm_snapshot(annotated_frame, camera_id, alarm_id=None):
+        """上传告警截图到云存储（传入预先生成的报警ID时，截图以报警ID命名）"""
         _, buffer = cv2.imencode('.jpg', annotated_frame)
         frame_bytes = buffer.tobytes()
-        img_name = f"{camera_id}_{get_now_str()}.jpg"
+        img_name = f"{camera_id}_{alarm_id}_{get_now_str()}.jpg" if alarm_id is not None else f"{camera_id}_{get_now_str()}.jpg"
         object_key= generate_unique_object_name(img_name)
         file_url = upload_file_on_OSS(frame_bytes, object_key)
         return file_url
 
+    @staticmethod
+    def upload_alarm_clip(clip_bytes: bytes, camera_id):
+        """上传告警视频片段（MP4）到云存储"""
+        clip_name = f"{camera_id}_{get_now_str()}.mp4"
+        object_key = generate_unique_object_name(clip_name)
+        file_url = upload_file_on_OSS(clip_bytes, object_key)
+        return file_url
+
     @classmethod
     def upload_alarm_attachment(cls, file_content: str, file_extension: str) -> str:
         """
@@ -1,9 +1,156 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict
 
-# 创建统一的线程池
-executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="Worker")
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 任务队列满时的处理策略
+POLICY_REJECT = "reject"                # 拒绝新任务（submit抛出ExecutorRejectedError），适合接口请求：快速失败，不堆积
+POLICY_CALLER_RUNS = "caller_runs"      # 由提交任务的线程自己执行，对生产者形成反压（在事件循环中提交时改为拒绝，避免阻塞事件循环）
+POLICY_DISCARD_OLDEST = "discard_oldest"  # 取消队列中等待最久的任务，腾出位置给新任务
+POLICIES = (POLICY_REJECT, POLICY_CALLER_RUNS, POLICY_DISCARD_OLDEST)
+
+
+class ExecutorRejectedError(RuntimeError):
+    """线程池任务队列已满，任务被拒绝"""
+
+
+class BoundedThreadPool(ThreadPoolExecutor):
+    """
+    有界线程池
+
+    在ThreadPoolExecutor的基础上限制等待执行的任务数，队列满时按策略拒绝、由调用方执行或丢弃最旧的任务，
+    并统计正在执行的任务数、队列深度和任务排队等待时间
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, policy: str = POLICY_REJECT):
+        if policy not in POLICIES:
+            raise ValueError(f"线程池 {name} 的队列满处理策略无效: {policy}，可选 {POLICIES}")
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"{name}-Worker")
+        self.name = name
+        self.max_queue = max_queue
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.queued: Dict[object, Future] = {}  # 等待执行的任务（按提交顺序），值为任务的Future
+        # 统计指标
+        self.active_count = 0
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.rejected_count = 0
+        self.caller_runs_count = 0
+        self.discarded_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self.lock:
+            full = len(self.queued) >= self.max_queue
+            if full and (self.policy == POLICY_REJECT or self.policy == POLICY_CALLER_RUNS and _in_event_loop()):
+                self.rejected_count += 1
+                raise ExecutorRejectedError(f"线程池 {self.name} 的任务队列已满（{self.max_queue}）")
+            if full and self.policy == POLICY_CALLER_RUNS:
+                self.caller_runs_count += 1
+            else:
+                if full:
+                    # 丢弃等待最久的任务（取消失败说明它恰好开始执行，同样腾出了位置）
+                    oldest_token = next(iter(self.queued))
+                    self.queued.pop(oldest_token).cancel()
+                    self.discarded_count += 1
+                token = object()
+                future = super().submit(self._run, token, time.monotonic(), fn, args, kwargs)
+                self.queued[token] = future
+                self.submitted_count += 1
+                return future
+
+        # 由调用方线程执行
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def _run(self, token, submit_time, fn, args, kwargs):
+        wait = time.monotonic() - submit_time
+        with self.lock:
+            self.queued.pop(token, None)
+            self.active_count += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.active_count -= 1
+                self.completed_count += 1
+
+    def get_metrics(self) -> dict:
+        """线程池状态（用于监控指标接口）"""
+        with self.lock:
+            started = self.completed_count + self.active_count
+            return {
+                "max_workers": self._max_workers,
+                "max_queue": self.max_queue,
+                "policy": self.policy,
+                "active": self.active_count,
+                "queue_depth": len(self.queued),
+                "submitted": self.submitted_count,
+                "completed": self.completed_count,
+                "rejected": self.rejected_count,
+                "caller_runs": self.caller_runs_count,
+                "discarded": self.discarded_count,
+                "avg_wait_ms": round(self.total_wait / started * 1000, 2) if started else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+            }
+
+
+def _in_event_loop() -> bool:
+    """当前线程是否正在运行事件循环"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _create_pool(name: str, prefix: str, max_workers: int, max_queue: int, policy: str) -> BoundedThreadPool:
+    """按环境变量创建线程池（{prefix}_WORKERS、{prefix}_QUEUE、{prefix}_POLICY）"""
+    return BoundedThreadPool(
+        name,
+        max_workers=int(os.getenv(f"{prefix}_WORKERS", max_workers)),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", max_queue)),
+        policy=os.getenv(f"{prefix}_POLICY", policy),
+    )
+
+
+# 按工作负载隔离的线程池：OSS上传变慢时不会拖住登录、查询等数据库操作
+# 数据库操作（接口的写操作、后台任务），在事件循环中提交，队列满时直接拒绝
+db_executor = _create_pool("DB", "DB_EXECUTOR", max_workers=8, max_queue=200, policy=POLICY_REJECT)
+# OSS上传（告警截图、告警视频片段、告警处理附件），队列满时由提交上传的线程自己执行，对安防分析线程形成反压
+upload_executor = _create_pool("Upload", "UPLOAD_EXECUTOR", max_workers=4, max_queue=100, policy=POLICY_CALLER_RUNS)
+# 告警处理（创建/结束告警、关联截图和视频片段），队列满时由提交的线程自己执行
+alarm_executor = _create_pool("Alarm", "ALARM_EXECUTOR", max_workers=4, max_queue=200, policy=POLICY_CALLER_RUNS)
+
+executors = {"db": db_executor, "upload": upload_executor, "alarm": alarm_executor}
+
+__all__ = ['db_executor', 'upload_executor', 'alarm_executor', 'ExecutorRejectedError',
+           'get_executor_metrics', 'shutdown_executor']
+
+
+def get_executor_metrics() -> dict:
+    """所有线程池的状态"""
+    return {name: pool.get_metrics() for name, pool in executors.items()}
 
-__all__ = ['executor', 'shutdown_executor']
 
 def shutdown_executor():
-    executor.shutdown(wait=True)
+    for name, pool in executors.items():
+        pool.shutdown(wait=True)
+        logger.info(f"线程池 {name} 已关闭")
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.config.database import AnalysisSessionLocal
+from app.crud.alarm_crud import get_open_alarms, batch_update_alarm_end_time, get_max_alarm_id
+from app.services.safety_analysis_service import SafetyAnalysisService
+from app.services.thread_pool_manager import db_executor
+from app.utils.id_generator import alarm_id_generator
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger()
+
+# 告警跟踪器状态快照配置
+TRACKER_SNAPSHOT_PATH = Path(os.getenv("TRACKER_SNAPSHOT_PATH", "data/alarm_tracker_snapshot.npz"))  # 快照文件路径
+TRACKER_SNAPSHOT_INTERVAL = float(os.getenv("TRACKER_SNAPSHOT_INTERVAL", 30))  # 快照周期（秒）
+TRACKER_SNAPSHOT_MAX_AGE = float(os.getenv("TRACKER_SNAPSHOT_MAX_AGE", 600))   # 快照有效期（秒），超过后不再使用
+
+
+class TrackerRecoveryService:
+    """
+    告警跟踪器状态恢复服务
+
+    服务重启后跟踪器是空的，仍在持续的告警会被当作新告警重复创建，原告警也永远不会写入结束时间。
+    启动时用一条查询取出所有未结束的告警，将每个摄像头每种告警类型最新的一条重新绑定到跟踪器，
+    同一来源更早的未结束告警（之前重启产生的重复告警）直接结束，并按摄像头所在园区区域恢复跨摄像头事件。
+    运行期间定期把跟踪器的紧凑状态写入本地快照，恢复时用快照补回投票策略的检测结果位图；
+    数据库不可用时只用快照恢复。启动时同时用已写入的最大告警ID恢复告警ID生成器的时间戳
+    """
+    snapshot_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def recover(cls) -> dict:
+        """
+        恢复告警跟踪器状态（在安防分析线程启动之前调用）
+
+        Returns:
+            dict: 恢复统计 {"restored_count": int, "closed_count": int, "source": "database" | "snapshot" | None}
+        """
+        tracker = SafetyAnalysisService.alarm_tracker
+        snapshot = cls.load_snapshot()
+        snapshot_states = {}
+        if snapshot is not None:
+            for i, camera_id in enumerate(snapshot["camera_ids"].tolist()):
+                for alarm_type in range(3):
+                    if snapshot["current_state"][i, alarm_type] and snapshot["alarm_id"][i, alarm_type] >= 0:
+                        snapshot_states[(camera_id, alarm_type)] = (int(snapshot["alarm_id"][i, alarm_type]),
+                                                                    int(snapshot["vote_bits"][i, alarm_type]))
+
+        db = AnalysisSessionLocal()
+        try:
+            # 告警ID生成器从已写入的最大告警ID之后继续（时钟回拨后重启也不会重复生成）
+            max_alarm_id = get_max_alarm_id(db)
+            if max_alarm_id is not None:
+                alarm_id_generator.advance_past(max_alarm_id)
+                if alarm_id_generator.timestamp_of(max_alarm_id) > datetime.now(timezone.utc):
+                    logger.warning(f"系统时钟落后于已写入的最大告警ID（{max_alarm_id}）的生成时间，"
+                                   f"时钟追上之前告警ID沿用该时间戳递增")
+            open_alarms = get_open_alarms(db)
+            latest_alarms = {}
+            park_area_ids = {}
+            stale_end_times = {}
+            newer_alarm_time = None
+            for alarm_id, camera_id, alarm_type, alarm_time, park_area_id in open_alarms:
+                key = (camera_id, alarm_type)
+                if key in latest_alarms:
+                    # 重复告警：以同一来源下一条告警的开始时间作为结束时间
+                    stale_end_times[alarm_id] = newer_alarm_time
+                else:
+                    latest_alarms[key] = alarm_id
+                    park_area_ids[key] = park_area_id
+                newer_alarm_time = alarm_time
+            closed_count = batch_update_alarm_end_time(db, stale_end_times)
+            source = "database"
+        except Exception as e:
+            logger.error(f"从数据库恢复告警跟踪器状态失败，改用本地快照: {e}")
+            latest_alarms = {key: alarm_id for key, (alarm_id, _) in snapshot_states.items()}
+            park_area_ids = {}
+            closed_count = 0
+            source = "snapshot" if snapshot is not None else None
+        finally:
+            db.close()
+
+        for (camera_id, alarm_type), alarm_id in latest_alarms.items():
+            snapshot_state = snapshot_states.get((camera_id, alarm_type))
+            vote_bits = snapshot_state[1] if snapshot_state and snapshot_state[0] == alarm_id else None
+            tracker.restore_alarm(camera_id, alarm_type, alarm_id, vote_bits)
+            # 恢复跨摄像头事件（快照中没有园区区域信息，仅从快照恢复时告警由跟踪器单独结束）
+            if park_area_ids.get((camera_id, alarm_type)) is not None:
+                SafetyAnalysisService.incident_correlator.restore(
+                    park_area_ids[(camera_id, alarm_type)], alarm_type, camera_id, alarm_id)
+
+        result = {"restored_count": len(latest_alarms), "closed_count": closed_count, "source": source}
+        logger.info(f"告警跟踪器状态恢复完成: {result}")
+        return result
+
+    @staticmethod
+    def save_snapshot():
+        """将跟踪器状态原子地写入本地快照（先写临时文件再替换）"""
+        snapshot = SafetyAnalysisService.alarm_tracker.export_snapshot()
+        TRACKER_SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = TRACKER_SNAPSHOT_PATH.with_name(TRACKER_SNAPSHOT_PATH.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, saved_at=np.float64(time.time()), **snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, TRACKER_SNAPSHOT_PATH)
+
+    @staticmethod
+    def load_snapshot() -> Optional[dict]:
+        """读取本地快照，不存在、损坏或超过有效期时返回None"""
+        if not TRACKER_SNAPSHOT_PATH.exists():
+            return None
+        try:
+            with np.load(TRACKER_SNAPSHOT_PATH) as data:
+                snapshot = {name: data[name] for name in data.files}
+        except Exception as e:
+            logger.error(f"读取告警跟踪器快照失败: {e}")
+            return None
+        age = time.time() - float(snapshot["saved_at"])
+        if age > TRACKER_SNAPSHOT_MAX_AGE:
+            logger.info(f"告警跟踪器快照已过期（{age:.0f}秒前），不再使用")
+            return None
+        return snapshot
+
+    @classmethod
+    async def _snapshot_loop(cls):
+        """后台周期快照"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(TRACKER_SNAPSHOT_INTERVAL)
+            try:
+                await loop.run_in_executor(db_executor, cls.save_snapshot)
+            except Exception as e:
+                logger.error(f"保存告警跟踪器快照失败: {e}")
+
+    @classmethod
+    async def start(cls):
+        """恢复跟踪器状态并启动后台快照任务（需在事件循环中调用）"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(db_executor, cls.recover)
+        except Exception as e:
+            logger.error(f"恢复告警跟踪器状态失败: {e}")
+        if cls.snapshot_task is None or cls.snapshot_task.done():
+            cls.snapshot_task = asyncio.create_task(cls._snapshot_loop())
+
+    @classmethod
+    def stop(cls):
+        """停止后台快照任务，并保存最后一次快照"""
+        if cls.snapshot_task is not None:
+            cls.snapshot_task.cancel()
+            cls.snapshot_task = None
+        try:
+            cls.save_snapshot()
+        except Exception as e:
+            logger.error(f"保存告警跟踪器快照失败: {e}")
@@ -1,18 +1,20 @@
 import asyncio
+from typing import Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.DB_models.user_db import UserDB
 from app.JSON_schemas.Result_pydantic import Result
 from app.JSON_schemas.user_pydantic import UserResponse, UserCreate, UserUpdate, UserPageResult
 from app.crud.user_crud import (
-    get_user as crud_get_user,
-    get_all_users as crud_get_all_users,
+    async_get_user as crud_get_user,
+    async_get_all_users as crud_get_all_users,
     create_user as crud_create_user,
     update_user as crud_update_user,
     delete_users as crud_delete_users
 )
-from app.services.thread_pool_manager import executor as db_executor
+from app.services.thread_pool_manager import db_executor
 from app.utils.logger import get_logger
 
 logger=get_logger()
@@ -22,7 +24,7 @@ class UserService:
     """
 
     @staticmethod
-    async def get_user(db: Session, user_id: int) -> Result[UserResponse]:
+    async def get_user(db: AsyncSession, user_id: int) -> Result[UserResponse]:
         """
         获取单个用户信息
 
@@ -33,40 +35,39 @@ class UserService:
         Returns:
             Result[UserResponse]: 包含用户信息或错误信息的统一响应
         """
-        # 使用线程池执行数据库操作
-        db_user = await asyncio.get_event_loop().run_in_executor(
-            db_executor, crud_get_user, db, user_id
-        )
+        # 异步查询，不占用线程池
+        db_user = await crud_get_user(db, user_id)
         if not db_user:
             return Result.ERROR(msg=f"用户信息未找到: User with id {user_id} not found")
         return Result.SUCCESS(data=db_user, msg="获取用户信息成功")
 
     @staticmethod
-    async def get_users(db: Session, skip: int = 0, limit: int = 10, 
+    async def get_users(db: AsyncSession, skip: int = 0, limit: int = 10, 
                             name: str = None, gender: int = None,
-                            start_time: str = None, end_time: str = None) -> Result[UserPageResult]:
+                            start_time: str = None, end_time: str = None,
+                            cursor: Optional[str] = None, with_total: bool = True) -> Result[UserPageResult]:
         """
-        获取所有用户信息（支持分页）
+        获取所有用户信息（游标分页，按用户ID升序）
 
         Args:
             db (Session): 数据库会话
-            skip (int): 跳过的记录数
+            skip (int): 跳过的记录数（仅在不传游标时生效）
             limit (int): 每页的记录数
             name (str): 用户姓名筛选条件
             gender (int): 用户性别筛选条件
             start_time (str): 入职时间左边界
             end_time (str): 入职时间右边界
+            cursor (Optional[str]): 翻页游标（上一次返回的next_cursor或prev_cursor）
+            with_total (bool): 是否统计总数
 
         Returns:
             Result[UserPageResult]: 包含用户信息列表或错误信息的统一响应
         """
         try:
-            # 使用线程池执行数据库操作
-            users = await asyncio.get_event_loop().run_in_executor(
-                db_executor, crud_get_all_users, db, skip, limit, name, gender, start_time, end_time
-            )
-            total=len(users)
-            users = UserPageResult(total=total, rows=users)
+            # 异步查询，不占用线程池
+            page = await crud_get_all_users(db, skip, limit, name, gender, start_time, end_time, cursor, with_total)
+            users = UserPageResult(total=page.total, rows=page.rows,
+                                   next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
             return Result.SUCCESS(data=users, msg="获取用户列表成功")
         except Exception as e:
             logger.error(f"获取用户列表失败: {str(e)}")
@@ -1,15 +1,53 @@
+import os
 import cv2
 import time
 import threading
 
+from dotenv import load_dotenv
+
 from app.JSON_schemas.Result_pydantic import Result
 from app.crud.camera_crud import get_camera_info
+from app.utils.logger import get_logger
+from app.utils.pyav_capture import PyAVVideoCapture, is_pyav_available, DECODE_MODE_ALL, DECODE_MODE_KEYFRAME
+
+load_dotenv()
+logger = get_logger()
+
+# 视频解码配置
+VIDEO_DECODE_BACKEND = os.getenv("VIDEO_DECODE_BACKEND", "pyav")  # 解码后端：pyav（解码时缩放、可跳帧）/ opencv
+DECODE_TARGET_WIDTH = int(os.getenv("DECODE_TARGET_WIDTH", 640))  # 解码输出宽度（所有模型的输入尺寸均为640）
+SAFETY_ANALYSIS_FPS = float(os.getenv("SAFETY_ANALYSIS_FPS", 5))  # 每路摄像头期望的分析帧率
+# 低优先级摄像头ID列表（逗号分隔），这些摄像头只解码关键帧
+KEYFRAME_ONLY_CAMERA_IDS = {int(camera_id) for camera_id in os.getenv("KEYFRAME_ONLY_CAMERA_IDS", "").split(",") if camera_id.strip()}
+
+
+def open_video_capture(source, camera_id: int | None = None, packet_listener=None):
+    """
+    按配置打开视频流，返回与cv2.VideoCapture接口一致的帧读取器
+
+    Args:
+        source: 视频源（RTSP地址、本地视频文件路径或本地摄像头编号）
+        camera_id: 摄像头ID，用于判断是否为只解码关键帧的低优先级摄像头
+        packet_listener: 压缩包监听回调（仅PyAV后端支持，OpenCV无法获取压缩包）
+
+    Returns:
+        PyAVVideoCapture | cv2.VideoCapture: 帧读取器
+    """
+    # 本地摄像头编号只能用OpenCV打开
+    if VIDEO_DECODE_BACKEND == "pyav" and not isinstance(source, int):
+        if is_pyav_available():
+            decode_mode = DECODE_MODE_KEYFRAME if camera_id in KEYFRAME_ONLY_CAMERA_IDS else DECODE_MODE_ALL
+            return PyAVVideoCapture(source, target_width=DECODE_TARGET_WIDTH, decode_mode=decode_mode,
+                                    analysis_fps=SAFETY_ANALYSIS_FPS, packet_listener=packet_listener)
+        logger.warning("未安装PyAV，退回使用OpenCV解码视频流")
+    return cv2.VideoCapture(source if isinstance(source, int) else str(source))
 
 
 # 视频流采集服务（视频帧获取服务）
 class VideoCaptureService:
-    def __init__(self, rtsp_url:str|int):
+    def __init__(self, rtsp_url:str|int, camera_id: int | None = None):
         self.rtsp_url = rtsp_url
+        self.camera_id = camera_id
         self.cap = None
         self.running = False
         self.thread = None
@@ -35,7 +73,7 @@ class VideoCaptureService:
         while self.running:
             # 确保视频流已打开，添加了重试机制
             if self.cap is None or not self.cap.isOpened():
-                self.cap = cv2.VideoCapture(self.rtsp_url)
+                self.cap = open_video_capture(self.rtsp_url, self.camera_id)
                 if self.cap.isOpened():
                     consecutive_failures = 0 # 成功连接，重置失败计数
                     # total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) # 获取视频总帧数（用于调试）
@@ -0,0 +1,135 @@
+# 告警跟踪器回放校验与性能对比
+# 用法：python -m app.utils.alarm_tracker_benchmark [告警场景来源数量，默认10000]
+# 1. 回放校验：用同一组随机检测序列分别驱动DebouncedAlarmCaseTracker和CompactAlarmCaseTracker（逐个更新与向量化更新），
+#    逐帧比较三者的状态切换是否完全一致
+#    另外用k-of-n投票策略比较逐个更新与向量化更新的状态切换是否一致
+# 2. 性能对比：每帧更新全部告警场景来源，统计每次更新的平均耗时
+import datetime
+import sys
+import time
+
+import numpy as np
+
+from app.objects import alarm_case_tracker
+from app.objects.alarm_case_tracker import (
+    DebouncedAlarmCaseTracker, CompactAlarmCaseTracker, TRANSITION_CHANGE_TYPES, TRANSITION_NONE
+)
+
+# 帧间隔取1/8秒，时间可以被datetime和float精确表示，防抖窗口的边界情况也会被覆盖到
+FRAME_INTERVAL = 0.125
+
+
+def make_detections(num_sources, num_frames, seed=0):
+    """生成随机检测序列：每个来源在告警/正常之间随机切换，并夹杂单帧抖动"""
+    rng = np.random.default_rng(seed)
+    flips = rng.random((num_frames, num_sources)) < 0.05
+    states = np.logical_xor.accumulate(flips, axis=0)
+    noise = rng.random((num_frames, num_sources)) < 0.1
+    return states ^ noise
+
+
+def replay(num_sources=200, num_frames=2000, seed=0):
+    """回放校验，返回不一致的次数"""
+    detections = make_detections(num_sources, num_frames, seed)
+    sources = [f"{i}_{i % 3}" for i in range(num_sources)]
+    base_time = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    frame_time = [base_time]
+
+    original_get_now = alarm_case_tracker.get_now
+    alarm_case_tracker.get_now = lambda: frame_time[0]
+    try:
+        debounced = DebouncedAlarmCaseTracker()
+        compact = CompactAlarmCaseTracker()
+        vectorized = CompactAlarmCaseTracker()
+        slots = np.array([compact.slot_of(source) for source in sources])
+        for source in sources:
+            vectorized.slot_of(source)
+
+        mismatches = 0
+        transitions = 0
+        for frame_index in range(num_frames):
+            seconds = frame_index * FRAME_INTERVAL
+            frame_time[0] = base_time + datetime.timedelta(seconds=seconds)
+            batch = vectorized.update_many(slots, detections[frame_index], now=seconds)
+            for i, source in enumerate(sources):
+                detected = bool(detections[frame_index, i])
+                expected = debounced.update_state(source, detected)["change_type"]
+                actual = TRANSITION_CHANGE_TYPES[compact.update_slot(slots[i], detected, now=seconds)]
+                if expected is not None:
+                    transitions += 1
+                if actual != expected or TRANSITION_CHANGE_TYPES[int(batch[i])] != expected:
+                    mismatches += 1
+        print(f"回放校验：{num_sources} 个来源 × {num_frames} 帧，状态切换 {transitions} 次，不一致 {mismatches} 次")
+        return mismatches
+    finally:
+        alarm_case_tracker.get_now = original_get_now
+
+
+def replay_voting(num_sources=200, num_frames=2000, seed=1, k=3, n=5):
+    """k-of-n投票策略的回放校验（逐个更新 vs 向量化更新），返回不一致的次数"""
+    detections = make_detections(num_sources, num_frames, seed)
+    scalar = CompactAlarmCaseTracker()
+    vectorized = CompactAlarmCaseTracker()
+    slots = np.array([scalar.slot_of(i) for i in range(num_sources)])
+    for i in range(num_sources):
+        vectorized.slot_of(i)
+        scalar.set_voting_policy(i, k, n)
+        vectorized.set_voting_policy(i, k, n)
+
+    mismatches = 0
+    transitions = 0
+    for frame_index in range(num_frames):
+        batch = vectorized.update_many(slots, detections[frame_index])
+        for i in range(num_sources):
+            transition = scalar.update_slot(i, bool(detections[frame_index, i]))
+            transitions += transition != TRANSITION_NONE
+            mismatches += transition != int(batch[i])
+    print(f"投票策略({k}/{n})回放校验：{num_sources} 个来源 × {num_frames} 帧，状态切换 {transitions} 次，不一致 {mismatches} 次")
+    return mismatches
+
+
+def benchmark(num_sources=10000, num_frames=20):
+    """性能对比：每帧更新全部来源"""
+    detections = make_detections(num_sources, num_frames)
+    sources = [f"{i // 3}_{i % 3}" for i in range(num_sources)]
+    updates = num_sources * num_frames
+
+    debounced = DebouncedAlarmCaseTracker()
+    start = time.perf_counter()
+    for frame_index in range(num_frames):
+        row = detections[frame_index].tolist()
+        for i in range(num_sources):
+            # 与安防分析线程一致：每次更新都拼接来源字符串
+            debounced.update_state(f"{i // 3}_{i % 3}", row[i])
+    debounced_elapsed = time.perf_counter() - start
+
+    compact = CompactAlarmCaseTracker()
+    slots = np.array([compact.slot_of(source) for source in sources])
+    slot_list = slots.tolist()
+    start = time.perf_counter()
+    for frame_index in range(num_frames):
+        row = detections[frame_index].tolist()
+        for i in range(num_sources):
+            compact.update_slot(slot_list[i], row[i])
+    compact_elapsed = time.perf_counter() - start
+
+    vectorized = CompactAlarmCaseTracker()
+    for source in sources:
+        vectorized.slot_of(source)
+    start = time.perf_counter()
+    transitions = 0
+    for frame_index in range(num_frames):
+        transitions += int(np.count_nonzero(vectorized.update_many(slots, detections[frame_index]) != TRANSITION_NONE))
+    vectorized_elapsed = time.perf_counter() - start
+
+    print(f"性能对比：{num_sources} 个来源 × {num_frames} 帧")
+    for name, elapsed in (("DebouncedAlarmCaseTracker.update_state", debounced_elapsed),
+                          ("CompactAlarmCaseTracker.update_slot", compact_elapsed),
+                          ("CompactAlarmCaseTracker.update_many", vectorized_elapsed)):
+        print(f"  {name}: 总耗时 {elapsed * 1000:.1f}ms，平均每次更新 {elapsed / updates * 1e9:.0f}ns")
+
+
+if __name__ == '__main__':
+    if replay() != 0 or replay_voting() != 0:
+        sys.exit("回放校验失败：紧凑版跟踪器的状态切换与原跟踪器不一致")
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,26 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+
+
+def when_all(futures: List[Future], callback: Callable[[], None]):
+    """
+    所有Future完成（成功或失败）后调用一次callback，不阻塞任何线程
+
+    callback在最后一个完成的Future所在的线程中执行（futures为空或已全部完成时在当前线程立即执行）
+    """
+    if not futures:
+        callback()
+        return
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if finished:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(on_done)
@@ -0,0 +1,58 @@
+# 时间序列直方图：将(时间, 数量)按固定宽度的时间桶累加，并补齐没有数据的桶（numpy向量化，不逐条循环）
+from datetime import datetime, timedelta
+from typing import Sequence, Optional, Tuple, List
+
+import numpy as np
+
+# 支持的时间桶宽度
+BUCKET_SIZES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def bucket_start(value: datetime, bucket: str) -> datetime:
+    """时间所在的时间桶的起点（整分、整点或当天零点）"""
+    if bucket == "minute":
+        return value.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_count(start_time: datetime, end_time: datetime, bucket: str) -> int:
+    """[start_time, end_time]覆盖的时间桶个数"""
+    return (end_time - bucket_start(start_time, bucket)) // BUCKET_SIZES[bucket] + 1
+
+
+def fill_histogram(times: Sequence[datetime], start_time: datetime, end_time: datetime, bucket: str,
+                   weights: Optional[Sequence[int]] = None) -> Tuple[List[datetime], List[int]]:
+    """
+    将时间点按时间桶计数（或按权重累加），没有数据的时间桶补0
+
+    Args:
+        times: 时间点（如告警时间，或告警小时统计的整点）
+        start_time: 时间范围左边界（第一个时间桶从其所在的时间桶起点开始）
+        end_time: 时间范围右边界
+        bucket: 时间桶宽度：minute/hour/day
+        weights: 每个时间点的数量，为None时每个时间点计1
+
+    Returns:
+        Tuple[List[datetime], List[int]]: (每个时间桶的起点, 每个时间桶的数量)
+    """
+    origin = np.datetime64(bucket_start(start_time, bucket), "s")
+    step = np.timedelta64(BUCKET_SIZES[bucket]).astype("timedelta64[s]")
+    size = bucket_count(start_time, end_time, bucket)
+
+    counts = np.zeros(size, dtype=np.int64)
+    if len(times):
+        index = (np.array(times, dtype="datetime64[s]") - origin) // step
+        in_range = (index >= 0) & (index < size)
+        counts = np.bincount(
+            index[in_range].astype(np.int64),
+            weights=None if weights is None else np.asarray(weights, dtype=np.float64)[in_range],
+            minlength=size
+        ).astype(np.int64)
+    bucket_times = origin + np.arange(size) * step
+    return bucket_times.astype(datetime).tolist(), counts.tolist()
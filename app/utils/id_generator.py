@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 当前服务节点编号（0~63），多个节点同时写入同一数据库时必须各不相同（相同时会生成重复ID，写入时报错）
+NODE_ID = int(os.getenv("NODE_ID", 0))
+
+# ID布局（共53位，不超过JavaScript的Number.MAX_SAFE_INTEGER，前端可以直接使用）：
+# 41位毫秒时间戳（相对EPOCH_MS，约69年） | 6位节点编号 | 6位毫秒内序号
+EPOCH_MS = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+NODE_BITS = 6
+SEQUENCE_BITS = 6
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+class SnowflakeIdGenerator:
+    """
+    雪花算法ID生成器（线程安全）
+
+    生成的ID按时间递增，不需要访问数据库即可得到告警ID。
+    同一毫秒内序号用完时借用下一毫秒的时间戳（时钟追上之前持续借用）；系统时钟回拨时沿用上一次的时间戳继续递增。
+    上一次的时间戳只保存在进程内，服务启动时需用advance_past从数据库中最大的ID恢复，
+    否则时钟回拨后重启（或借用的时间戳尚未被时钟追上就重启）会再次生成已用过的ID
+    """
+
+    def __init__(self, node_id: int = NODE_ID):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"节点编号必须在0~{MAX_NODE_ID}之间: {node_id}")
+        self.node_id = node_id
+        self.lock = threading.Lock()
+        self.last_timestamp = -1
+        self.sequence = 0
+
+    def next_id(self) -> int:
+        """生成下一个ID"""
+        with self.lock:
+            timestamp = max(int(time.time() * 1000) - EPOCH_MS, self.last_timestamp)
+            if timestamp == self.last_timestamp:
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    # 本毫秒序号已用完，借用下一毫秒（时钟追上之前持续借用）
+                    timestamp += 1
+            else:
+                self.sequence = 0
+            self.last_timestamp = timestamp
+            return (timestamp << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self.sequence
+
+    def advance_past(self, generated_id: int):
+        """
+        保证之后生成的ID都大于generated_id所在的毫秒（服务启动时用已写入的最大ID调用）
+
+        Args:
+            generated_id: 已使用过的ID
+        """
+        timestamp = generated_id >> (NODE_BITS + SEQUENCE_BITS)
+        with self.lock:
+            if timestamp >= self.last_timestamp:
+                # 序号置为已用完，下一个ID从下一毫秒开始
+                self.last_timestamp = timestamp
+                self.sequence = MAX_SEQUENCE
+
+    @staticmethod
+    def timestamp_of(generated_id: int) -> datetime:
+        """从ID中解析生成时间（UTC）"""
+        timestamp_ms = (generated_id >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+
+
+# 全局告警ID生成器
+alarm_id_generator = SnowflakeIdGenerator()
@@ -85,6 +85,45 @@ def upload_file_on_OSS(content, object_key):
 
     return file_url
 
+# 单次批量删除请求最多包含的文件数（OSS限制）
+OSS_BATCH_DELETE_LIMIT = 1000
+
+
+def get_object_key_from_url(file_url):
+    """
+    从upload_file_on_OSS返回的文件URL中取出文件名（object key）
+
+    参数:
+    file_url: 文件的URL
+
+    返回:
+    文件名，URL不属于当前bucket时返回None
+    """
+    prefix = f"https://{OSS_BUCKET_NAME}.{OSS_ENDPOINT.replace('http://', '').replace('https://', '')}/"
+    if not file_url or not file_url.startswith(prefix):
+        return None
+    return file_url[len(prefix):] or None
+
+
+def batch_delete_files_on_OSS(object_keys):
+    """
+    批量删除阿里云OSS上的文件（每个请求最多删除OSS_BATCH_DELETE_LIMIT个）
+
+    参数:
+    object_keys: 要删除的文件名列表
+
+    返回:
+    已删除的文件名列表（文件不存在时也视为已删除）
+    """
+    auth = oss2.Auth(OSS_ACCESS_KEY_ID, OSS_ACCESS_KEY_SECRET)
+    bucket = oss2.Bucket(auth, OSS_ENDPOINT, OSS_BUCKET_NAME)
+
+    deleted_keys = []
+    for i in range(0, len(object_keys), OSS_BATCH_DELETE_LIMIT):
+        result = bucket.batch_delete_objects(object_keys[i:i + OSS_BATCH_DELETE_LIMIT])
+        deleted_keys.extend(result.deleted_keys)
+    return deleted_keys
+
 if __name__ == '__main__':
     print(get_now_str())
     print(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
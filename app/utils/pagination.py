@@ -0,0 +1,191 @@
+# 游标分页（keyset pagination）
+# 按排序键（如 (alarm_time, alarm_id)）记住上一页最后一条记录的位置，下一页直接从该位置往后扫索引，
+# 翻到多深都只读取一页数据；不再依赖 OFFSET（深分页需要先扫描并丢弃前面所有记录）
+import base64
+import binascii
+import json
+import os
+import time
+from datetime import datetime
+from typing import Optional, Sequence, Callable, Any, NamedTuple, Dict, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+# 分页总数的缓存时间（秒）：翻页时不必每页都重新统计一遍总数
+PAGE_TOTAL_CACHE_TTL = float(os.getenv("PAGE_TOTAL_CACHE_TTL", 30))
+# 最多缓存的查询条件数，超出后清空重新缓存
+PAGE_TOTAL_CACHE_SIZE = 1024
+
+
+class InvalidCursorError(ValueError):
+    """分页游标格式错误或与当前列表不匹配"""
+
+
+class Page(NamedTuple):
+    """一页查询结果"""
+    total: Optional[int]        # 符合条件的总数（不统计总数时为None）
+    rows: list                  # 当前页的记录
+    next_cursor: Optional[str]  # 下一页游标（已是最后一页时为None）
+    prev_cursor: Optional[str]  # 上一页游标（已是第一页时为None）
+
+
+def encode_cursor(values: Sequence[Any], backward: bool = False) -> str:
+    """
+    将排序键编码为不透明的游标字符串
+
+    Args:
+        values: 记录的排序键值（与排序列一一对应）
+        backward: 是否为向前翻页（上一页）的游标
+
+    Returns:
+        str: URL安全的Base64游标
+    """
+    payload = {"k": [value.isoformat() if isinstance(value, datetime) else value for value in values], "b": backward}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> Tuple[list, bool]:
+    """
+    解析游标字符串
+
+    Args:
+        cursor: encode_cursor生成的游标
+        columns: 排序列（用于校验键的个数，并还原时间类型的键）
+
+    Returns:
+        Tuple[list, bool]: (排序键值, 是否为向前翻页)
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values, backward = payload["k"], bool(payload["b"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursorError(f"无效的分页游标: {cursor}")
+    try:
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, values)
+        ], backward
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+
+
+def _after(columns: Sequence, values: Sequence, descending: bool):
+    """排序键严格位于values之后的条件：(a, b) > (x, y) 展开为 a > x OR (a = x AND b > y)，便于走索引范围扫描"""
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        beyond = column < value if descending else column > value
+        conditions.append(and_(*[columns[j] == values[j] for j in range(i)], beyond))
+    return or_(*conditions)
+
+
+def keyset_stmt(stmt, columns: Sequence, descending: bool, cursor: Optional[str], skip: int, limit: int):
+    """
+    给查询加上游标分页条件、排序和LIMIT（多取一条用于判断是否还有下一页）
+
+    Args:
+        stmt: 已加好筛选条件的查询
+        columns: 排序列，最后一列必须唯一（如主键）
+        descending: 是否按排序列倒序
+        cursor: 翻页游标，为None时从第一条开始（兼容旧的skip分页）
+        skip: 跳过的记录数（仅在不传游标时生效）
+        limit: 每页记录数
+
+    Returns:
+        tuple: (分页查询, 是否为向前翻页)
+    """
+    backward = False
+    if cursor:
+        values, backward = decode_cursor(cursor, columns)
+        # 向前翻页时反向比较和排序，取到记录后再倒回来
+        stmt = stmt.where(_after(columns, values, descending != backward))
+    elif skip:
+        stmt = stmt.offset(skip)
+    reverse = descending != backward
+    stmt = stmt.order_by(*[column.desc() if reverse else column.asc() for column in columns])
+    return stmt.limit(limit + 1), backward
+
+
+def keyset_page(rows: Sequence, row_key: Callable[[Any], Sequence], limit: int, backward: bool,
+                has_previous: bool, total: Optional[int] = None) -> Page:
+    """
+    将多取一条的查询结果整理成一页，并生成前后翻页游标
+
+    Args:
+        rows: keyset_stmt查询的结果
+        row_key: 从记录中取排序键值的函数
+        limit: 每页记录数
+        backward: 是否为向前翻页
+        has_previous: 前面是否还有记录（使用了游标或skip）
+        total: 符合条件的总数
+
+    Returns:
+        Page: 当前页记录和前后翻页游标
+    """
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+    if backward:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, has_previous
+    next_cursor = encode_cursor(row_key(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor(row_key(rows[0]), backward=True) if rows and has_prev else None
+    return Page(total, rows, next_cursor, prev_cursor)
+
+
+_total_cache: Dict[tuple, Tuple[float, int]] = {}
+
+
+def _total_cache_key(count_stmt) -> tuple:
+    compiled = count_stmt.compile()
+    return str(compiled), tuple(sorted(compiled.params.items()))
+
+
+def _get_cached_total(key: tuple) -> Optional[int]:
+    cached = _total_cache.get(key)
+    if cached and time.monotonic() - cached[0] < PAGE_TOTAL_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+def _set_cached_total(key: tuple, total: int):
+    if len(_total_cache) >= PAGE_TOTAL_CACHE_SIZE:
+        _total_cache.clear()
+    _total_cache[key] = (time.monotonic(), total)
+
+
+def cached_count(db: Session, count_stmt) -> int:
+    """
+    统计总数，同样的查询条件在PAGE_TOTAL_CACHE_TTL秒内直接返回缓存值（翻页时总数允许短暂不准）
+
+    Args:
+        db: 数据库会话
+        count_stmt: 计数查询
+
+    Returns:
+        int: 总数
+    """
+    key = _total_cache_key(count_stmt)
+    total = _get_cached_total(key)
+    if total is None:
+        total = db.execute(count_stmt).scalar_one()
+        _set_cached_total(key, total)
+    return total
+
+
+async def async_cached_count(db: AsyncSession, count_stmt) -> int:
+    """cached_count的异步版本（查询接口使用）"""
+    key = _total_cache_key(count_stmt)
+    total = _get_cached_total(key)
+    if total is None:
+        total = (await db.execute(count_stmt)).scalar_one()
+        _set_cached_total(key, total)
+    return total
@@ -0,0 +1,174 @@
+import time
+
+import cv2
+
+try:
+    import av  # PyAV（FFmpeg的Python绑定），未安装时退回OpenCV解码
+except ImportError:
+    av = None
+
+# 解码模式
+DECODE_MODE_ALL = "all"            # 解码全部帧
+DECODE_MODE_NONREF = "nonref"      # 跳过非参考帧（B帧等），解码器直接丢弃，不做任何解码工作
+DECODE_MODE_KEYFRAME = "keyframe"  # 仅解码关键帧（I帧），适用于低优先级摄像头
+
+
+def is_pyav_available() -> bool:
+    """检查PyAV是否可用"""
+    return av is not None
+
+
+class PyAVVideoCapture:
+    """
+    基于PyAV（FFmpeg）的视频帧读取器，接口与cv2.VideoCapture保持一致（isOpened/read/get/release），
+    可直接替换VideoCaptureService和安防分析线程中的cv2.VideoCapture
+
+    与OpenCV的区别：
+    1. 缩放发生在解码输出阶段：swscale在YUV→BGR颜色空间转换的同时完成缩放，
+       不会先生成全分辨率BGR帧再缩放（模型输入只有640，全分辨率BGR帧纯属浪费）
+    2. 可让解码器跳过非参考帧或只解码关键帧，被跳过的帧根本不会被解码
+    """
+
+    def __init__(self, source, target_width: int | None = 640, decode_mode: str = DECODE_MODE_ALL,
+                 analysis_fps: float | None = None, open_timeout: float = 5.0, read_timeout: float = 10.0,
+                 packet_listener=None):
+        """
+        Args:
+            source: 视频源（RTSP地址或本地视频文件路径）
+            target_width: 解码输出宽度（按原始宽高比缩放），None或不小于原始宽度时不缩放
+            decode_mode: 解码模式：all/nonref/keyframe
+            analysis_fps: 期望的分析帧率，当其不超过视频流帧率的一半时自动跳过非参考帧
+            open_timeout: 打开视频流超时时间（秒）
+            read_timeout: 读取视频流超时时间（秒）
+            packet_listener: 压缩包监听回调 packet_listener(packet, stream)，每个解复用得到的视频包在解码前回调一次
+                             （包括被解码器跳过的帧），用于缓存原始码流
+        """
+        self.source = str(source)
+        self.target_width = target_width
+        self.decode_mode = decode_mode
+        self.analysis_fps = analysis_fps
+        self.packet_listener = packet_listener
+        self.container = None
+        self.stream = None
+        self._frames = None       # 解码帧生成器
+        self.frame_index = 0      # 已输出的帧数（对应CAP_PROP_POS_FRAMES）
+        self.output_size = None   # 解码输出尺寸 (width, height)
+        self._open(open_timeout, read_timeout)
+
+    def _open(self, open_timeout, read_timeout):
+        """打开视频流并配置解码器"""
+        options = {}
+        if self.source.startswith("rtsp"):
+            options["rtsp_transport"] = "tcp"
+        try:
+            self.container = av.open(self.source, options=options, timeout=(open_timeout, read_timeout))
+            self.stream = self.container.streams.video[0]
+        except Exception:
+            self.release()
+            return
+
+        # 帧级多线程解码
+        self.stream.thread_type = "AUTO"
+
+        decode_mode = self.decode_mode
+        if decode_mode == DECODE_MODE_ALL and self.analysis_fps and self.stream.average_rate:
+            # 分析帧率不到视频流帧率的一半时，非参考帧反正会被丢弃，不如直接不解码
+            if self.analysis_fps <= float(self.stream.average_rate) / 2:
+                decode_mode = DECODE_MODE_NONREF
+        if decode_mode == DECODE_MODE_KEYFRAME:
+            self.stream.codec_context.skip_frame = "NONKEY"
+        elif decode_mode == DECODE_MODE_NONREF:
+            self.stream.codec_context.skip_frame = "NONREF"
+        self.decode_mode = decode_mode
+
+        # 计算解码输出尺寸（保持宽高比，宽高取偶数）
+        src_width, src_height = self.stream.codec_context.width, self.stream.codec_context.height
+        if self.target_width and src_width and src_width > self.target_width:
+            height = int(round(src_height * self.target_width / src_width)) // 2 * 2
+            self.output_size = (self.target_width, height)
+
+        self._frames = self._decode_frames()
+
+    def _decode_frames(self):
+        """解复用+解码，逐帧产出BGR图像"""
+        for packet in self.container.demux(self.stream):
+            # 解复用结束时会产出一个用于冲刷解码器的空包
+            if self.packet_listener is not None and packet.size > 0:
+                self.packet_listener(packet, self.stream)
+            for frame in packet.decode():
+                if self.output_size:
+                    width, height = self.output_size
+                    yield frame.to_ndarray(format="bgr24", width=width, height=height)
+                else:
+                    yield frame.to_ndarray(format="bgr24")
+
+    def isOpened(self) -> bool:
+        return self.container is not None and self._frames is not None
+
+    def read(self):
+        """读取下一帧，返回值与cv2.VideoCapture.read()一致：(ret, frame)"""
+        if not self.isOpened():
+            return False, None
+        try:
+            frame = next(self._frames)
+        except StopIteration:
+            return False, None
+        except Exception:
+            # 网络中断、读取超时、码流损坏等：解复用生成器已经失效，关闭视频流，
+            # 之后isOpened()返回False（与cv2.VideoCapture一致），由调用方重新连接
+            try:
+                self.release()
+            except Exception:
+                pass  # 连接已断开时关闭也可能出错，视频流已标记为关闭
+            return False, None
+        self.frame_index += 1
+        return True, frame
+
+    def get(self, prop_id):
+        """兼容cv2.VideoCapture.get()的常用属性"""
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return self.frame_index
+        if self.stream is None:
+            return 0
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return self.stream.frames
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.stream.average_rate) if self.stream.average_rate else 0
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.output_size[0] if self.output_size else self.stream.codec_context.width
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.output_size[1] if self.output_size else self.stream.codec_context.height
+        return 0
+
+    def release(self):
+        """释放资源"""
+        if self._frames is not None:
+            self._frames.close()
+            self._frames = None
+        if self.container is not None:
+            try:
+                self.container.close()
+            finally:
+                self.container = None
+
+
+if __name__ == '__main__':
+    # 简单对比两种解码方式的耗时：python -m app.utils.pyav_capture <视频路径>
+    import sys
+
+    video_path = sys.argv[1]
+    for name, cap in (("opencv", cv2.VideoCapture(video_path)),
+                      ("pyav-640", PyAVVideoCapture(video_path)),
+                      ("pyav-640-nonref", PyAVVideoCapture(video_path, decode_mode=DECODE_MODE_NONREF)),
+                      ("pyav-640-keyframe", PyAVVideoCapture(video_path, decode_mode=DECODE_MODE_KEYFRAME))):
+        start, count = time.perf_counter(), 0
+        while True:
+            ret, img = cap.read()
+            if not ret:
+                break
+            if name == "opencv":
+                img = cv2.resize(img, (640, int(img.shape[0] * 640 / img.shape[1])))
+            count += 1
+        cap.release()
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {count} 帧, 耗时 {elapsed:.2f}s, {count / elapsed if elapsed else 0:.1f} 帧/秒")
@@ -0,0 +1,165 @@
+# 看板接口响应缓存（进程内）
+# 所有打开的看板每隔几秒轮询同样的统计接口，结果只在告警或摄像头变化时才会改变：
+# - 每条缓存带TTL，并关联若干数据标签（如告警数、告警状态、摄像头），数据变更时按标签使缓存失效（标签版本号加一）
+# - 同一个键同时未命中时只计算一次（single-flight），其他请求等待这次计算的结果
+# - 计算期间标签失效时，计算结果照常返回但不写入缓存，避免把变更前的数据缓存下来
+# 多个服务进程各自缓存，失效只作用于本进程；其他进程（或手工改库）的变更最多延迟RESPONSE_CACHE_TTL秒可见
+import asyncio
+import functools
+from datetime import date
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 缓存有效期（秒），为0时不缓存
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+# 最多缓存的键数，超出后清空重新缓存
+RESPONSE_CACHE_SIZE = 1024
+
+# 数据标签
+TAG_ALARM_COUNT = "alarm_count"    # 告警新增、删除
+TAG_ALARM_STATUS = "alarm_status"  # 告警状态变更、新增处理记录
+TAG_ALARM_DETAIL = "alarm_detail"  # 告警截图、视频片段等字段变更
+TAG_CAMERA = "camera"              # 摄像头新增、修改、删除、状态变更
+TAG_PARK_AREA = "park_area"        # 园区区域新增、修改、删除
+
+
+class ResponseCache:
+    """带标签失效和single-flight的TTL缓存（在事件循环中读取，可在任意线程中失效）"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self.entries: Dict[Hashable, Tuple[float, tuple, Any]] = {}  # 键 -> (过期时间, 写入时的标签版本号, 值)
+        self.inflight: Dict[Hashable, asyncio.Future] = {}
+        self.generations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        # 统计指标
+        self.hit_count = 0
+        self.miss_count = 0
+        self.shared_count = 0
+        self.invalidate_count = 0
+
+    def _generation(self, tags: Sequence[str]) -> tuple:
+        return tuple(self.generations.get(tag, 0) for tag in tags)
+
+    def invalidate(self, *tags: str):
+        """使关联了这些标签的缓存失效（数据提交后调用）"""
+        with self.lock:
+            for tag in tags:
+                self.generations[tag] = self.generations.get(tag, 0) + 1
+            self.invalidate_count += 1
+
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+
+    def _get(self, key: Hashable, tags: Sequence[str]) -> Tuple[bool, Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, generation, value = entry
+        if expires_at <= time.monotonic() or generation != self._generation(tags):
+            del self.entries[key]
+            return False, None
+        return True, value
+
+    async def get_or_compute(self, key: Hashable, tags: Sequence[str], compute: Callable[[], Awaitable[Any]],
+                             cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        读取缓存，未命中时计算并写入缓存
+
+        Args:
+            key: 缓存键
+            tags: 结果依赖的数据标签
+            compute: 计算结果的协程函数
+            cacheable: 判断结果是否可以缓存（如失败的响应不缓存）
+
+        Returns:
+            Any: 缓存或计算的结果
+        """
+        if self.ttl <= 0:
+            return await compute()
+        while True:
+            hit, value = self._get(key, tags)
+            if hit:
+                self.hit_count += 1
+                return value
+            future = self.inflight.get(key)
+            if future is None:
+                break
+            # 已有请求在计算同一个键，等待它的结果（等待方被取消时不影响计算）
+            try:
+                value = await asyncio.shield(future)
+                self.shared_count += 1
+                return value
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # 计算的请求被取消了，重新检查缓存或自己计算
+
+        self.miss_count += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        generation = self._generation(tags)
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有等待方时也不报"exception was never retrieved"
+            raise
+        finally:
+            self.inflight.pop(key, None)
+        if cacheable(value) and generation == self._generation(tags):
+            if len(self.entries) >= RESPONSE_CACHE_SIZE:
+                self.entries.clear()
+            self.entries[key] = (time.monotonic() + self.ttl, generation, value)
+        future.set_result(value)
+        return value
+
+    def get_metrics(self) -> dict:
+        """缓存状态（用于监控指标接口）"""
+        return {
+            "entries": len(self.entries),
+            "hit_count": self.hit_count,
+            "miss_count": self.miss_count,
+            "shared_count": self.shared_count,
+            "invalidate_count": self.invalidate_count,
+        }
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
+
+
+def invalidate_response_cache(*tags: str):
+    """数据变更后使关联的响应缓存失效"""
+    response_cache.invalidate(*tags)
+
+
+def cached_response(*tags: str, per_day: bool = False):
+    """
+    缓存异步服务方法的响应（只缓存成功的Result）
+
+    被装饰方法的第一个参数为数据库会话，不参与缓存键；其余参数作为缓存键的一部分
+
+    Args:
+        tags: 响应依赖的数据标签
+        per_day: 响应包含"本日"统计时为True，当前日期作为缓存键的一部分（过了零点不会返回前一天的统计）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(db, *args, **kwargs):
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())), date.today() if per_day else None)
+            return await response_cache.get_or_compute(
+                key, tags, lambda: func(db, *args, **kwargs), cacheable=lambda result: result.code != 0
+            )
+        return wrapper
+    return decorator